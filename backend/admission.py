@@ -0,0 +1,216 @@
+"""Admission control for the chat endpoints.
+
+Without it a traffic spike sends every request into ``run_query`` at once; the
+LLM provider starts returning quota errors and clients see 500s after long
+waits. ``AdmissionController`` sits in front of the chat endpoints and decides
+quickly whether a request can be served:
+
+1. Per-client token bucket (``client_rate`` requests/s, bursts up to
+   ``client_burst``): over the limit -> 429 with Retry-After. Clients are
+   keyed by ``client_key``: the peer address, unless the peer is one of
+   ``trusted_proxies``; then the proxy's ``X-Client-ID`` (an identity the
+   proxy authenticated) or the nearest untrusted ``X-Forwarded-For`` address.
+   Headers from anyone else are ignored, so a client cannot get a fresh
+   quota by changing them. Behind a load balancer, list it in
+   ZENBOT_TRUSTED_PROXIES, or every user shares the balancer's bucket.
+2. Global concurrency limit (``max_concurrency``), sized to the LLM quota.
+3. Bounded wait queue: a request waits for a slot only if the queue has room
+   and the expected wait (queue position x average service time) fits within
+   ``queue_timeout``; otherwise it is shed at once with 503 and Retry-After.
+   A request still waiting at its deadline is shed too.
+4. Two lanes: clients listed as priority are handed free slots before normal
+   waiters. Health and metrics endpoints never pass through admission.
+
+Limits are per worker process; divide the provider quota by the number of
+workers when sizing ``ZENBOT_MAX_CONCURRENCY``.
+"""
+import asyncio
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+
+class AdmissionRejected(Exception):
+    """Request shed by admission control; maps to an HTTP error with Retry-After."""
+
+    def __init__(self, status_code: int, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.detail = detail
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens/s, holding at most ``burst``."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> Tuple[bool, float]:
+        """Take one token; returns (ok, seconds until a token is available)."""
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class AdmissionController:
+    """Token buckets + concurrency limit + bounded, deadline-aware wait queue."""
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32, queue_timeout: float = 10.0,
+                 client_rate: float = 1.0, client_burst: float = 10, priority_clients: Iterable[str] = (),
+                 max_clients: int = 10000, trusted_proxies: Iterable[str] = ()):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.priority_clients = set(priority_clients)
+        self.max_clients = max_clients
+        self.trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in trusted_proxies]
+        self.in_flight = 0
+        self.service_time = 1.0  # EWMA of seconds per admitted request
+        self._waiters: Dict[str, deque] = {"priority": deque(), "normal": deque()}
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.stats = {"admitted": 0, "queued": 0, "rate_limited": 0, "shed": 0, "timed_out": 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Configure from ZENBOT_* environment variables."""
+        env = os.environ.get
+        return cls(
+            max_concurrency=int(env("ZENBOT_MAX_CONCURRENCY", "8")),
+            max_queue=int(env("ZENBOT_MAX_QUEUE", "32")),
+            queue_timeout=float(env("ZENBOT_QUEUE_TIMEOUT", "10")),
+            client_rate=float(env("ZENBOT_CLIENT_RATE", "1")),
+            client_burst=float(env("ZENBOT_CLIENT_BURST", "10")),
+            priority_clients=[c.strip() for c in env("ZENBOT_PRIORITY_CLIENTS", "").split(",") if c.strip()],
+            trusted_proxies=[p.strip() for p in env("ZENBOT_TRUSTED_PROXIES", "").split(",") if p.strip()],
+        )
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address.strip())
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_key(self, peer: Optional[str], headers: Mapping[str, str]) -> str:
+        """Rate-limit key for a request from ``peer`` (see the module docstring)."""
+        if not peer:
+            return "unknown"
+        if not self._trusted(peer):
+            return peer
+        identity = (headers.get("x-client-id") or "").strip()
+        if identity:
+            return identity
+        # Rightmost address not added by one of our proxies
+        for address in reversed((headers.get("x-forwarded-for") or "").split(",")):
+            address = address.strip()
+            if address and not self._trusted(address):
+                return address
+        return peer
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def snapshot(self) -> Dict:
+        return {"in_flight": self.in_flight, "waiting": self.waiting,
+                "service_time": round(self.service_time, 3), **self.stats}
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.client_rate, self.client_burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    async def acquire(self, client: str) -> float:
+        """Wait for a slot or raise AdmissionRejected. Returns the admission time."""
+        now = time.monotonic()
+        ok, retry_after = self._bucket(client).take(now)
+        if not ok:
+            self.stats["rate_limited"] += 1
+            raise AdmissionRejected(429, retry_after, "Rate limit exceeded for this client")
+
+        if self.in_flight < self.max_concurrency and not self.waiting:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return now
+
+        position = self.waiting + 1
+        expected_wait = position / self.max_concurrency * self.service_time
+        if position > self.max_queue or expected_wait > self.queue_timeout:
+            self.stats["shed"] += 1
+            raise AdmissionRejected(503, expected_wait, "Server overloaded, please retry")
+
+        lane = "priority" if client in self.priority_clients else "normal"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(lane, waiter)
+            self.stats["timed_out"] += 1
+            raise AdmissionRejected(503, self.service_time, "Timed out waiting for capacity")
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was already handed over
+            self._discard(lane, waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release(time.monotonic())
+            raise
+        self.stats["admitted"] += 1
+        return time.monotonic()
+
+    def _discard(self, lane: str, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters[lane].remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, admitted: float) -> None:
+        """Free a slot, handing it straight to the next waiter (priority lane first)."""
+        elapsed = time.monotonic() - admitted
+        self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+        for lane in ("priority", "normal"):
+            waiters = self._waiters[lane]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    def releaser(self, admitted: float) -> Callable[[], None]:
+        """``release(admitted)`` for slots several code paths may free; only the first call does."""
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.release(admitted)
+        return release
+
+    @asynccontextmanager
+    async def slot(self, client: str):
+        """``async with controller.slot(client): ...`` around the protected work."""
+        admitted = await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release(admitted)
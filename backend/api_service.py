@@ -1,72 +1,224 @@
 """Service wrapper for ZenBot to use in API"""
+import importlib.util
 import sys
 import os
-from typing import Dict
-from dotenv import load_dotenv
-from pathlib import Path
-
-# Load environment variables from parent directory
-env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
-
-# Explicitly ensure LangSmith env vars are set in os.environ
-# This is needed because LangChain looks for them in os.environ
-if not os.environ.get("LANGSMITH_API_KEY"):
-    from dotenv import dotenv_values
-    env_vars = dotenv_values(env_path)
-    if "LANGSMITH_API_KEY" in env_vars:
-        os.environ["LANGSMITH_API_KEY"] = env_vars["LANGSMITH_API_KEY"]
-    if "LANGSMITH_PROJECT" in env_vars:
-        os.environ["LANGSMITH_PROJECT"] = env_vars["LANGSMITH_PROJECT"]
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
 
 # Add parent directory to import zenbot
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# One .env loader for the whole process; heavy SDKs are imported on first use
+from config import load_env
+
+load_env()
+
 try:
-    from zenbot import build_documents, run_query
+    from zenbot import run_query, retrieve_many, llm_health, llm_warm_up, chat_model_class, KB_SNAPSHOTS
+    from fact_table import FactTable
+    from query_normalizer import analyze
     from evaluators import spec_accuracy_evaluator, pricing_evaluator, hallucination_detector
-    from langchain_core.tracers.langchain import LangChainTracer
-    from langsmith import Client as LangSmithClient
+    from trace_exporter import TraceExporter, LangSmithSink, HTTPCollectorSink, trace_to_run
+    from trace_sampling import TraceSampler
+    from golden_index import default_index as golden_index
 except ImportError as e:
     print(f"Warning: Could not import zenbot modules: {e}")
-    build_documents = None
     run_query = None
-    LangChainTracer = None
-    LangSmithClient = None
+    KB_SNAPSHOTS = None
+    TraceExporter = None
+    golden_index = None
+
+# How often a running batch checks whether it was cancelled
+BATCH_CANCEL_POLL = 0.1
 
 
 class ZenBotService:
     """Wrapper service for ZenBot to use in API context"""
     
     def __init__(self):
-        """Initialize ZenBot with document knowledge base and LangSmith tracer"""
-        self.documents = build_documents() if build_documents else {}
+        """Initialize ZenBot with document knowledge base and background trace exporter"""
+        self.kb = KB_SNAPSHOTS
         self.initialized = run_query is not None
+        # KB snapshot, watcher and LLM clients are loaded by warm_up() after the
+        # port is bound; a request arriving earlier loads what it needs itself
+        self.warmed_up = threading.Event()
         
-        # Initialize LangSmith tracer
+        # Traces are exported by a background thread, never on the request path
         self.tracer = None
-        if LangChainTracer is not None and LangSmithClient is not None:
+        self.exporter = None
+        self.sampler = TraceSampler.from_env() if TraceExporter is not None else None
+        self.project = os.environ.get("LANGSMITH_PROJECT", "Zen_Project")
+        if TraceExporter is not None:
             try:
-                # Check if LANGSMITH_API_KEY is available
+                sink = None
+                collector_url = os.environ.get("ZENBOT_TRACE_COLLECTOR_URL")
                 langsmith_key = os.environ.get("LANGSMITH_API_KEY")
-                project = os.environ.get("LANGSMITH_PROJECT", "Zen_Project")
                 
-                if langsmith_key:
-                    # Create LangSmith client explicitly with API key
-                    client = LangSmithClient(api_key=langsmith_key)
-                    # Create tracer with explicit client
-                    self.tracer = LangChainTracer(project_name=project, client=client)
-                    print(f"✅ LangSmith tracer initialized for project: {project}")
+                if collector_url:
+                    sink = HTTPCollectorSink(collector_url)
+                    print(f"✅ Trace exporter sending to collector: {collector_url}")
+                elif langsmith_key and importlib.util.find_spec("langsmith") is not None:
+                    # The LangSmith client is created by the exporter thread on its first batch
+                    sink = LangSmithSink.from_api_key(langsmith_key, self.project)
+                    print(f"✅ LangSmith trace exporter initialized for project: {self.project}")
                 else:
                     print("⚠️  Warning: LANGSMITH_API_KEY not found in environment")
+                
+                if sink is not None:
+                    self.exporter = TraceExporter(
+                        sink,
+                        max_queue=int(os.environ.get("ZENBOT_TRACE_QUEUE", "10000")),
+                        batch_size=int(os.environ.get("ZENBOT_TRACE_BATCH", "100")),
+                        flush_interval=float(os.environ.get("ZENBOT_TRACE_FLUSH_SECONDS", "2")),
+                        policy=os.environ.get("ZENBOT_TRACE_POLICY", "drop_newest"),
+                    )
             except Exception as e:
-                print(f"⚠️  Warning: Could not initialize LangSmith tracer: {e}")
+                print(f"⚠️  Warning: Could not initialize trace exporter: {e}")
         
         if self.initialized:
             print("✅ ZenBot service initialized successfully")
         else:
             print("⚠️  Warning: ZenBot modules not available")
     
+    def warm_up(self):
+        """Load the KB snapshot, start its watcher and build the LLM clients.
+
+        Runs on a background thread once the server is accepting connections,
+        so a new worker starts serving immediately.
+        """
+        started = time.perf_counter()
+        try:
+            if self.kb is not None:
+                with self.kb.current() as snapshot:
+                    snapshot.derived("fact_table", FactTable.from_snapshot)
+                self.kb.start_watcher(float(os.environ.get("ZENBOT_KB_POLL_SECONDS", "5")))
+            if self.initialized:
+                analyze("warm up")
+                if golden_index is not None:
+                    golden_index()
+                if os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY"):
+                    llm_warm_up()
+            print(f"✅ ZenBot warm-up finished in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"⚠️  Warning: warm-up failed: {e}")
+        finally:
+            self.warmed_up.set()
+    
+    @property
+    def documents(self) -> Dict:
+        """Documents of the live KB snapshot"""
+        if self.kb is None:
+            return {}
+        with self.kb.current() as snapshot:
+            return {k: list(v) for k, v in snapshot.documents.items()}
+
+    @property
+    def kb_version(self) -> str:
+        return self.kb.version if self.kb is not None else None
+
+    def answer(self, query: str, mode: str = "fixed", memory: Dict = None,
+               snapshot=None, docs: List[Dict] = None) -> Dict:
+        """
+        Answer a query against the live KB snapshot
+        
+        The snapshot is pinned for the whole query, so a concurrent KB reload
+        never mixes documents from two versions into one answer. ``memory`` is
+        the session's conversation memory, if the request belongs to one.
+        ``snapshot`` and ``docs`` are an already pinned snapshot and documents
+        retrieved from it (see answer_batch).
+        
+        Returns:
+            Dict with "answer", "kb_version", "mode", the "trace" with its
+            start/end times, and "error" if the query failed. Pass it to
+            export_trace() once the response has been evaluated.
+        """
+        if not self.initialized or not run_query:
+            return {
+                "answer": "ZenBot is currently unavailable. Please check configuration and ensure GEMINI_API_KEY is set.",
+                "kb_version": self.kb_version,
+                "mode": mode,
+                "error": "unavailable",
+            }
+        
+        if snapshot is None:
+            with self.kb.current() as pinned:
+                return self.answer(query, mode, memory, snapshot=pinned)
+
+        started = time.time()
+        try:
+            trace = run_query(query, version=mode, tracer=self.tracer, kb=snapshot, memory=memory,
+                              docs=docs)
+            return {
+                "answer": trace.get("answer", "No response generated"),
+                "kb_version": snapshot.version,
+                "mode": mode,
+                "trace": trace,
+                "started": started,
+                "ended": time.time(),
+            }
+        except Exception as e:
+            print(f"Error getting response: {e}")
+            answer = f"I encountered an error processing your request: {str(e)}"
+            return {
+                "answer": answer,
+                "kb_version": snapshot.version,
+                "mode": mode,
+                "trace": {"question": query, "version": mode, "kb_version": snapshot.version,
+                          "retrieved_documents": [], "answer": answer},
+                "started": started,
+                "ended": time.time(),
+                "error": str(e),
+            }
+    
+    def answer_batch(self, queries: List[str], mode: str = "fixed", concurrency: int = 4,
+                     cancel: threading.Event = None) -> Iterator[Tuple[List[int], Dict]]:
+        """
+        Answer many questions against one pinned KB snapshot
+        
+        Questions with the same canonical form (query_normalizer.analyze) are
+        answered once. Retrieval for all of them is one batched index pass;
+        generation runs on at most ``concurrency`` threads. Setting ``cancel``
+        stops the batch within BATCH_CANCEL_POLL seconds: questions not
+        started yet are dropped, running ones finish.
+        
+        Yields:
+            (indexes of the questions answered, answer dict as from answer())
+            in completion order.
+        """
+        if not self.initialized or not run_query:
+            for i, query in enumerate(queries):
+                yield [i], self.answer(query, mode)
+            return
+
+        groups: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            groups.setdefault(analyze(query)["key"] or query.strip(), []).append(i)
+        indexes = list(groups.values())
+        unique = [queries[group[0]] for group in indexes]
+
+        with self.kb.current() as snapshot:
+            docs = retrieve_many(mode, unique, kb=snapshot)
+            pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch")
+            try:
+                futures = {
+                    pool.submit(self.answer, query, mode, None, snapshot, retrieved): group
+                    for query, retrieved, group in zip(unique, docs, indexes)
+                }
+                pending = set(futures)
+                cancelled = (lambda: cancel.is_set()) if cancel is not None else (lambda: False)
+                while pending and not cancelled():
+                    done, pending = wait(pending, timeout=BATCH_CANCEL_POLL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if cancelled():
+                            return
+                        yield futures[future], future.result()
+            finally:
+                # Cancelled or closed: drop questions not started yet, finish
+                # running ones before the snapshot is unpinned
+                pool.shutdown(wait=True, cancel_futures=True)
+    
     def get_response(self, query: str, mode: str = "fixed") -> str:
         """
         Get response from ZenBot
@@ -78,22 +230,62 @@ class ZenBotService:
         Returns:
             Bot response string
         """
-        if not self.initialized or not run_query:
-            return "ZenBot is currently unavailable. Please check configuration and ensure GEMINI_API_KEY is set."
+        return self.answer(query, mode)["answer"]
+    
+    def export_trace(self, result: Dict, evaluation: Dict = None) -> bool:
+        """
+        Sample and queue the trace of an answer() result; never blocks
         
-        try:
-            # Use zenbot's run_query function with tracer for LangSmith integration
-            result = run_query(query, version=mode, tracer=self.tracer)
-            return result.get("answer", "No response generated")
-            
-        except Exception as e:
-            print(f"Error getting response: {e}")
-            return f"I encountered an error processing your request: {str(e)}"
+        Errors, low scores and the buggy path are always kept (within their
+        per-minute budget); other traffic is head-sampled per mode.
+        """
+        if self.exporter is None or "trace" not in result:
+            return False
+        mode = result.get("mode", "fixed")
+        keep, reason = self.sampler.decide(mode, evaluation, result.get("error"))
+        if not keep:
+            return False
+        extra = {"sampling": reason}
+        if evaluation:
+            extra["overall_score"] = evaluation.get("overall_score")
+        if result.get("error"):
+            extra["error"] = result["error"]
+        run = trace_to_run(result["trace"], f"zenbot_{mode}", result["started"], result["ended"],
+                           project=self.project, extra=extra)
+        return self.exporter.submit(run)
+    
+    def shutdown(self):
+        """Flush pending traces and stop background threads"""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+        if self.kb is not None:
+            self.kb.stop_watcher()
+    
+    def reload_kb(self) -> Dict:
+        """Rebuild the KB snapshot now (normally done by the background watcher)"""
+        if self.kb is None:
+            return {"reloaded": False, "kb_version": None}
+        reloaded = self.kb.refresh()
+        return {"reloaded": reloaded, "kb_version": self.kb.version}
     
     def is_ready(self) -> bool:
         """Check if ZenBot is ready to serve requests"""
         return self.initialized
 
+    def llm_status(self) -> Tuple[bool, Dict]:
+        """(ok, detail) for readiness: SDK and key present, at least one circuit not open"""
+        if not self.initialized:
+            return False, {"error": "zenbot modules not available"}
+        if not (os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")):
+            return False, {"error": "GEMINI_API_KEY not set"}
+        if not self.warmed_up.is_set():
+            # Don't import the SDK on a probe; warm-up does it
+            return False, {"error": "LLM clients not created yet"}
+        if chat_model_class() is None:
+            return False, {"error": "langchain-google-genai not installed"}
+        circuits = llm_health()
+        return any(state != "open" for state in circuits.values()), {"circuits": circuits}
+
 
 def evaluate_response(query: str, response: str, expected: str = None) -> Dict[str, float]:
     """
@@ -105,12 +297,19 @@ def evaluate_response(query: str, response: str, expected: str = None) -> Dict[s
         expected: Expected answer (optional, for training data)
     
     Returns:
-        Dictionary with evaluation scores
+        Dictionary with evaluation scores; "ground_truth" says what they
+        were scored against ("provided", "golden" or "self")
     """
-    # For API usage without ground truth, we do heuristic evaluation
-    # In production, you'd have test cases with expected answers
+    # Without an explicit expected answer, look the query up in the golden set
+    ground_truth = {"source": "provided"} if expected else {"source": "self"}
+    if not expected and golden_index is not None:
+        match = golden_index().match(query)
+        if match is not None:
+            expected = match["expected_answer"]
+            ground_truth = {"source": "golden", "case_id": match["case_id"],
+                            "method": match["method"], "confidence": match["confidence"]}
     
-    # Use response as baseline for evaluation (self-evaluation mode)
+    # Unmatched queries fall back to heuristic self-evaluation
     eval_target = expected if expected else response
     
     try:
@@ -130,6 +329,7 @@ def evaluate_response(query: str, response: str, expected: str = None) -> Dict[s
             "pricing_accuracy": round(pricing_result["score"], 2),
             "hallucination_check": round(hallucination_result["score"], 2),
             "overall_score": round(overall, 2),
+            "ground_truth": ground_truth,
             "details": {
                 "spec_comment": spec_result["comment"],
                 "pricing_comment": pricing_result["comment"],
@@ -143,5 +343,6 @@ def evaluate_response(query: str, response: str, expected: str = None) -> Dict[s
             "pricing_accuracy": 0.0,
             "hallucination_check": 0.0,
             "overall_score": 0.0,
+            "ground_truth": ground_truth,
             "details": {"error": str(e)}
         }
@@ -0,0 +1,151 @@
+"""Off-request-path evaluation for the chat endpoints.
+
+``chat`` and ``chat_stream`` used to run ``evaluate_response`` inline, so every
+user waited on all evaluators. ``EvaluationQueue`` hands the work to a small
+pool of worker threads fed by a bounded queue: the endpoint returns at once
+with an evaluation id, and ``on_complete`` stores the scores (history, metrics,
+trace sampling) when they are ready. ``on_abandon`` gets the jobs that will
+never have scores (dropped on a full queue, or evaluator failed), so their
+traces are not lost. Finished evaluations are pushed to
+dashboard subscribers and can be fetched by id.
+"""
+import asyncio
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+class EvaluationQueue:
+    """Bounded queue + worker threads running an evaluation function."""
+
+    def __init__(self, evaluate: Callable[[str, str], Dict],
+                 on_complete: Callable[[Dict, Dict], None] = None,
+                 on_abandon: Callable[[Dict, str], None] = None,
+                 workers: int = 2, max_queue: int = 1000, max_results: int = 10000):
+        self.evaluate = evaluate
+        self.on_complete = on_complete
+        self.on_abandon = on_abandon
+        self.max_results = max_results
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_queue)
+        self._results: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers: List = []
+        self.stats = {"submitted": 0, "completed": 0, "dropped": 0, "failed": 0}
+        self._workers = [
+            threading.Thread(target=self._run, name=f"evaluator-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._workers:
+            t.start()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _remember(self, evaluation_id: str, record: Dict) -> None:
+        with self._lock:
+            self._results[evaluation_id] = record
+            self._results.move_to_end(evaluation_id)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def new_id(self) -> str:
+        """Evaluation id, unique across worker processes."""
+        return f"ev-{int(time.time())}-{os.getpid()}-{next(self._ids)}"
+
+    def submit(self, query: str, response: str, context: Dict = None,
+               evaluation_id: Optional[str] = None) -> str:
+        """Queue an evaluation and return its id immediately.
+
+        If the queue is full the evaluation is dropped (status "dropped") rather
+        than slowing down the request.
+        """
+        evaluation_id = evaluation_id or self.new_id()
+        job = {"id": evaluation_id, "query": query, "response": response,
+               "context": context or {}, "submitted": time.time()}
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            self._remember(evaluation_id, {"status": "dropped", "evaluation": None})
+            self._abandon(job, "dropped")
+            return evaluation_id
+        self.stats["submitted"] += 1
+        self._remember(evaluation_id, {"status": "pending", "evaluation": None})
+        return evaluation_id
+
+    def get(self, evaluation_id: str) -> Optional[Dict]:
+        """Status and scores of an evaluation, or None if unknown/expired."""
+        with self._lock:
+            record = self._results.get(evaluation_id)
+            return dict(record) if record is not None else None
+
+    def _abandon(self, job: Dict, reason: str) -> None:
+        if self.on_abandon is None:
+            return
+        try:
+            self.on_abandon(job, reason)
+        except Exception as e:
+            print(f"Error handling {reason} evaluation: {e}")
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            evaluation = None
+            try:
+                evaluation = self.evaluate(job["query"], job["response"])
+                if self.on_complete is not None:
+                    self.on_complete(job, evaluation)
+                self._remember(job["id"], {"status": "done", "evaluation": evaluation})
+                self.stats["completed"] += 1
+                self._publish({"type": "evaluation", "evaluation_id": job["id"],
+                               "conversation_id": job["context"].get("conversation_id"),
+                               "evaluation": evaluation})
+            except Exception as e:
+                print(f"Error in background evaluation: {e}")
+                self.stats["failed"] += 1
+                self._remember(job["id"], {"status": "failed", "evaluation": None, "error": str(e)})
+                if evaluation is None:
+                    # The evaluator itself failed, so on_complete never ran
+                    self._abandon(job, "failed")
+
+    # -- dashboard push --------------------------------------------------------
+
+    def subscribe(self) -> "asyncio.Queue":
+        """Register an asyncio queue that receives completed evaluations."""
+        q: asyncio.Queue = asyncio.Queue(maxsize=100)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.append((loop, q))
+        return q
+
+    def unsubscribe(self, q: "asyncio.Queue") -> None:
+        with self._lock:
+            self._subscribers = [(l, s) for l, s in self._subscribers if s is not q]
+
+    def _publish(self, event: Dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, q in subscribers:
+            def _put(q=q):
+                if not q.full():
+                    q.put_nowait(event)
+            try:
+                loop.call_soon_threadsafe(_put)
+            except RuntimeError:
+                # Subscriber's loop is gone
+                self.unsubscribe(q)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Let workers finish queued evaluations, then stop them."""
+        for _ in self._workers:
+            self._queue.put(None)
+        for t in self._workers:
+            t.join(timeout)
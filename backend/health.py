@@ -0,0 +1,92 @@
+"""Liveness and readiness checks for the API.
+
+``/api/health`` only said whether ``run_query`` was importable, so a worker
+still warming up, with every LLM circuit open, or with a full admission queue
+reported healthy and kept receiving traffic it could not serve quickly.
+
+- Liveness (``/api/health/live``): the process and its event loop respond.
+  Never depends on anything else, so a slow dependency does not get the
+  worker restarted.
+- Readiness (``/api/health/ready``): every registered check passes. Checks are
+  cheap in-process reads (KB snapshot loaded, warm-up done, circuit states,
+  queue depth) except *cached* checks such as the LLM endpoint probe: those
+  run on a background thread at most every ``ttl`` seconds and readiness reads
+  the last result, so a readiness poll never waits on the network.
+"""
+import socket
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+CheckResult = Tuple[bool, object]
+
+
+def tcp_probe(host: str, port: int, timeout: float = 2.0) -> CheckResult:
+    """Can a TCP connection to host:port be opened (DNS + connect, no request)?"""
+    started = time.monotonic()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+    except OSError as e:
+        return False, f"{host}:{port} unreachable ({e})"
+    return True, f"{host}:{port} reachable in {(time.monotonic() - started) * 1000:.0f} ms"
+
+
+class ReadinessProbe:
+    """Named checks returning (ok, detail); cached checks refresh in the background."""
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._checks: Dict[str, Callable[[], CheckResult]] = {}
+        self._cached: Dict[str, Callable[[], CheckResult]] = {}
+        self._results: Dict[str, Tuple[float, bool, object]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, check: Callable[[], CheckResult], cached: bool = False) -> None:
+        (self._cached if cached else self._checks)[name] = check
+
+    def _refresh(self, name: str) -> None:
+        try:
+            ok, detail = self._cached[name]()
+        except Exception as e:
+            ok, detail = False, str(e)
+        with self._lock:
+            self._results[name] = (time.monotonic(), ok, detail)
+            self._refreshing.discard(name)
+
+    def refresh(self, name: str = None, wait: bool = False) -> None:
+        """Start refreshing one (or every) cached check; ``wait`` blocks until done."""
+        threads = []
+        for key in ([name] if name else list(self._cached)):
+            with self._lock:
+                if key in self._refreshing:
+                    continue
+                self._refreshing.add(key)
+            thread = threading.Thread(target=self._refresh, args=(key,), name=f"probe-{key}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def status(self) -> Dict:
+        """{"ready", "checks": {name: {"ok", "detail"[, "age"]}}} without blocking."""
+        checks = {}
+        for name, check in self._checks.items():
+            try:
+                ok, detail = check()
+            except Exception as e:
+                ok, detail = False, str(e)
+            checks[name] = {"ok": ok, "detail": detail}
+        now = time.monotonic()
+        for name in self._cached:
+            with self._lock:
+                result = self._results.get(name)
+            if result is None or now - result[0] > self.ttl:
+                self.refresh(name)
+            if result is None:
+                checks[name] = {"ok": False, "detail": "probe pending"}
+            else:
+                checks[name] = {"ok": result[1], "detail": result[2], "age": round(now - result[0], 1)}
+        return {"ready": all(c["ok"] for c in checks.values()), "checks": checks}
@@ -1,34 +1,34 @@
 """FastAPI backend for ZenBot POC with streaming support"""
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 import json
 import asyncio
-from datetime import datetime
+import time
+from datetime import date, datetime, timedelta
 import sys
 import os
-from dotenv import load_dotenv
+import threading
 from pathlib import Path
 
-# Load environment variables from parent directory .env file FIRST
-env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
-
-# Explicitly ensure critical env vars are in os.environ
-# This is needed because some libraries check os.environ directly
-if not os.environ.get("LANGSMITH_API_KEY"):
-    from dotenv import dotenv_values
-    env_vars = dotenv_values(env_path)
-    for key in ["LANGSMITH_API_KEY", "LANGSMITH_PROJECT", "LANGCHAIN_TRACING_V2", "GEMINI_API_KEY", "GOOGLE_API_KEY"]:
-        if key in env_vars and not os.environ.get(key):
-            os.environ[key] = env_vars[key]
-
 # Add parent directory to path to import zenbot
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Environment (.env) is loaded once, before anything reads it
+from config import load_env
+
+load_env()
+
 from api_service import ZenBotService, evaluate_response
+from admission import AdmissionController, AdmissionRejected
+from eval_queue import EvaluationQueue
+from shared_store import DEFAULT_ROLLUP_DAYS, HISTORY_FIELDS, METRIC_FIELDS, create_store
+from timeseries import DOWNSAMPLERS, RESOLUTION_SECONDS, timeseries
+from health import ReadinessProbe, tcp_probe
+from sse import StreamRegistry, event_stream, parse_event_id
+from conversation_memory import new_memory, remember
 from evaluators import spec_accuracy_evaluator, pricing_evaluator, hallucination_detector
 
 app = FastAPI(title="ZenBot API", version="1.0.0")
@@ -40,19 +40,188 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stream-ID", "Retry-After"],
 )
 
 # Initialize ZenBot service
 zenbot = ZenBotService()
 
-# In-memory storage for demo (use DB in production)
-conversation_history: List[Dict] = []
-metrics_history: List[Dict] = []
+# Chat requests pass admission control; health and metrics endpoints never do
+admission = AdmissionController.from_env()
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def client_id(request: Request) -> str:
+    """Rate-limit key: client address, or what a trusted proxy says (ZENBOT_TRUSTED_PROXIES)"""
+    return admission.client_key(request.client.host if request.client else None, request.headers)
+
+
+# History and metrics live in a store shared by all workers (ZENBOT_STORE_URL)
+store = create_store()
+
+# Per-worker cache of the metrics summary, valid while the store generation holds
+_metrics_cache: Dict = {"generation": None, "summary": None}
+
+
+def store_evaluation(job: Dict, evaluation: Dict):
+    """Called by an evaluation worker once scores are ready"""
+    # Trace sampling needs the scores, so export happens here too (first, so a
+    # store error cannot lose the trace)
+    zenbot.export_trace(job["context"]["result"], evaluation)
+    entry = job["context"]["entry"]
+    store.set_evaluation(entry["id"], evaluation)
+    store.add_metric({
+        "timestamp": entry["timestamp"],
+        "mode": entry["mode"],
+        **evaluation
+    })
+
+
+def export_unscored_trace(job: Dict, reason: str):
+    """Evaluation dropped or failed: export the trace without scores
+    
+    Tail sampling still keeps errors and the buggy path, the traces that must
+    never be lost under load.
+    """
+    zenbot.export_trace(job["context"]["result"])
+
+
+# Evaluators run on worker threads, off the request path
+evaluations = EvaluationQueue(
+    evaluate_response,
+    on_complete=store_evaluation,
+    on_abandon=export_unscored_trace,
+    workers=int(os.environ.get("ZENBOT_EVAL_WORKERS", "2")),
+    max_queue=int(os.environ.get("ZENBOT_EVAL_QUEUE", "1000")),
+)
+
+
+# Readiness: cheap in-process checks plus a cached LLM endpoint probe
+READY_MAX_WAITING = int(os.environ.get("ZENBOT_READY_MAX_WAITING", str(max(1, admission.max_queue // 2))))
+readiness = ReadinessProbe(ttl=float(os.environ.get("ZENBOT_READY_PROBE_SECONDS", "30")))
+readiness.add("zenbot", lambda: (zenbot.initialized, "modules loaded" if zenbot.initialized else "modules missing"))
+readiness.add("warm_up", lambda: (zenbot.warmed_up.is_set(), "done" if zenbot.warmed_up.is_set() else "running"))
+readiness.add("kb", lambda: (zenbot.kb_version is not None, zenbot.kb_version or "not loaded"))
+readiness.add("llm", zenbot.llm_status)
+readiness.add("queue", lambda: (admission.waiting <= READY_MAX_WAITING, {
+    "waiting": admission.waiting, "in_flight": admission.in_flight, "max_waiting": READY_MAX_WAITING,
+    "evaluations_queued": evaluations.depth,
+}))
+_probe_address = os.environ.get("ZENBOT_LLM_PROBE_ADDRESS", "generativelanguage.googleapis.com:443")
+if _probe_address:
+    _probe_host, _, _probe_port = _probe_address.rpartition(":")
+    readiness.add("llm_endpoint", lambda: tcp_probe(_probe_host, int(_probe_port)), cached=True)
+
+
+# Retention: whole days are dropped past the age or size limit (0 disables
+# one); daily rollups keep the long-term metrics
+RETENTION_DAYS = int(os.environ.get("ZENBOT_RETENTION_DAYS", "90"))
+RETENTION_MAX_CONVERSATIONS = int(os.environ.get("ZENBOT_RETENTION_MAX_CONVERSATIONS", "0"))
+RETENTION_INTERVAL = float(os.environ.get("ZENBOT_RETENTION_INTERVAL", "3600"))
+ROLLUP_DAYS = {
+    "1m": int(os.environ.get("ZENBOT_ROLLUP_MINUTE_DAYS", str(DEFAULT_ROLLUP_DAYS["1m"]))),
+    "1h": int(os.environ.get("ZENBOT_ROLLUP_HOUR_DAYS", str(DEFAULT_ROLLUP_DAYS["1h"]))),
+}
+_retention_stop = threading.Event()
+
+
+def apply_retention() -> Dict:
+    result = store.compact(RETENTION_DAYS, RETENTION_MAX_CONVERSATIONS, rollup_days=ROLLUP_DAYS)
+    if result["dropped_days"]:
+        print(f"🧹 Retention dropped {len(result['dropped_days'])} day(s), "
+              f"{result['conversations_removed']} conversations")
+    return result
+
+
+def retention_loop():
+    """Compact once at startup, then every RETENTION_INTERVAL seconds"""
+    while True:
+        try:
+            apply_retention()
+        except Exception as e:
+            print(f"⚠️  Retention run failed: {e}")
+        if _retention_stop.wait(RETENTION_INTERVAL):
+            return
+
+
+@app.on_event("startup")
+def start_warm_up():
+    """Warm caches and clients in the background; the port is bound right away"""
+    threading.Thread(target=zenbot.warm_up, name="zenbot-warm-up", daemon=True).start()
+    readiness.refresh()
+    if RETENTION_DAYS or RETENTION_MAX_CONVERSATIONS or any(ROLLUP_DAYS.values()):
+        threading.Thread(target=retention_loop, name="zenbot-retention", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def shutdown_zenbot():
+    """Finish queued evaluations and flush traces before the worker exits"""
+    _retention_stop.set()
+    evaluations.shutdown()
+    zenbot.shutdown()
+
+
+def record_conversation(query: str, response: str, mode: str, result: Dict) -> Dict:
+    """Store a conversation and queue its evaluation; returns the history entry"""
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "query": query,
+        "response": response,
+        "mode": mode,
+        "kb_version": result["kb_version"],
+        "evaluation_id": evaluations.new_id(),
+        "evaluation": None
+    }
+    # Stored before queueing, so the evaluation worker always finds the row
+    store.add_conversation(entry)
+    evaluations.submit(
+        query, response, context={"entry": entry, "result": result, "conversation_id": entry["id"]},
+        evaluation_id=entry["evaluation_id"]
+    )
+    return entry
+
+
+def load_session(session_id: Optional[str]) -> Optional[Dict]:
+    """Conversation memory for a session id (fresh if unknown); None when stateless"""
+    if not session_id:
+        return None
+    return store.get_session(session_id) or new_memory()
+
+
+def save_session(session_id: Optional[str], memory: Optional[Dict], query: str, result: Dict):
+    """Add the answered turn to the session memory; failed answers are not remembered"""
+    if not session_id or result.get("error"):
+        return
+    resolved = result.get("trace", {}).get("resolved_question") or query
+    store.put_session(session_id, remember(memory, query, resolved, result["answer"]))
 
 
 class ChatRequest(BaseModel):
     message: str
     mode: str = "fixed"  # "fixed" or "buggy"
+    session_id: Optional[str] = None  # enables follow-up questions within a session
+
+
+class BatchRequest(BaseModel):
+    questions: List[str]
+    mode: str = "fixed"  # "fixed" or "buggy"
+
+
+BATCH_MAX_QUESTIONS = int(os.environ.get("ZENBOT_BATCH_MAX_QUESTIONS", "100"))
+BATCH_CONCURRENCY = int(os.environ.get("ZENBOT_BATCH_CONCURRENCY", "4"))
+# Pause between simulated tokens in /api/chat/stream (0 sends the answer at once)
+STREAM_WORD_DELAY = float(os.environ.get("ZENBOT_STREAM_WORD_DELAY", "0.05"))
+HISTORY_MAX_LIMIT = int(os.environ.get("ZENBOT_HISTORY_MAX_LIMIT", "500"))
+# Buffered /api/chat/stream answers of this worker, for reconnects
+streams = StreamRegistry()
 
 
 class EvaluationResponse(BaseModel):
@@ -72,91 +241,251 @@ async def root():
         "endpoints": [
             "/api/chat",
             "/api/chat/stream",
+            "/api/chat/stream/{stream_id}",
+            "/api/chat/batch",
             "/api/evaluate",
+            "/api/evaluations/{evaluation_id}",
             "/api/metrics",
-            "/api/history"
+            "/api/metrics/stream",
+            "/api/metrics/timeseries",
+            "/api/history",
+            "/api/history/partitions",
+            "/api/history/compact",
+            "/api/kb/reload",
+            "/api/health/live",
+            "/api/health/ready"
         ]
     }
 
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """Non-streaming chat endpoint"""
     try:
-        response = zenbot.get_response(request.message, mode=request.mode)
-        
-        # Evaluate the response
-        evaluation = evaluate_response(request.message, response)
+        memory = load_session(request.session_id)
+        async with admission.slot(client_id(http_request)):
+            # Off the event loop, so health checks stay responsive while queries run
+            result = await asyncio.to_thread(zenbot.answer, request.message, request.mode, memory)
+        response = result["answer"]
+        save_session(request.session_id, memory, request.message, result)
         
-        # Store in history
-        entry = {
-            "id": len(conversation_history) + 1,
-            "timestamp": datetime.now().isoformat(),
-            "query": request.message,
-            "response": response,
-            "mode": request.mode,
-            "evaluation": evaluation
-        }
-        conversation_history.append(entry)
-        metrics_history.append({
-            "timestamp": entry["timestamp"],
-            **evaluation
-        })
+        # Store in history; the evaluation runs in the background
+        entry = record_conversation(request.message, response, request.mode, result)
         
         return {
             "response": response,
-            "evaluation": evaluation,
-            "conversation_id": entry["id"]
+            "evaluation": None,
+            "evaluation_id": entry["evaluation_id"],
+            "evaluation_status": "pending",
+            "conversation_id": entry["id"],
+            "session_id": request.session_id,
+            "kb_version": result["kb_version"]
         }
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/chat/stream")
-async def chat_stream(request: ChatRequest):
-    """Streaming chat endpoint with Server-Sent Events"""
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Streaming chat endpoint with Server-Sent Events (see sse.py for framing)
+    
+    The answer is produced on a background task into a per-stream buffer; a
+    client that reconnects with ``Last-Event-ID`` resumes from there instead
+    of paying for the LLM call again.
+    """
+    resume = parse_event_id(http_request.headers.get("last-event-id"))
+    if resume and streams.get(resume[0]):
+        return await resume_chat_stream(resume[0], http_request)
+    memory = load_session(request.session_id)
+    # Admitted before the response starts so 429/503 stay status codes; the
+    # slot covers the LLM call only, replaying tokens needs no quota
+    release = admission.releaser(await admission.acquire(client_id(http_request)))
     
     async def event_generator():
         try:
-            # Stream the response token by token
-            full_response = ""
-            response_text = zenbot.get_response(request.message, mode=request.mode)
-            
-            # Simulate streaming by splitting into words
-            words = response_text.split()
-            for i, word in enumerate(words):
-                full_response += word + " "
-                
-                # Send each word as a chunk
-                yield f"data: {json.dumps({'type': 'token', 'content': word + ' '})}\n\n"
-                await asyncio.sleep(0.05)  # Small delay for visual effect
+            try:
+                # Heartbeats keep the connection open while this runs
+                result = await asyncio.to_thread(zenbot.answer, request.message, request.mode, memory)
+            finally:
+                release()
+            save_session(request.session_id, memory, request.message, result)
+            words = result["answer"].split()
             
-            # Evaluate the full response
-            evaluation = evaluate_response(request.message, full_response.strip())
+            # Store and queue the evaluation now so it runs while tokens stream
+            entry = record_conversation(request.message, " ".join(words), request.mode, result)
             
-            # Send evaluation
-            yield f"data: {json.dumps({'type': 'evaluation', 'content': evaluation})}\n\n"
+            # Simulated token stream; sse.frames coalesces words into fewer frames
+            for word in words:
+                yield word + " "
+                if STREAM_WORD_DELAY:
+                    await asyncio.sleep(STREAM_WORD_DELAY)
             
-            # Store in history
-            entry = {
-                "id": len(conversation_history) + 1,
-                "timestamp": datetime.now().isoformat(),
-                "query": request.message,
-                "response": full_response.strip(),
-                "mode": request.mode,
-                "evaluation": evaluation
-            }
-            conversation_history.append(entry)
-            metrics_history.append({
-                "timestamp": entry["timestamp"],
-                **evaluation
-            })
+            # Send the evaluation if it is already done, otherwise its id to poll
+            status = evaluations.get(entry["evaluation_id"]) or {}
+            if status.get("status") == "done":
+                yield {"type": "evaluation", "content": status["evaluation"]}
+            else:
+                yield {"type": "evaluation_pending", "evaluation_id": entry["evaluation_id"]}
             
             # Send completion
-            yield f"data: {json.dumps({'type': 'done', 'conversation_id': entry['id']})}\n\n"
+            yield {"type": "done", "conversation_id": entry["id"], "kb_version": result["kb_version"]}
             
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+            yield {"type": "error", "content": str(e)}
+    
+    stream = streams.start(event_generator())
+    # An evicted stream's task can be cancelled before the generator ever
+    # runs, and then its finally never does
+    stream.task.add_done_callback(lambda task: release())
+    return event_stream(stream.follow(), http_request.headers.get("accept-encoding"),
+                        {"X-Stream-ID": stream.id})
+
+
+@app.get("/api/chat/stream/{stream_id}")
+async def resume_chat_stream(stream_id: str, http_request: Request):
+    """Replay a stream's frames after ``Last-Event-ID``, then follow it live"""
+    stream = streams.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired stream id")
+    resume = parse_event_id(http_request.headers.get("last-event-id"))
+    after = resume[1] if resume and resume[0] == stream_id else -1
+    return event_stream(stream.follow(after), http_request.headers.get("accept-encoding"),
+                        {"X-Stream-ID": stream.id})
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """StreamingResponse that frees its admission slot once sent, even if the body never started."""
+
+    def __init__(self, content, admitted: float, **kwargs):
+        super().__init__(content, **kwargs)
+        self.admitted = admitted
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            admission.release(self.admitted)
+
+
+def _close_batch(results):
+    try:
+        results.close()
+    except ValueError:
+        # Still running on another thread; it sees the cancel event and ends
+        pass
+
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchRequest, http_request: Request):
+    """Answer many questions in one request, streamed back as NDJSON in completion order"""
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+
+    # One admission slot for the whole batch; its generation runs on
+    # BATCH_CONCURRENCY threads of its own
+    admitted = await admission.acquire(client_id(http_request))
+    started = time.monotonic()
+
+    cancel = threading.Event()
+
+    async def line_generator():
+        results = zenbot.answer_batch(request.questions, request.mode, BATCH_CONCURRENCY, cancel)
+        documents: Dict[str, Dict] = {}
+        kb_version = None
+        try:
+            while True:
+                item = await asyncio.to_thread(next, results, None)
+                if item is None:
+                    break
+                indexes, result = item
+                kb_version = result["kb_version"]
+                question = request.questions[indexes[0]]
+                entry = record_conversation(question, result["answer"], request.mode, result)
+                trace = result.get("trace", {})
+                # Shared documents are listed once, in the final line
+                doc_ids = []
+                for d in trace.get("retrieved_documents", []):
+                    doc_ids.append(d["id"])
+                    documents.setdefault(d["id"], {"title": d.get("title"), **{
+                        k: d.get("metadata", {}).get(k) for k in ("source", "date")}})
+                for i in indexes:
+                    yield json.dumps({
+                        "type": "result",
+                        "index": i,
+                        "question": request.questions[i],
+                        "response": result["answer"],
+                        "answer_source": trace.get("answer_source"),
+                        "documents": doc_ids,
+                        "evaluation_id": entry["evaluation_id"],
+                        "conversation_id": entry["id"],
+                        "error": result.get("error"),
+                    }, ensure_ascii=False) + "\n"
+            yield json.dumps({
+                "type": "done",
+                "questions": len(request.questions),
+                "documents": documents,
+                "kb_version": kb_version,
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+            }, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "content": str(e)}) + "\n"
+        finally:
+            # Client gone or batch over: the batch stops at its next check.
+            # Closing it from here could hit "generator already executing"
+            # (a worker thread may still be inside next()), so a thread
+            # closes it only if it is suspended at a yield
+            cancel.set()
+            threading.Thread(target=_close_batch, args=(results,), name="batch-close", daemon=True).start()
+
+    # The slot is freed when the response is over, not in line_generator:
+    # a client that disconnects before the body starts never runs it
+    return AdmittedStreamingResponse(line_generator(), admitted, media_type="application/x-ndjson")
+
+
+@app.get("/api/evaluations/{evaluation_id}")
+async def get_evaluation(evaluation_id: str):
+    """Status and scores of a background evaluation"""
+    # Queued on this worker, or stored by any worker
+    status = evaluations.get(evaluation_id) or store.get_evaluation(evaluation_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired evaluation id")
+    return {"evaluation_id": evaluation_id, **status}
+
+
+@app.get("/api/metrics/stream")
+async def metrics_stream():
+    """Server-Sent Events feed of completed evaluations for the dashboard
+    
+    Evaluations finished by this worker are pushed directly; changes made by
+    other workers are noticed through the shared store generation.
+    """
+    
+    async def event_generator():
+        q = evaluations.subscribe()
+        generation = store.generation()
+        idle = 0.0
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=2)
+                    generation = store.generation()
+                    yield f"data: {json.dumps(event)}\n\n"
+                except asyncio.TimeoutError:
+                    current = store.generation()
+                    if current != generation:
+                        generation, idle = current, 0.0
+                        yield f"data: {json.dumps({'type': 'metrics_changed'})}\n\n"
+                    else:
+                        idle += 2
+                        if idle >= 15:
+                            idle = 0.0
+                            yield ": keep-alive\n\n"
+        finally:
+            evaluations.unsubscribe(q)
     
     return StreamingResponse(
         event_generator(),
@@ -171,7 +500,13 @@ async def chat_stream(request: ChatRequest):
 @app.get("/api/metrics")
 async def get_metrics():
     """Get aggregated metrics"""
-    if not metrics_history:
+    generation = store.generation()
+    if _metrics_cache["generation"] != generation:
+        _metrics_cache["summary"] = store.metrics_summary(recent=10)
+        _metrics_cache["generation"] = generation
+    summary = _metrics_cache["summary"]
+    
+    if not summary["total"]:
         return {
             "total_queries": 0,
             "avg_spec_accuracy": 0,
@@ -181,50 +516,161 @@ async def get_metrics():
             "recent_metrics": []
         }
     
-    # Calculate averages
-    total = len(metrics_history)
-    avg_spec = sum(m["spec_accuracy"] for m in metrics_history) / total
-    avg_pricing = sum(m["pricing_accuracy"] for m in metrics_history) / total
-    avg_hallucination = sum(m["hallucination_check"] for m in metrics_history) / total
-    avg_overall = sum(m["overall_score"] for m in metrics_history) / total
-    
     return {
-        "total_queries": total,
-        "avg_spec_accuracy": round(avg_spec, 2),
-        "avg_pricing_accuracy": round(avg_pricing, 2),
-        "avg_hallucination_check": round(avg_hallucination, 2),
-        "avg_overall_score": round(avg_overall, 2),
-        "recent_metrics": metrics_history[-10:]  # Last 10 queries
+        "total_queries": summary["total"],
+        "avg_spec_accuracy": round(summary["avg_spec_accuracy"], 2),
+        "avg_pricing_accuracy": round(summary["avg_pricing_accuracy"], 2),
+        "avg_hallucination_check": round(summary["avg_hallucination_check"], 2),
+        "avg_overall_score": round(summary["avg_overall_score"], 2),
+        "recent_metrics": summary["recent"]  # Last 10 queries
     }
 
 
+def local_time(value: str) -> datetime:
+    """Parse an ISO timestamp as naive local time, the way history and rollups store it
+    
+    Timezone-aware values (``...Z`` from ``Date.toISOString()``, ``+05:30``)
+    are converted; ValueError if malformed.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+@app.get("/api/metrics/timeseries")
+async def get_metrics_timeseries(since: Optional[str] = None, until: Optional[str] = None, points: int = 200,
+                                 resolution: Optional[str] = None, mode: Optional[str] = None,
+                                 method: str = "lttb", metric: str = "overall_score"):
+    """Per-mode metric series from 1m/1h/1d rollups, downsampled to ``points``
+    
+    Defaults to the last 7 days. ``resolution`` is picked from the range unless
+    given; ``method`` is ``lttb`` or ``minmax`` and ``metric`` the score the
+    downsampling preserves.
+    """
+    if resolution is not None and resolution not in RESOLUTION_SECONDS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RESOLUTION_SECONDS)}")
+    if method not in DOWNSAMPLERS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(DOWNSAMPLERS)}")
+    if metric not in METRIC_FIELDS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(METRIC_FIELDS)}")
+    try:
+        end = local_time(until) if until else datetime.now()
+        start = local_time(since) if since else end - timedelta(days=7)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await asyncio.to_thread(
+        timeseries, store, start, end, max(3, min(points, 5000)), resolution, mode, method, metric, ROLLUP_DAYS
+    )
+
+
 @app.get("/api/history")
-async def get_history(limit: int = 10):
-    """Get conversation history"""
+async def get_history(limit: int = 10, cursor: Optional[str] = None, mode: Optional[str] = None,
+                      min_score: Optional[float] = None, max_score: Optional[float] = None,
+                      since: Optional[str] = None, until: Optional[str] = None,
+                      q: Optional[str] = None, fields: Optional[str] = None):
+    """Conversation history, newest first, one page at a time
+    
+    Pass ``next_cursor`` back as ``cursor`` for the next page. ``since``/``until``
+    are ISO dates or timestamps, ``q`` searches question and answer text and
+    ``fields`` is a comma-separated projection (e.g. ``id,query,evaluation``).
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    unknown = set(field_list or ()) - set(HISTORY_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    try:
+        since, until = [local_time(t).isoformat() if t else None for t in (since, until)]
+        page = await asyncio.to_thread(
+            store.query_conversations, max(1, min(limit, HISTORY_MAX_LIMIT)), cursor=cursor, mode=mode,
+            min_score=min_score, max_score=max_score, since=since, until=until, search=q, fields=field_list,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"total": store.conversation_count(), **page}
+
+
+@app.delete("/api/history")
+async def clear_history(before: Optional[str] = None):
+    """Drop the days before ``before`` (YYYY-MM-DD), or clear everything without it"""
+    if before is None:
+        store.clear()
+        return {"message": "History cleared successfully"}
+    try:
+        cutoff = date.fromisoformat(before).isoformat()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    days = [p["day"] for p in store.partitions() if p["day"] < cutoff]
+    removed = await asyncio.to_thread(store.drop_partitions, days)
+    return {"message": f"Dropped {len(days)} day(s) of history", "dropped_days": days,
+            "conversations_removed": removed}
+
+
+@app.get("/api/history/partitions")
+async def get_history_partitions():
+    """Stored days with their sizes, and the retention policy applied to them"""
+    partitions = store.partitions()
     return {
-        "total": len(conversation_history),
-        "conversations": conversation_history[-limit:]
+        "partitions": partitions,
+        "conversations": sum(p["conversations"] for p in partitions),
+        "retention": {"max_age_days": RETENTION_DAYS, "max_conversations": RETENTION_MAX_CONVERSATIONS,
+                      "interval_seconds": RETENTION_INTERVAL},
     }
 
 
-@app.delete("/api/history")
-async def clear_history():
-    """Clear conversation history"""
-    conversation_history.clear()
-    metrics_history.clear()
-    return {"message": "History cleared successfully"}
+@app.post("/api/history/compact")
+async def compact_history():
+    """Apply the retention policy now instead of waiting for the next run"""
+    return await asyncio.to_thread(apply_retention)
+
+
+@app.post("/api/kb/reload")
+async def reload_kb():
+    """Swap in the latest KB index generation without restarting"""
+    return await asyncio.to_thread(zenbot.reload_kb)
 
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (summary; probes should use /live and /ready)"""
+    status = readiness.status()
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "zenbot_ready": zenbot.is_ready()
+        "zenbot_ready": status["ready"],
+        "checks": status["checks"],
+        "kb_version": zenbot.kb_version,
+        "admission": admission.snapshot(),
+        "buffered_streams": len(streams)
     }
 
 
+@app.get("/api/health/live")
+async def liveness_check():
+    """Liveness: the process and event loop respond; no dependency checks"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/api/health/ready")
+async def readiness_check():
+    """Readiness: 200 only when this worker can serve chat requests quickly, else 503"""
+    status = readiness.status()
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content={"status": "ready" if status["ready"] else "not_ready",
+                 "timestamp": datetime.now().isoformat(), **status},
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    workers = int(os.environ.get("ZENBOT_WORKERS", "1"))
+    if workers > 1:
+        # Workers must share history/metrics; default to a SQLite store next to the repo
+        if os.environ.get("ZENBOT_STORE_URL", "memory://").startswith("memory://"):
+            db_path = Path(__file__).parent.parent / "zenbot_state.db"
+            os.environ["ZENBOT_STORE_URL"] = f"sqlite:///{db_path}"
+            print(f"ℹ️  {workers} workers: sharing history via {os.environ['ZENBOT_STORE_URL']}")
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, log_level="info", workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
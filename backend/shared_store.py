@@ -0,0 +1,770 @@
+"""Conversation history and metrics storage shared by API workers.
+
+With one uvicorn process, history and metrics could live in module globals.
+With several workers (``uvicorn --workers N`` or gunicorn with
+``UvicornWorker``) every process would hold its own slice, so the dashboard
+showed whichever worker answered. All reads and writes now go through a
+``HistoryStore``:
+
+- ``MemoryStore``: process-local lists, the default for a single worker
+- ``SQLiteStore``: one SQLite file in WAL mode, shared by all workers on a host
+  (readers never block the writer, writers serialize on a short lock)
+- ``RemoteStore``: placeholder for a networked backend (Redis, Postgres) when
+  workers run on several nodes
+
+The store also holds per-session conversation memory (conversation_memory.py).
+Sessions idle for longer than ``session_ttl`` seconds are dropped, and past
+``max_sessions`` the least recently used ones are evicted. Session writes do
+not bump the generation, since they change no history or metrics.
+
+``query_conversations`` pages through history newest first with a keyset
+cursor (the last id returned, so a page costs the same however deep it is)
+and filters server-side by mode, overall score, time window and text. The
+SQLite store keeps those as indexed columns next to the JSON entry and
+searches question and answer text through a contentless FTS5 index;
+``fields`` trims each entry to what the caller needs. Search has the same
+semantics on every backend: each whole word of the search text (split and
+lowercased like FTS5's unicode61 tokenizer, see ``search_words``) must occur
+as a word in the question or the answer.
+
+History is partitioned by day (the date of the entry's timestamp) for
+retention: ``compact`` drops whole days older than ``max_age_days`` and then
+the oldest complete days while more than ``max_conversations`` are stored.
+Rollups per mode (conversation and evaluation counts, score sums) are kept
+at three resolutions, per minute, hour and day (buckets are prefixes of the
+ISO timestamp), and updated on every write. Retention never touches daily
+rollups, so long-term averages and trends survive the raw conversations;
+minute and hour rollups are pruned after ``rollup_days`` (a week of minutes
+is ~10k rows per mode), which keeps time-series reads to a small range scan. SQLite deletes a day in short
+batches so other workers' writes are not blocked for long; freed pages are
+reused by new rows, so the file stops growing once retention is in effect.
+
+Every write bumps a ``generation`` counter stored with the data, so a worker
+can cache derived values (like the metrics summary) and recompute only when
+any worker changed something.
+
+``create_store`` picks the backend from ``ZENBOT_STORE_URL``:
+``memory://`` (default), ``sqlite:///path/to/zenbot_state.db``, or a
+``redis://``/``postgres://`` URL for ``RemoteStore``.
+"""
+import base64
+import binascii
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+METRIC_FIELDS = ("spec_accuracy", "pricing_accuracy", "hallucination_check", "overall_score")
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_SESSION_TTL = 3600.0
+# Rollup resolution -> bucket length (a prefix of the ISO timestamp)
+ROLLUP_RESOLUTIONS = {"1m": 16, "1h": 13, "1d": 10}
+# Days minute and hour rollups are kept; daily ones are kept forever
+DEFAULT_ROLLUP_DAYS = {"1m": 7, "1h": 400}
+HISTORY_FIELDS = ("id", "timestamp", "query", "response", "mode", "kb_version", "evaluation_id", "evaluation")
+# Runs of letters and digits: the tokens of SQLite FTS5's unicode61 tokenizer
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def encode_cursor(conversation_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{conversation_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Conversation id a cursor continues before; ValueError if it is not one of ours."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    prefix, _, value = raw.partition(":")
+    if prefix != "id" or not value.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return int(value)
+
+
+def search_words(text: Optional[str]) -> List[str]:
+    """Lowercased words of ``text``, as history search matches them."""
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _matches(terms: List[str], *texts: Optional[str]) -> bool:
+    """True if every term is a word of one of ``texts``."""
+    words = set()
+    for text in texts:
+        words.update(search_words(text))
+    return all(term in words for term in terms)
+
+
+def _day(timestamp: Optional[str]) -> Optional[str]:
+    return timestamp[:10] if timestamp else None
+
+
+def _next_day(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def _new_rollup(bucket: str, mode: Optional[str]) -> Dict:
+    return {"bucket": bucket, "mode": mode, "conversations": 0, "evaluated": 0,
+            **{f"sum_{field}": 0.0 for field in METRIC_FIELDS}}
+
+
+def _summary(rollups: Iterable[Dict], recent: List[Dict]) -> Dict:
+    """metrics_summary from daily rollups (all time) and the most recent raw metrics."""
+    rollups = list(rollups)
+    total = sum(r["evaluated"] for r in rollups)
+    summary = {"total": total, "recent": recent}
+    for field in METRIC_FIELDS:
+        summary[f"avg_{field}"] = (sum(r[f"sum_{field}"] for r in rollups) / total) if total else 0
+    return summary
+
+
+def _score(entry: Dict) -> Optional[float]:
+    return (entry.get("evaluation") or {}).get("overall_score")
+
+
+def _project(entry: Dict, fields: Optional[Iterable[str]]) -> Dict:
+    return dict(entry) if not fields else {f: entry.get(f) for f in fields}
+
+
+def _page(entries: List[Dict], limit: int, fields: Optional[Iterable[str]]) -> Dict:
+    """{"conversations", "next_cursor"} from up to limit + 1 newest-first entries."""
+    next_cursor = encode_cursor(entries[limit - 1]["id"]) if len(entries) > limit else None
+    return {"conversations": [_project(e, fields) for e in entries[:limit]], "next_cursor": next_cursor}
+
+
+class HistoryStore:
+    """Interface for conversation history and evaluation metrics."""
+
+    def add_conversation(self, entry: Dict) -> int:
+        """Store a conversation entry and return its id."""
+        raise NotImplementedError
+
+    def set_evaluation(self, conversation_id: int, evaluation: Dict) -> None:
+        """Attach finished scores to a stored conversation."""
+        raise NotImplementedError
+
+    def get_evaluation(self, evaluation_id: str) -> Optional[Dict]:
+        """{"status", "evaluation"} for an evaluation id, or None if unknown."""
+        raise NotImplementedError
+
+    def conversations(self, limit: int = 10) -> List[Dict]:
+        """The last ``limit`` conversations, oldest first."""
+        raise NotImplementedError
+
+    def query_conversations(self, limit: int = 10, cursor: Optional[str] = None, mode: Optional[str] = None,
+                            min_score: Optional[float] = None, max_score: Optional[float] = None,
+                            since: Optional[str] = None, until: Optional[str] = None,
+                            search: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+        """One newest-first page of matching conversations.
+
+        Returns {"conversations", "next_cursor"}; pass ``next_cursor`` back for
+        the next page (None on the last one). ``since``/``until`` are ISO
+        timestamps (until is exclusive); score bounds apply to the overall
+        score, so conversations still being evaluated never match them.
+        ``search`` matches entries where each of its words (``search_words``)
+        is a whole word of the question or the answer.
+        """
+        raise NotImplementedError
+
+    def conversation_count(self) -> int:
+        raise NotImplementedError
+
+    def add_metric(self, metric: Dict) -> None:
+        raise NotImplementedError
+
+    def metrics_summary(self, recent: int = 10) -> Dict:
+        """{"total", "avg_<field>" for each METRIC_FIELDS, "recent"}."""
+        raise NotImplementedError
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """Conversation memory of a session, or None if unknown or expired."""
+        raise NotImplementedError
+
+    def put_session(self, session_id: str, memory: Dict) -> None:
+        """Save a session's memory, evicting idle and least recently used sessions."""
+        raise NotImplementedError
+
+    def partitions(self) -> List[Dict]:
+        """Stored days, oldest first: {"day", "conversations", "metrics"}."""
+        raise NotImplementedError
+
+    def drop_partitions(self, days: Iterable[str]) -> int:
+        """Delete the conversations and metrics of ``days`` (rollups stay); returns conversations removed."""
+        raise NotImplementedError
+
+    def rollups(self, since: Optional[str] = None, until: Optional[str] = None,
+                resolution: str = "1d", mode: Optional[str] = None) -> List[Dict]:
+        """Aggregates per bucket and mode, oldest first, for buckets in [since, until).
+
+        {"bucket", "mode", "conversations", "evaluated", "sum_<field>" for each METRIC_FIELDS};
+        ``since``/``until`` are ISO timestamps, compared at the bucket's resolution;
+        ``mode`` restricts the rows to one mode.
+        """
+        raise NotImplementedError
+
+    def prune_rollups(self, resolution: str, before: str) -> int:
+        """Delete ``resolution`` rollups of buckets before ``before``; returns rows removed."""
+        raise NotImplementedError
+
+    def compact(self, max_age_days: int = 0, max_conversations: int = 0, today: Optional[str] = None,
+                rollup_days: Optional[Dict[str, int]] = None) -> Dict:
+        """Apply retention (0 disables a limit) by dropping whole days; today's is always kept.
+
+        ``rollup_days`` (default DEFAULT_ROLLUP_DAYS) bounds the finer rollups.
+        """
+        today = today or date.today().isoformat()
+        partitions = self.partitions()
+        drop = []
+        if max_age_days:
+            cutoff = (date.fromisoformat(today) - timedelta(days=max_age_days)).isoformat()
+            drop = [p for p in partitions if p["day"] < cutoff]
+        if max_conversations:
+            kept = partitions[len(drop):]
+            total = sum(p["conversations"] for p in kept)
+            for partition in kept:
+                if total <= max_conversations or partition["day"] >= today:
+                    break
+                drop.append(partition)
+                total -= partition["conversations"]
+        days = [p["day"] for p in drop]
+        removed = self.drop_partitions(days) if days else 0
+        pruned = 0
+        for resolution, keep in (DEFAULT_ROLLUP_DAYS if rollup_days is None else rollup_days).items():
+            if keep and resolution != "1d":
+                pruned += self.prune_rollups(resolution, (date.fromisoformat(today) - timedelta(days=keep)).isoformat())
+        return {"dropped_days": days, "conversations_removed": removed, "rollups_pruned": pruned}
+
+    def clear(self) -> None:
+        """Delete everything, rollups included."""
+        raise NotImplementedError
+
+    def generation(self) -> int:
+        """Counter bumped by every write, from any worker."""
+        raise NotImplementedError
+
+
+class MemoryStore(HistoryStore):
+    """Process-local store; only correct with a single worker."""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, session_ttl: float = DEFAULT_SESSION_TTL):
+        self._conversations: List[Dict] = []
+        self._metrics: List[Dict] = []
+        self._rollups: Dict[tuple, Dict] = {}
+        self._last_id = 0
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def add_conversation(self, entry: Dict) -> int:
+        with self._lock:
+            self._last_id += 1
+            entry["id"] = self._last_id
+            self._conversations.append(entry)
+            for rollup in self._roll(entry.get("timestamp"), entry.get("mode")):
+                rollup["conversations"] += 1
+            self._generation += 1
+            return entry["id"]
+
+    def set_evaluation(self, conversation_id: int, evaluation: Dict) -> None:
+        with self._lock:
+            for entry in reversed(self._conversations):
+                if entry["id"] == conversation_id:
+                    entry["evaluation"] = evaluation
+                    break
+            self._generation += 1
+
+    def get_evaluation(self, evaluation_id: str) -> Optional[Dict]:
+        with self._lock:
+            for entry in reversed(self._conversations):
+                if entry.get("evaluation_id") == evaluation_id:
+                    evaluation = entry.get("evaluation")
+                    return {"status": "done" if evaluation else "pending", "evaluation": evaluation}
+        return None
+
+    def conversations(self, limit: int = 10) -> List[Dict]:
+        with self._lock:
+            return self._conversations[-limit:]
+
+    def query_conversations(self, limit: int = 10, cursor: Optional[str] = None, mode: Optional[str] = None,
+                            min_score: Optional[float] = None, max_score: Optional[float] = None,
+                            since: Optional[str] = None, until: Optional[str] = None,
+                            search: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+        terms = search_words(search)
+        entries = []
+        with self._lock:
+            end = len(self._conversations)
+            if cursor is not None:
+                # Ids increase along the list: binary search for the cursor
+                before, lo = decode_cursor(cursor), 0
+                while lo < end:
+                    mid = (lo + end) // 2
+                    if self._conversations[mid]["id"] < before:
+                        lo = mid + 1
+                    else:
+                        end = mid
+            for entry in reversed(self._conversations[:end]):
+                score = _score(entry)
+                if mode and entry.get("mode") != mode:
+                    continue
+                if min_score is not None and (score is None or score < min_score):
+                    continue
+                if max_score is not None and (score is None or score > max_score):
+                    continue
+                if (since and entry["timestamp"] < since) or (until and entry["timestamp"] >= until):
+                    continue
+                if terms and not _matches(terms, entry.get("query"), entry.get("response")):
+                    continue
+                entries.append(entry)
+                if len(entries) > limit:
+                    break
+        return _page(entries, limit, fields)
+
+    def conversation_count(self) -> int:
+        return len(self._conversations)
+
+    def add_metric(self, metric: Dict) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+            for rollup in self._roll(metric.get("timestamp"), metric.get("mode")):
+                rollup["evaluated"] += 1
+                for field in METRIC_FIELDS:
+                    rollup[f"sum_{field}"] += metric.get(field) or 0
+            self._generation += 1
+
+    def _roll(self, timestamp: Optional[str], mode: Optional[str]) -> List[Dict]:
+        """The rollups (one per resolution) a write at ``timestamp`` counts towards."""
+        if not timestamp:
+            return []
+        rollups = []
+        for resolution, length in ROLLUP_RESOLUTIONS.items():
+            key = (resolution, timestamp[:length], mode)
+            rollups.append(self._rollups.setdefault(key, _new_rollup(*key[1:])))
+        return rollups
+
+    def metrics_summary(self, recent: int = 10) -> Dict:
+        with self._lock:
+            daily = [r for key, r in self._rollups.items() if key[0] == "1d"]
+            return _summary(daily, self._metrics[-recent:])
+
+    def partitions(self) -> List[Dict]:
+        days: Dict[str, Dict] = {}
+        with self._lock:
+            for kind, items in (("conversations", self._conversations), ("metrics", self._metrics)):
+                for item in items:
+                    day = _day(item.get("timestamp"))
+                    if day:
+                        days.setdefault(day, {"day": day, "conversations": 0, "metrics": 0})[kind] += 1
+        return [days[day] for day in sorted(days)]
+
+    def drop_partitions(self, days: Iterable[str]) -> int:
+        days = set(days)
+        with self._lock:
+            before = len(self._conversations)
+            self._conversations = [e for e in self._conversations if _day(e.get("timestamp")) not in days]
+            self._metrics = [m for m in self._metrics if _day(m.get("timestamp")) not in days]
+            self._generation += 1
+            return before - len(self._conversations)
+
+    def rollups(self, since: Optional[str] = None, until: Optional[str] = None,
+                resolution: str = "1d", mode: Optional[str] = None) -> List[Dict]:
+        length = ROLLUP_RESOLUTIONS[resolution]
+        since, until = (since or "")[:length], (until or "")[:length]
+        with self._lock:
+            rows = [dict(r) for key, r in self._rollups.items() if key[0] == resolution
+                    and r["bucket"] >= since and (not until or r["bucket"] < until)
+                    and (mode is None or r["mode"] == mode)]
+        return sorted(rows, key=lambda r: (r["bucket"], r["mode"] or ""))
+
+    def prune_rollups(self, resolution: str, before: str) -> int:
+        before = before[:ROLLUP_RESOLUTIONS[resolution]]
+        with self._lock:
+            stale = [key for key in self._rollups if key[0] == resolution and key[1] < before]
+            for key in stale:
+                del self._rollups[key]
+        return len(stale)
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None or time.time() - memory["updated"] > self.session_ttl:
+                return None
+            self._sessions.move_to_end(session_id)
+            return memory
+
+    def put_session(self, session_id: str, memory: Dict) -> None:
+        with self._lock:
+            self._sessions[session_id] = memory
+            self._sessions.move_to_end(session_id)
+            cutoff = time.time() - self.session_ttl
+            # Oldest first: stop at the first session that is neither idle nor over the limit
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if len(self._sessions) <= self.max_sessions and oldest["updated"] >= cutoff:
+                    break
+                self._sessions.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conversations.clear()
+            self._metrics.clear()
+            self._rollups.clear()
+            self._sessions.clear()
+            self._generation += 1
+
+    def generation(self) -> int:
+        return self._generation
+
+
+def _rollup_table_sql(table: str) -> str:
+    """CREATE statement for a rollup table (one row per bucket and mode)."""
+    return (f"CREATE TABLE IF NOT EXISTS {table} (bucket TEXT NOT NULL, mode TEXT NOT NULL DEFAULT '', "
+            "conversations INTEGER NOT NULL DEFAULT 0, evaluated INTEGER NOT NULL DEFAULT 0, "
+            + ", ".join(f"sum_{f} REAL NOT NULL DEFAULT 0" for f in METRIC_FIELDS)
+            + ", PRIMARY KEY (bucket, mode))")
+
+
+class SQLiteStore(HistoryStore):
+    """SQLite (WAL) store shared by every worker process on one host."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        evaluation_id TEXT,
+        data TEXT NOT NULL,
+        evaluation TEXT,
+        ts TEXT,
+        mode TEXT,
+        score REAL
+    );
+    CREATE INDEX IF NOT EXISTS conversations_evaluation_id ON conversations(evaluation_id);
+    CREATE INDEX IF NOT EXISTS conversations_mode ON conversations(mode, id);
+    CREATE INDEX IF NOT EXISTS conversations_ts ON conversations(ts);
+    CREATE INDEX IF NOT EXISTS conversations_score ON conversations(score);
+    CREATE TABLE IF NOT EXISTS metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        spec_accuracy REAL, pricing_accuracy REAL, hallucination_check REAL, overall_score REAL,
+        data TEXT NOT NULL,
+        ts TEXT
+    );
+    CREATE INDEX IF NOT EXISTS metrics_ts ON metrics(ts);
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        updated REAL NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated);
+    CREATE TABLE IF NOT EXISTS partitions (
+        day TEXT PRIMARY KEY,
+        conversations INTEGER NOT NULL DEFAULT 0,
+        metrics INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+    INSERT OR IGNORE INTO meta (key, value) VALUES ('conversations', 0);
+    """
+    # Per-bucket, per-mode rollups for each resolution
+    ROLLUP_TABLES = {"1m": "rollups_minute", "1h": "rollups_hour", "1d": "rollups"}
+    DELETE_BATCH = 2000
+
+    def __init__(self, path: str, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 session_ttl: float = DEFAULT_SESSION_TTL):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self._local = threading.local()
+        # Every worker process runs this at startup: one IMMEDIATE transaction
+        # (the write lock) creates the schema atomically; the others wait for
+        # it and find nothing to do
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._executescript(conn, self.SCHEMA)
+            for table in self.ROLLUP_TABLES.values():
+                conn.execute(_rollup_table_sql(table))
+            self.fts = self._create_fts(conn)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    @staticmethod
+    def _executescript(conn: sqlite3.Connection, script: str) -> None:
+        # executescript() would commit the open transaction first
+        for statement in script.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+
+    @staticmethod
+    def _create_fts(conn: sqlite3.Connection) -> bool:
+        """Contentless full-text index over question and answer, keyed by conversation id."""
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5("
+                         "query, response, content='', tokenize='unicode61')")
+        except sqlite3.OperationalError as e:
+            if "no such module" not in str(e):
+                raise
+            print("⚠️  SQLite has no FTS5; history search falls back to scanning question and answer")
+            return False
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (request loop and evaluation workers)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Search without FTS5: the same whole-word match as MemoryStore
+            conn.create_function("history_match", 3, lambda terms, query, response:
+                                 _matches(terms.split(), query, response), deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql: str, params=()) -> sqlite3.Cursor:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(sql, params)
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        return cursor
+
+    def add_conversation(self, entry: Dict) -> int:
+        data = {k: v for k, v in entry.items() if k not in ("id", "evaluation")}
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO conversations (evaluation_id, data, evaluation, ts, mode, score) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.get("evaluation_id"), json.dumps(data, ensure_ascii=False),
+                 json.dumps(entry["evaluation"]) if entry.get("evaluation") else None,
+                 entry.get("timestamp"), entry.get("mode"), _score(entry)),
+            )
+            if self.fts:
+                conn.execute("INSERT INTO conversations_fts (rowid, query, response) VALUES (?, ?, ?)",
+                             (cursor.lastrowid, entry.get("query"), entry.get("response")))
+            day = _day(entry.get("timestamp"))
+            if day:
+                conn.execute("INSERT INTO partitions (day, conversations) VALUES (?, 1) "
+                             "ON CONFLICT(day) DO UPDATE SET conversations = conversations + 1", (day,))
+                for resolution, table in self.ROLLUP_TABLES.items():
+                    conn.execute(f"INSERT INTO {table} (bucket, mode, conversations) VALUES (?, ?, 1) "
+                                 "ON CONFLICT(bucket, mode) DO UPDATE SET conversations = conversations + 1",
+                                 (entry["timestamp"][:ROLLUP_RESOLUTIONS[resolution]], entry.get("mode") or ""))
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key IN ('generation', 'conversations')")
+        entry["id"] = cursor.lastrowid
+        return entry["id"]
+
+    def set_evaluation(self, conversation_id: int, evaluation: Dict) -> None:
+        self._write("UPDATE conversations SET evaluation = ?, score = ? WHERE id = ?",
+                    (json.dumps(evaluation, ensure_ascii=False), evaluation.get("overall_score"),
+                     conversation_id))
+
+    def _entry(self, row) -> Dict:
+        entry = json.loads(row[1])
+        entry["id"] = row[0]
+        entry["evaluation"] = json.loads(row[2]) if row[2] else None
+        return entry
+
+    def get_evaluation(self, evaluation_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT evaluation FROM conversations WHERE evaluation_id = ?", (evaluation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        evaluation = json.loads(row[0]) if row[0] else None
+        return {"status": "done" if evaluation else "pending", "evaluation": evaluation}
+
+    def conversations(self, limit: int = 10) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT id, data, evaluation FROM conversations ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._entry(row) for row in reversed(rows)]
+
+    def query_conversations(self, limit: int = 10, cursor: Optional[str] = None, mode: Optional[str] = None,
+                            min_score: Optional[float] = None, max_score: Optional[float] = None,
+                            since: Optional[str] = None, until: Optional[str] = None,
+                            search: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+        where, params = [], []
+        terms = search_words(search)
+        source, key = "conversations c", "c.id"
+        if terms and self.fts:
+            # Walk the full-text index newest first, so common words stop at the
+            # first page instead of materializing every match
+            source, key = "conversations_fts f JOIN conversations c ON c.id = f.rowid", "f.rowid"
+            where.append("conversations_fts MATCH ?")
+            # Every word, each quoted so FTS syntax in user input is literal
+            params.append(" ".join(f'"{t}"' for t in terms))
+        for clause, value in ((f"{key} < ?", decode_cursor(cursor) if cursor else None), ("c.mode = ?", mode),
+                              ("c.score >= ?", min_score), ("c.score <= ?", max_score),
+                              ("c.ts >= ?", since), ("c.ts < ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if terms and not self.fts:
+            where.append("history_match(?, json_extract(c.data, '$.query'), json_extract(c.data, '$.response'))")
+            params.append(" ".join(terms))
+        evaluation = "c.evaluation" if not fields or "evaluation" in fields else "NULL"
+        sql = (f"SELECT c.id, c.data, {evaluation} FROM {source}"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {key} DESC LIMIT ?")
+        rows = self._connect().execute(sql, params + [limit + 1]).fetchall()
+        return _page([self._entry(row) for row in rows], limit, fields)
+
+    def conversation_count(self) -> int:
+        # Kept in meta by add_conversation/clear; COUNT(*) scans the whole table
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'conversations'").fetchone()[0]
+
+    def add_metric(self, metric: Dict) -> None:
+        scores = tuple(metric.get(f) for f in METRIC_FIELDS)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO metrics (spec_accuracy, pricing_accuracy, hallucination_check, overall_score, data, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                scores + (json.dumps(metric, ensure_ascii=False), metric.get("timestamp")),
+            )
+            day = _day(metric.get("timestamp"))
+            if day:
+                sums = ", ".join(f"sum_{f}" for f in METRIC_FIELDS)
+                conn.execute("INSERT INTO partitions (day, metrics) VALUES (?, 1) "
+                             "ON CONFLICT(day) DO UPDATE SET metrics = metrics + 1", (day,))
+                for resolution, table in self.ROLLUP_TABLES.items():
+                    conn.execute(
+                        f"INSERT INTO {table} (bucket, mode, evaluated, {sums}) VALUES (?, ?, 1, ?, ?, ?, ?) "
+                        "ON CONFLICT(bucket, mode) DO UPDATE SET evaluated = evaluated + 1, "
+                        + ", ".join(f"sum_{f} = sum_{f} + excluded.sum_{f}" for f in METRIC_FIELDS),
+                        (metric["timestamp"][:ROLLUP_RESOLUTIONS[resolution]], metric.get("mode") or "")
+                        + tuple(v or 0 for v in scores),
+                    )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    def metrics_summary(self, recent: int = 10) -> Dict:
+        conn = self._connect()
+        rows = conn.execute("SELECT data FROM metrics ORDER BY id DESC LIMIT ?", (recent,)).fetchall()
+        return _summary(self.rollups(), [json.loads(r[0]) for r in reversed(rows)])
+
+    def partitions(self) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT day, conversations, metrics FROM partitions ORDER BY day").fetchall()
+        return [{"day": day, "conversations": c, "metrics": m} for day, c, m in rows]
+
+    def drop_partitions(self, days: Iterable[str]) -> int:
+        conn = self._connect()
+        removed = 0
+        for day in days:
+            bounds = (day, _next_day(day))
+            # Short transactions, so other workers' writes interleave with the purge
+            while True:
+                with conn:
+                    rows = conn.execute(
+                        "SELECT id, json_extract(data, '$.query'), json_extract(data, '$.response') "
+                        "FROM conversations WHERE ts >= ? AND ts < ? LIMIT ?", bounds + (self.DELETE_BATCH,)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    if self.fts:
+                        conn.executemany("INSERT INTO conversations_fts (conversations_fts, rowid, query, response) "
+                                         "VALUES ('delete', ?, ?, ?)", rows)
+                    conn.executemany("DELETE FROM conversations WHERE id = ?", [(row[0],) for row in rows])
+                    conn.execute("UPDATE meta SET value = value - ? WHERE key = 'conversations'", (len(rows),))
+                removed += len(rows)
+            while True:
+                with conn:
+                    deleted = conn.execute(
+                        "DELETE FROM metrics WHERE id IN (SELECT id FROM metrics WHERE ts >= ? AND ts < ? LIMIT ?)",
+                        bounds + (self.DELETE_BATCH,),
+                    ).rowcount
+                if not deleted:
+                    break
+            with conn:
+                conn.execute("DELETE FROM partitions WHERE day = ?", (day,))
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        return removed
+
+    def rollups(self, since: Optional[str] = None, until: Optional[str] = None,
+                resolution: str = "1d", mode: Optional[str] = None) -> List[Dict]:
+        length = ROLLUP_RESOLUTIONS[resolution]
+        columns = ["bucket", "mode", "conversations", "evaluated"] + [f"sum_{f}" for f in METRIC_FIELDS]
+        params = [(since or "")[:length], (until or "")[:length] or "\uffff"]
+        if mode is not None:
+            params.append(mode)
+        rows = self._connect().execute(
+            f"SELECT {', '.join(columns)} FROM {self.ROLLUP_TABLES[resolution]} "
+            f"WHERE bucket >= ? AND bucket < ?{' AND mode = ?' if mode is not None else ''} ORDER BY bucket, mode",
+            params,
+        ).fetchall()
+        return [dict(zip(columns, row), mode=row[1] or None) for row in rows]
+
+    def prune_rollups(self, resolution: str, before: str) -> int:
+        conn = self._connect()
+        with conn:
+            return conn.execute(f"DELETE FROM {self.ROLLUP_TABLES[resolution]} WHERE bucket < ?",
+                                (before[:ROLLUP_RESOLUTIONS[resolution]],)).rowcount
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE id = ? AND updated >= ?",
+            (session_id, time.time() - self.session_ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_session(self, session_id: str, memory: Dict) -> None:
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (id, updated, data) VALUES (?, ?, ?)",
+                         (session_id, now, json.dumps(memory, ensure_ascii=False)))
+            conn.execute("DELETE FROM sessions WHERE updated < ?", (now - self.session_ttl,))
+            conn.execute("DELETE FROM sessions WHERE id IN "
+                         "(SELECT id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                         (self.max_sessions,))
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM conversations")
+            conn.execute("DELETE FROM metrics")
+            conn.execute("DELETE FROM sessions")
+            conn.execute("DELETE FROM partitions")
+            for table in self.ROLLUP_TABLES.values():
+                conn.execute(f"DELETE FROM {table}")
+            if self.fts:
+                conn.execute("INSERT INTO conversations_fts (conversations_fts) VALUES ('delete-all')")
+            conn.execute("UPDATE meta SET value = 0 WHERE key = 'conversations'")
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    def generation(self) -> int:
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+
+class RemoteStore(HistoryStore):
+    """Stub for a networked store shared by workers on several nodes.
+
+    Implement the ``HistoryStore`` methods against e.g. Redis (lists plus an
+    INCR'd generation key) or Postgres (the SQLiteStore schema).
+    """
+
+    def __init__(self, url: str):
+        raise NotImplementedError(
+            f"No networked history store is implemented yet ({url}); "
+            "use sqlite:/// for multi-worker deployments on one host"
+        )
+
+
+def create_store(url: Optional[str] = None) -> HistoryStore:
+    """Build the store configured by ``url`` or ZENBOT_STORE_URL."""
+    url = url or os.environ.get("ZENBOT_STORE_URL", "memory://")
+    sessions = {
+        "max_sessions": int(os.environ.get("ZENBOT_MAX_SESSIONS", str(DEFAULT_MAX_SESSIONS))),
+        "session_ttl": float(os.environ.get("ZENBOT_SESSION_TTL", str(DEFAULT_SESSION_TTL))),
+    }
+    if url.startswith("memory://"):
+        return MemoryStore(**sessions)
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):], **sessions)
+    return RemoteStore(url)
@@ -0,0 +1,268 @@
+"""Server-Sent Events framing for ``/api/chat/stream``.
+
+The stream used to send one frame per word, each built with its own
+``json.dumps`` of a fresh dict, so a 200-word answer cost 200 frames, 200
+encoder calls and 200 socket writes, and nothing was written while the LLM
+call ran (proxies with idle timeouts could drop the connection first).
+
+- Tokens are coalesced: text is buffered and sent as one ``token`` frame once
+  ``flush_bytes`` have accumulated or ``flush_ms`` have passed since the first
+  buffered token, whichever comes first. Any other event flushes the buffer
+  first, so ordering is unchanged.
+- Token frames are a precomputed byte prefix plus the JSON-escaped content
+  (``json.encoder.encode_basestring``, the C string escaper); other events use
+  orjson when installed, compact ``json`` otherwise.
+- While the source is idle for ``heartbeat`` seconds a ``: ping`` comment is
+  sent; SSE clients ignore comments.
+- Clients sending ``Accept-Encoding: gzip`` get a gzip body. The compressor
+  is sync-flushed after every frame, so frames arrive as soon as they are
+  produced while the shared window still compresses the repeated JSON.
+
+Streams are resumable. ``StreamRegistry.start`` runs the source on its own
+task, decoupled from the connection, and appends every frame with an
+``id: <stream id>:<seq>`` line to a bounded per-stream ring buffer. A
+connection just follows that buffer, so a client that drops mid-answer
+reconnects with ``Last-Event-ID`` and gets only the frames it missed, while
+the answer keeps generating (once) in the meantime. Finished streams are
+evicted ``ttl`` seconds after their last frame, and the oldest streams are
+evicted past ``max_streams``.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FLUSH_BYTES = int(os.environ.get("ZENBOT_SSE_FLUSH_BYTES", "512"))
+FLUSH_MS = float(os.environ.get("ZENBOT_SSE_FLUSH_MS", "100"))
+HEARTBEAT_SECONDS = float(os.environ.get("ZENBOT_SSE_HEARTBEAT_SECONDS", "15"))
+GZIP_ENABLED = os.environ.get("ZENBOT_SSE_GZIP", "1") == "1"
+GZIP_LEVEL = int(os.environ.get("ZENBOT_SSE_GZIP_LEVEL", "6"))
+STREAM_TTL = float(os.environ.get("ZENBOT_STREAM_TTL", "300"))
+MAX_STREAMS = int(os.environ.get("ZENBOT_MAX_STREAMS", "1000"))
+STREAM_BUFFER_EVENTS = int(os.environ.get("ZENBOT_STREAM_BUFFER_EVENTS", "1024"))
+
+HEARTBEAT = b": ping\n\n"
+_TOKEN_PREFIX = b'data: {"type":"token","content":'
+_TOKEN_SUFFIX = b"}\n\n"
+_encode_string = json.encoder.encode_basestring
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+# A source yields token text (str) or complete events (dict)
+Event = Union[str, Dict]
+
+
+def dumps(event: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(event)
+    return _encoder.encode(event).encode("utf-8")
+
+
+def token_frame(text: str) -> bytes:
+    return _TOKEN_PREFIX + _encode_string(text).encode("utf-8") + _TOKEN_SUFFIX
+
+
+def event_frame(event: Dict) -> bytes:
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True if the Accept-Encoding header allows gzip (and does not set q=0)."""
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(stream id, seq) from a ``Last-Event-ID`` value, or None if malformed."""
+    stream_id, _, seq = (value or "").strip().rpartition(":")
+    if not stream_id or not seq.lstrip("-").isdigit():
+        return None
+    return stream_id, int(seq)
+
+
+async def frames(events: AsyncIterator[Event], flush_bytes: int = FLUSH_BYTES,
+                 flush_ms: float = FLUSH_MS, heartbeat: Optional[float] = HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+    """Encoded SSE frames for ``events``: coalesced tokens, events and heartbeats (None: none)."""
+    source = events.__aiter__()
+    buffer, size, first_at = [], 0, 0.0
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(source.__anext__())
+            if buffer:
+                timeout = max(0.0, first_at + flush_ms / 1000 - time.monotonic())
+            else:
+                timeout = heartbeat
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                if buffer:
+                    yield token_frame("".join(buffer))
+                    buffer, size = [], 0
+                else:
+                    yield HEARTBEAT
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+            if isinstance(event, str):
+                if not buffer:
+                    first_at = time.monotonic()
+                buffer.append(event)
+                size += len(event)
+                if size >= flush_bytes:
+                    yield token_frame("".join(buffer))
+                    buffer, size = [], 0
+                continue
+            if buffer:
+                yield token_frame("".join(buffer))
+                buffer, size = [], 0
+            yield event_frame(event)
+        if buffer:
+            yield token_frame("".join(buffer))
+    finally:
+        # Client went away mid-stream: stop the source too
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        if hasattr(source, "aclose"):
+            await source.aclose()
+
+
+async def gzip_frames(chunks: AsyncIterator[bytes], level: int = GZIP_LEVEL) -> AsyncIterator[bytes]:
+    """gzip ``chunks`` as one member, sync-flushed after each chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    try:
+        async for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        await chunks.aclose()
+
+
+class ResumableStream:
+    """Frames of one answer, numbered, in a ring buffer that connections follow."""
+
+    def __init__(self, stream_id: str, max_events: int = STREAM_BUFFER_EVENTS):
+        self.id = stream_id
+        self.events = deque(maxlen=max_events)
+        self.next_seq = 0
+        self.done = False
+        self.updated = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self.updated = time.monotonic()
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def append(self, frame: bytes) -> None:
+        self.events.append((self.next_seq, b"id: %s:%d\n" % (self.id.encode(), self.next_seq) + frame))
+        self.next_seq += 1
+        self._notify()
+
+    def close(self) -> None:
+        self.done = True
+        self._notify()
+
+    async def follow(self, after: int = -1, heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+        """Frames with seq > ``after``, then live ones until the stream is done."""
+        cursor = after + 1
+        while True:
+            oldest = self.events[0][0] if self.events else self.next_seq
+            if cursor < oldest:
+                # Fell out of the ring buffer; the client has to ask again
+                yield event_frame({"type": "error", "content": "Stream position expired, please resend the question"})
+                return
+            for seq, frame in list(self.events):
+                if seq >= cursor:
+                    yield frame
+                    cursor = seq + 1
+            if self.done and cursor >= self.next_seq:
+                return
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+
+
+class StreamRegistry:
+    """Active and recently finished streams of this worker, by id."""
+
+    def __init__(self, ttl: float = STREAM_TTL, max_streams: int = MAX_STREAMS,
+                 max_events: int = STREAM_BUFFER_EVENTS):
+        self.ttl = ttl
+        self.max_streams = max_streams
+        self.max_events = max_events
+        self._streams: "OrderedDict[str, ResumableStream]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for stream_id, stream in list(self._streams.items()):
+            if stream.done and now - stream.updated > self.ttl:
+                del self._streams[stream_id]
+        while len(self._streams) > self.max_streams:
+            _, stream = self._streams.popitem(last=False)
+            if stream.task is not None and not stream.done:
+                stream.task.cancel()
+
+    async def _produce(self, stream: ResumableStream, events: AsyncIterator[Event]) -> None:
+        try:
+            async for frame in frames(events, heartbeat=None):
+                stream.append(frame)
+        finally:
+            stream.close()
+
+    def start(self, events: AsyncIterator[Event]) -> ResumableStream:
+        """Run ``events`` to completion in the background, buffering its frames."""
+        stream = ResumableStream(uuid.uuid4().hex, self.max_events)
+        self._streams[stream.id] = stream
+        self._evict()
+        stream.task = asyncio.create_task(self._produce(stream, events))
+        return stream
+
+    def get(self, stream_id: str) -> Optional[ResumableStream]:
+        self._evict()
+        return self._streams.get(stream_id)
+
+
+def event_stream(chunks: AsyncIterator[bytes], accept_encoding: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """StreamingResponse for encoded frames, gzip-compressed when the client accepts it."""
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        # Keep nginx-style proxies from buffering the stream
+        "X-Accel-Buffering": "no",
+        "Vary": "Accept-Encoding",
+        **(headers or {}),
+    }
+    body = chunks
+    if GZIP_ENABLED and accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        body = gzip_frames(body)
+    return StreamingResponse(body, media_type="text/event-stream", headers=headers)
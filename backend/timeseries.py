@@ -0,0 +1,133 @@
+"""Metric time series from rollups, downsampled for charts.
+
+``/api/metrics/timeseries`` reads the per-minute, per-hour or per-day rollups
+kept by the history store (see shared_store.py), never raw history, so a
+week-long chart is a range scan over at most a few thousand rows. Each bucket
+becomes a point with counts and average scores, one series per mode. Series
+longer than the requested number of points are reduced (buckets without
+evaluations have no score and are left out) with:
+
+- ``lttb``: Largest-Triangle-Three-Buckets (Steinarsson, 2013), which keeps
+  the points that preserve the visual shape of one metric
+- ``minmax``: the lowest and highest point of each of ``points / 2`` equal
+  slices, which keeps every spike and dip
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from shared_store import METRIC_FIELDS, ROLLUP_RESOLUTIONS
+
+RESOLUTION_SECONDS = {"1m": 60, "1h": 3600, "1d": 86400}
+# Finest resolution whose bucket count over the range stays below this
+MAX_BUCKETS = 5000
+_BUCKET_PADDING = {10: "T00:00", 13: ":00", 16: ""}
+
+
+def bucket_start(bucket: str) -> datetime:
+    return datetime.fromisoformat(bucket + _BUCKET_PADDING[len(bucket)])
+
+
+def pick_resolution(since: datetime, until: datetime, kept_days: Optional[Dict[str, int]] = None) -> str:
+    """Finest resolution with at most MAX_BUCKETS buckets between since and until.
+
+    ``kept_days`` (resolution -> days its rollups are kept) rules out
+    resolutions already pruned at ``since``.
+    """
+    span = (until - since).total_seconds()
+    age_days = (datetime.now() - since).total_seconds() / 86400
+    for resolution in ("1m", "1h"):
+        kept = (kept_days or {}).get(resolution)
+        if kept and age_days > kept:
+            continue
+        if span / RESOLUTION_SECONDS[resolution] <= MAX_BUCKETS:
+            return resolution
+    return "1d"
+
+
+def _point(row: Dict) -> Dict:
+    point = {"t": bucket_start(row["bucket"]).isoformat(), "conversations": row["conversations"],
+             "evaluated": row["evaluated"]}
+    for field in METRIC_FIELDS:
+        point[field] = round(row[f"sum_{field}"] / row["evaluated"], 4) if row["evaluated"] else None
+    return point
+
+
+def lttb(xy: List[Tuple[float, float]], threshold: int) -> List[int]:
+    """Indexes of the points Largest-Triangle-Three-Buckets keeps out of ``xy``."""
+    n = len(xy)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    size = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        start, end = int(i * size) + 1, int((i + 1) * size) + 1
+        # Average of the next bucket is the third triangle vertex
+        following = xy[end:min(int((i + 2) * size) + 1, n)] or xy[-1:]
+        avg_x = sum(x for x, _ in following) / len(following)
+        avg_y = sum(y for _, y in following) / len(following)
+        ax, ay = xy[a]
+        best, best_area = start, -1.0
+        for j in range(start, min(end, n - 1)):
+            area = abs((ax - avg_x) * (xy[j][1] - ay) - (ax - xy[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def minmax(xy: List[Tuple[float, float]], threshold: int) -> List[int]:
+    """Indexes of the lowest and highest point of each of ``threshold / 2`` slices of ``xy``."""
+    n = len(xy)
+    if n <= threshold:
+        return list(range(n))
+    slices = max(threshold // 2, 1)
+    size = n / slices
+    selected = []
+    for i in range(slices):
+        lo, hi = int(i * size), int((i + 1) * size)
+        if lo >= hi:
+            continue
+        low = min(range(lo, hi), key=lambda k: xy[k][1])
+        high = max(range(lo, hi), key=lambda k: xy[k][1])
+        selected.extend(sorted({low, high}))
+    return selected
+
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
+
+
+def timeseries(store, since: datetime, until: datetime, points: int = 200, resolution: Optional[str] = None,
+               mode: Optional[str] = None, method: str = "lttb", metric: str = "overall_score",
+               kept_days: Optional[Dict[str, int]] = None) -> Dict:
+    """Downsampled per-mode series of ``store``'s rollups for [since, until).
+
+    Points are {"t", "conversations", "evaluated", "<field>" average scores}.
+    Downsampling runs on (time, ``metric``) pairs and only the kept buckets
+    are turned into points.
+    """
+    resolution = resolution or pick_resolution(since, until, kept_days)
+    by_mode: Dict[str, List[Dict]] = {}
+    # Rollup ranges are exclusive at bucket level: round until up so the
+    # current, partly filled bucket is included
+    end = bucket_start(until.isoformat()[:ROLLUP_RESOLUTIONS[resolution]])
+    if end < until:
+        end += timedelta(seconds=RESOLUTION_SECONDS[resolution])
+    for row in store.rollups(since.isoformat(), end.isoformat(), resolution=resolution, mode=mode):
+        by_mode.setdefault(row["mode"] or "unknown", []).append(row)
+    result = {}
+    for name, rows in by_mode.items():
+        if len(rows) > points:
+            rows_with_score = [r for r in rows if r["evaluated"]]
+            xy = [(bucket_start(r["bucket"]).timestamp(), r[f"sum_{metric}"] / r["evaluated"])
+                  for r in rows_with_score]
+            kept = [rows_with_score[i] for i in DOWNSAMPLERS[method](xy, points)]
+        else:
+            kept = rows
+        result[name] = {"points": [_point(r) for r in kept], "buckets": len(rows),
+                        "conversations": sum(r["conversations"] for r in rows),
+                        "evaluated": sum(r["evaluated"] for r in rows)}
+    return {"since": since.isoformat(), "until": until.isoformat(), "resolution": resolution,
+            "bucket_seconds": RESOLUTION_SECONDS[resolution], "metric": metric, "method": method,
+            "series": result}
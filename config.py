@@ -0,0 +1,33 @@
+"""Single loader for ZenBot's environment configuration.
+
+``zenbot.py``, ``backend/main.py`` and ``backend/api_service.py`` each used to
+load the ``.env`` file themselves (and re-read it to force LangSmith/Gemini
+keys into ``os.environ``). ``load_env`` reads the file once per process and
+is a no-op afterwards. Variables already set in the environment win, except
+empty ones, which the file fills in; libraries such as LangChain only look at
+``os.environ``.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+ENV_PATH = Path(__file__).resolve().parent / ".env"
+
+_loaded: Optional[Path] = None
+
+
+def load_env(path: Path = ENV_PATH) -> None:
+    """Apply ``path`` (default: the repo's .env) to os.environ once."""
+    global _loaded
+    if _loaded is not None:
+        return
+    _loaded = Path(path)
+    try:
+        from dotenv import dotenv_values
+    except ImportError:
+        return
+    for key, value in dotenv_values(path).items():
+        if value is not None and not os.environ.get(key):
+            os.environ[key] = value
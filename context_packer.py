@@ -0,0 +1,153 @@
+"""Token-budgeted context packing for ZenBot prompts.
+
+``retrieve_documents`` can return any number of documents, and real spec
+sheets run to several pages. Before a prompt is built, documents are split into
+chunks (once per document version, then cached), chunks are scored against the
+question, near-duplicates are dropped, and the best chunks are packed greedily
+into a token budget. Prompt size stays bounded no matter how much retrieval
+returns.
+
+Short documents are a single chunk and are passed through unchanged, so prompts
+for the current knowledge base are byte-identical to unpacked ones.
+"""
+from __future__ import annotations
+
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("ZENBOT_CONTEXT_TOKENS", "2000"))
+DEFAULT_CHUNK_TOKENS = int(os.environ.get("ZENBOT_CHUNK_TOKENS", "200"))
+NEAR_DUPLICATE_JACCARD = 0.9
+
+# Words are split into pieces of at most four characters, which tracks
+# SentencePiece/BPE token counts for English and numbers closely enough for
+# budgeting without loading a tokenizer.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Fast local approximation of the LLM token count of ``text``."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _split_sentences(text: str, max_tokens: int) -> List[str]:
+    pieces = []
+    for sentence in _SENTENCE_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        # Very long sentence: hard-split on words
+        words, current = sentence.split(), []
+        for w in words:
+            if current and estimate_tokens(" ".join(current + [w])) > max_tokens:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(w)
+        if current:
+            pieces.append(" ".join(current))
+    return pieces
+
+
+@lru_cache(maxsize=4096)
+def _chunk_texts(text: str, max_tokens: int) -> Tuple[str, ...]:
+    if estimate_tokens(text) <= max_tokens:
+        return (text,)
+    chunks, current, current_tokens = [], [], 0
+    for sentence in _split_sentences(text, max_tokens):
+        n = estimate_tokens(sentence)
+        if current and current_tokens + n > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += n
+    if current:
+        chunks.append(" ".join(current))
+    return tuple(chunks)
+
+
+def chunk_document(doc: Dict, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[Dict]:
+    """Split a document into chunk documents of at most ``max_tokens`` each.
+
+    Chunks keep the parent's title and metadata and get ids ``<id>#<n>``. A
+    document that fits in one chunk is returned as-is. Documents produced by
+    the ingestion pipeline carry precomputed ``chunks`` which are used directly.
+    """
+    if doc.get("chunks"):
+        return doc["chunks"]
+    texts = _chunk_texts(doc.get("text", ""), max_tokens)
+    if len(texts) == 1:
+        return [doc]
+    return [
+        {
+            "id": f"{doc['id']}#{i}",
+            "title": doc.get("title", ""),
+            "text": t,
+            "metadata": doc.get("metadata", {}),
+            "parent_id": doc["id"],
+        }
+        for i, t in enumerate(texts)
+    ]
+
+
+def _shingles(text: str) -> frozenset:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < 3:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + 3]) for i in range(len(words) - 2))
+
+
+def _is_near_duplicate(shingles: frozenset, kept: List[frozenset]) -> bool:
+    for other in kept:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= NEAR_DUPLICATE_JACCARD:
+            return True
+    return False
+
+
+def pack_context(question: str, docs: List[Dict], budget: Optional[int] = None,
+                 block_tokens=None) -> List[Dict]:
+    """Select the highest-scoring chunks of ``docs`` that fit in ``budget`` tokens.
+
+    Chunks are scored by query term overlap plus a prior from the document's
+    retrieval rank. ``block_tokens(chunk)`` returns the token cost of a chunk as
+    rendered in the prompt (defaults to its text). The returned chunks keep
+    retrieval order so prompts stay stable.
+    """
+    if not docs:
+        return []
+    budget = DEFAULT_CONTEXT_TOKENS if budget is None else budget
+    cost = block_tokens or (lambda c: estimate_tokens(c.get("text", "")))
+    q_terms = set(_WORD_RE.findall(question.lower()))
+
+    candidates = []
+    for rank, doc in enumerate(docs):
+        for pos, chunk in enumerate(chunk_document(doc)):
+            terms = set(_WORD_RE.findall(chunk.get("text", "").lower()))
+            overlap = len(q_terms & terms) / (len(q_terms) or 1)
+            score = overlap + 1.0 / (1 + rank)
+            candidates.append((score, rank, pos, chunk))
+
+    kept_shingles: List[frozenset] = []
+    selected = []
+    used = 0
+    for score, rank, pos, chunk in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        shingles = _shingles(chunk.get("text", ""))
+        if _is_near_duplicate(shingles, kept_shingles):
+            continue
+        n = cost(chunk)
+        if used + n > budget:
+            continue
+        kept_shingles.append(shingles)
+        selected.append((rank, pos, chunk))
+        used += n
+
+    selected.sort(key=lambda c: (c[0], c[1]))
+    return [chunk for _, _, chunk in selected]
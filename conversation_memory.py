@@ -0,0 +1,138 @@
+"""Bounded per-session conversation memory for multi-turn chat.
+
+Every ``/api/chat`` call used to be stateless, so a follow-up like "and for
+16mm?" retrieved nothing useful. A session's memory is a small JSON-able dict
+kept in the history store (see backend/shared_store.py):
+
+- ``turns``: the last ``max_turns`` exchanges verbatim (question, the resolved
+  retrieval query and the answer)
+- ``summary``: older turns folded into one line each ("question -> first
+  sentence of the answer"), oldest lines dropped past ``summary_tokens``
+
+``resolve_followup`` rewrites an elliptical follow-up ("and for 16mm?", "what
+about tensile strength?") into a standalone query for retrieval, the
+fact-table fast path and the answer cache. Only questions that open with an
+elliptical marker are rewritten; "What is Fe 550D?" or "Is that available?"
+are answered as asked (the prompt still sees the conversation). A follow-up
+without a topic of its own is the previous query with the slots it names
+(grade, size, city) swapped in; one with a topic keeps it and only carries
+over the slots its intent uses (no size into a spec or delivery question).
+``render_memory`` produces the conversation block for
+the prompt, trimmed to ``max_tokens``, so prompts never grow with the
+transcript and no extra LLM call is needed to summarize.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from context_packer import estimate_tokens
+from kb_ingest import tokenize
+from query_normalizer import analyze, normalize_query
+
+MAX_TURNS = int(os.environ.get("ZENBOT_SESSION_TURNS", "4"))
+SUMMARY_TOKENS = int(os.environ.get("ZENBOT_SESSION_SUMMARY_TOKENS", "200"))
+MEMORY_TOKENS = int(os.environ.get("ZENBOT_SESSION_MEMORY_TOKENS", "400"))
+ANSWER_CHARS = 300
+
+# Cities with delivery terms in the KB
+LOCATIONS = ("ranchi", "jamshedpur", "dhanbad", "bokaro", "patna", "kolkata")
+
+_SLOT_PATTERNS = {
+    "grade": re.compile(r"\bfe \d{3}d?\b"),
+    "size": re.compile(r"\b\d{1,2}mm\b"),
+    "location": re.compile(r"\b(?:%s)\b" % "|".join(LOCATIONS)),
+}
+_FOLLOWUP_START = re.compile(r"^(?:and|also|what about|how about)\b\s*")
+# Words a follow-up can consist of without naming a new topic
+_FILLER = {"for", "size", "grade", "bars", "bar", "tmt", "one", "ones", "then"}
+# Slots a question of each intent depends on, and so may inherit
+INTENT_SLOTS = {
+    "spec": ("grade",),
+    "price": ("grade", "size"),
+    "availability": ("grade", "size"),
+    "delivery": ("location",),
+    "engineering": ("grade",),
+}
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def new_memory() -> Dict:
+    return {"turns": [], "summary": [], "updated": time.time()}
+
+
+def _slots(normalized: str) -> Dict[str, List[str]]:
+    return {name: pattern.findall(normalized) for name, pattern in _SLOT_PATTERNS.items()}
+
+
+def _strip_slots(normalized: str) -> str:
+    for pattern in _SLOT_PATTERNS.values():
+        normalized = pattern.sub(" ", normalized)
+    return " ".join(normalized.split())
+
+
+def _topic(rest: str) -> set:
+    return set(tokenize(_strip_slots(rest))) - _FILLER
+
+
+def is_followup(question: str) -> bool:
+    """True for elliptical questions ("and for 16mm?", "what about ...") that continue the previous turn."""
+    return bool(_FOLLOWUP_START.match(normalize_query(question)))
+
+
+def resolve_followup(question: str, memory: Optional[Dict]) -> str:
+    """Standalone retrieval query for ``question`` given the session memory."""
+    if not memory or not memory.get("turns") or not is_followup(question):
+        return question
+    previous = normalize_query(memory["turns"][-1]["resolved"])
+    rest = _FOLLOWUP_START.sub("", normalize_query(question))
+    new_slots, old_slots = _slots(rest), _slots(previous)
+
+    if not _topic(rest):
+        # "and for 16mm?": the previous query with the new slots swapped in
+        resolved = previous
+        for name, values in new_slots.items():
+            if values:
+                resolved = _SLOT_PATTERNS[name].sub(" ", resolved) + " " + " ".join(values)
+        return " ".join(resolved.split())
+
+    # "what about tensile strength?": the new topic plus the slots its intent uses
+    intent = analyze(rest)["intent"]
+    carried = [v for name in INTENT_SLOTS.get(intent, ()) if not new_slots[name] for v in old_slots[name]]
+    return " ".join([rest] + carried)
+
+
+def _first_sentence(text: str) -> str:
+    sentence = _SENTENCE_RE.split(" ".join(text.split()), maxsplit=1)[0]
+    return sentence if len(sentence) <= 160 else sentence[:157] + "..."
+
+
+def remember(memory: Optional[Dict], question: str, resolved: str, answer: str,
+             max_turns: int = MAX_TURNS, summary_tokens: int = SUMMARY_TOKENS) -> Dict:
+    """Add a turn; turns past ``max_turns`` are folded into the rolling summary."""
+    memory = dict(memory or new_memory())
+    turns = list(memory["turns"]) + [{"question": question, "resolved": resolved,
+                                      "answer": answer[:ANSWER_CHARS]}]
+    summary = list(memory["summary"])
+    while len(turns) > max_turns:
+        old = turns.pop(0)
+        summary.append(f"{old['question']} -> {_first_sentence(old['answer'])}")
+    while summary and sum(estimate_tokens(line) for line in summary) > summary_tokens:
+        summary.pop(0)
+    memory.update(turns=turns, summary=summary, updated=time.time())
+    return memory
+
+
+def render_memory(memory: Optional[Dict], max_tokens: int = MEMORY_TOKENS) -> Optional[str]:
+    """Conversation block for the prompt (summary, then recent turns), or None if empty."""
+    if not memory or not (memory.get("turns") or memory.get("summary")):
+        return None
+    lines = [f"Earlier: {line}" for line in memory["summary"]]
+    for turn in memory["turns"]:
+        lines.append(f"User: {turn['question']}\nZenBot: {turn['answer']}")
+    # Oldest lines go first when over budget; the latest turn always stays
+    while len(lines) > 1 and sum(estimate_tokens(line) for line in lines) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
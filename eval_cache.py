@@ -0,0 +1,111 @@
+"""Content-addressed cache of evaluator results for CI runs.
+
+The daily workflow used to re-score every test case on every run, even when
+neither the prediction nor the evaluator code had changed. Results are now
+stored under ``sha256(evaluator version, prediction, expected answer)``:
+
+- the evaluator version is a hash of the scoring functions' source
+  (``code_version``), so editing an evaluator invalidates exactly its results
+  and nothing else
+- a case is re-scored only when its prediction or expected answer changed
+- entries remember the day they were last used; entries unused for
+  ``max_age_days`` are dropped on save, so the file stays the size of the
+  golden set
+
+The cache is a single JSON file (default ``.eval_cache/results.json``,
+``ZENBOT_EVAL_CACHE``) that CI persists between runs with ``actions/cache``.
+Several scripts can share it: their versions differ, so their keys do too.
+"""
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.environ.get("ZENBOT_EVAL_CACHE", os.path.join(".eval_cache", "results.json"))
+CACHE_MAX_AGE_DAYS = int(os.environ.get("ZENBOT_EVAL_CACHE_MAX_AGE_DAYS", "30"))
+CACHE_FORMAT = 1
+
+
+def code_version(*functions: Callable) -> str:
+    """Short hash of the source of ``functions`` (the evaluator version)."""
+    digest = hashlib.sha256()
+    for function in functions:
+        digest.update(function.__qualname__.encode("utf-8") + b"\0")
+        digest.update(inspect.getsource(function).encode("utf-8") + b"\0")
+    return digest.hexdigest()[:16]
+
+
+def result_key(version: str, prediction: str, expected: str) -> str:
+    payload = json.dumps([version, prediction, expected], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EvalCache:
+    """Evaluator results by content key, loaded from and saved to one JSON file."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_age_days: int = CACHE_MAX_AGE_DAYS):
+        # path=None: in-memory only (--no-cache)
+        self.path = Path(path) if path else None
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._today = date.today().isoformat()
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        if self.path is not None and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("format") == CACHE_FORMAT:
+                    self._entries = data.get("entries", {})
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"⚠️ Ignoring unreadable evaluation cache {self.path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, version: str, prediction: str, expected: str, compute: Callable[[], object]):
+        """Cached result for (version, prediction, expected), computing it on a miss."""
+        key = result_key(version, prediction, expected)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            if entry.get("used") != self._today:
+                entry["used"] = self._today
+                self._dirty = True
+            return entry["result"]
+        self.misses += 1
+        result = compute()
+        self._entries[key] = {"result": result, "used": self._today}
+        self._dirty = True
+        return result
+
+    def prune(self) -> int:
+        """Drop entries unused for more than max_age_days; returns how many."""
+        cutoff = (date.today() - timedelta(days=self.max_age_days)).isoformat()
+        stale = [key for key, entry in self._entries.items() if entry.get("used", "") < cutoff]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self) -> None:
+        """Prune and write the file (atomically), if anything changed."""
+        self.prune()
+        if self.path is None or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"format": CACHE_FORMAT, "entries": self._entries},
+                                  ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        return f"{self.hits}/{total} cached, {self.misses} scored, {len(self._entries)} entries"
@@ -0,0 +1,153 @@
+"""Regression check of per-case evaluation scores against a stored baseline run.
+
+``check_results.py`` used to compare suite averages to fixed thresholds, which
+misses a real drop that stays above the threshold and flags a noisy run of a
+small suite. The gate now compares the current run to a baseline run
+(``eval_baseline.json``, per-case scores by metric) case by case:
+
+- paired diffs: for every case present in both runs, current - baseline
+- bootstrap: the mean diff is recomputed over ``rounds`` resamples of the
+  cases (with replacement); each chunk of rounds draws one ``(rounds, cases)``
+  int32 index array, shared by all metrics, and takes it from every metric's
+  contiguous column, so the bootstrap is a few numpy gathers and row means
+- a metric regressed when the whole ``1 - alpha`` confidence interval of the
+  mean diff is below zero and the mean drop is at least ``min_drop``
+- flipped cases: cases that passed (score >= ``pass_score``) in the baseline
+  and fail now, or the other way round
+
+Usage:
+  python3 eval_regression.py --baseline eval_baseline.json --scores current.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_BASELINE_PATH = os.environ.get("ZENBOT_EVAL_BASELINE", "eval_baseline.json")
+BOOTSTRAP_ROUNDS = int(os.environ.get("ZENBOT_EVAL_BOOTSTRAP_ROUNDS", "5000"))
+ALPHA = float(os.environ.get("ZENBOT_EVAL_ALPHA", "0.05"))
+MIN_DROP = float(os.environ.get("ZENBOT_EVAL_MIN_DROP", "0.02"))
+PASS_SCORE = 0.5
+# Resampled index arrays are built in chunks of at most this many elements
+# (small enough to stay cache-friendly)
+_CHUNK_ELEMENTS = 1_000_000
+
+# Scores: case id -> metric -> score
+Scores = Dict[str, Dict[str, float]]
+
+
+def load_baseline(path: str = DEFAULT_BASELINE_PATH) -> Optional[Dict]:
+    """{"created", "version", "cases": Scores} or None if there is no baseline."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(scores: Scores, path: str = DEFAULT_BASELINE_PATH, version: str = "") -> None:
+    data = {"created": datetime.now().isoformat(timespec="seconds"), "version": version, "cases": scores}
+    Path(path).write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def bootstrap_mean_ci(values: np.ndarray, rounds: int = BOOTSTRAP_ROUNDS, alpha: float = ALPHA,
+                      seed: int = 0) -> np.ndarray:
+    """Percentile bootstrap CI of the column means of ``values`` (cases x metrics).
+
+    Returns a (metrics, 2) array of [low, high].
+    """
+    n = values.shape[0]
+    rng = np.random.default_rng(seed)
+    columns = np.ascontiguousarray(values.T)
+    means = np.empty((rounds, values.shape[1]))
+    chunk = max(1, _CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, rounds, chunk):
+        stop = min(start + chunk, rounds)
+        idx = rng.integers(0, n, size=(stop - start, n), dtype=np.int32)
+        for j, column in enumerate(columns):
+            means[start:stop, j] = np.take(column, idx).mean(axis=1)
+    return np.quantile(means, [alpha / 2, 1 - alpha / 2], axis=0).T
+
+
+def compare(current: Scores, baseline: Scores, rounds: int = BOOTSTRAP_ROUNDS, alpha: float = ALPHA,
+            min_drop: float = MIN_DROP, pass_score: float = PASS_SCORE) -> Dict:
+    """Paired comparison of ``current`` to ``baseline`` over the cases both ran."""
+    ids = sorted(set(current) & set(baseline), key=lambda c: (len(c), c))
+    metrics = sorted({m for cid in ids for m in current[cid]} & {m for cid in ids for m in baseline[cid]})
+    report = {"cases": len(ids), "new_cases": sorted(set(current) - set(baseline)),
+              "missing_cases": sorted(set(baseline) - set(current)), "rounds": rounds, "alpha": alpha,
+              "metrics": {}, "flipped": [], "regressed": []}
+    if not ids or not metrics:
+        return report
+
+    cur = np.array([[current[cid].get(m, np.nan) for m in metrics] for cid in ids], dtype=float)
+    base = np.array([[baseline[cid].get(m, np.nan) for m in metrics] for cid in ids], dtype=float)
+    # A case missing one metric in either run counts as unchanged for it
+    missing = np.isnan(cur) | np.isnan(base)
+    cur[missing] = base[missing] = 0.0
+    diffs = cur - base
+    ci = bootstrap_mean_ci(diffs, rounds, alpha)
+
+    for j, metric in enumerate(metrics):
+        mean_diff = float(diffs[:, j].mean())
+        low, high = float(ci[j, 0]), float(ci[j, 1])
+        regressed = high < 0 and -mean_diff >= min_drop
+        report["metrics"][metric] = {
+            "baseline": round(float(base[:, j].mean()), 4), "current": round(float(cur[:, j].mean()), 4),
+            "diff": round(mean_diff, 4), "ci": [round(low, 4), round(high, 4)], "regressed": regressed,
+        }
+        if regressed:
+            report["regressed"].append(metric)
+
+    was_pass, is_pass = (base >= pass_score) & ~missing, (cur >= pass_score) & ~missing
+    for i, j in zip(*np.nonzero(was_pass != is_pass)):
+        report["flipped"].append({"id": ids[i], "metric": metrics[j], "baseline": float(base[i, j]),
+                                  "current": float(cur[i, j]), "direction": "fixed" if is_pass[i, j] else "broke"})
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """Compact Markdown report: one row per metric, then the flipped cases."""
+    level = round((1 - report["alpha"]) * 100)
+    lines = [f"Compared {report['cases']} cases to the baseline ({report['rounds']} bootstrap rounds, {level}% CI)", "",
+             "| metric | baseline | current | diff | CI | status |", "|---|---|---|---|---|---|"]
+    for metric, row in report["metrics"].items():
+        status = "❌ regressed" if row["regressed"] else "✅ ok"
+        lines.append(f"| {metric} | {row['baseline']:.3f} | {row['current']:.3f} | {row['diff']:+.3f} "
+                     f"| [{row['ci'][0]:+.3f}, {row['ci'][1]:+.3f}] | {status} |")
+    broke = [f for f in report["flipped"] if f["direction"] == "broke"]
+    fixed = [f for f in report["flipped"] if f["direction"] == "fixed"]
+    for title, flips in (("Broke", broke), ("Fixed", fixed)):
+        if flips:
+            lines += ["", f"{title} ({len(flips)}):"]
+            lines += [f"- case {f['id']} {f['metric']}: {f['baseline']:g} → {f['current']:g}" for f in flips]
+    if report["new_cases"]:
+        lines += ["", f"Not in baseline: {', '.join(report['new_cases'])}"]
+    if report["missing_cases"]:
+        lines += ["", f"Missing from this run: {', '.join(report['missing_cases'])}"]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-case evaluation scores to a baseline run")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline scores file")
+    parser.add_argument("--scores", required=True, help="Current scores file (same format as the baseline)")
+    parser.add_argument("--rounds", type=int, default=BOOTSTRAP_ROUNDS, help="Bootstrap resamples")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    current = load_baseline(args.scores)
+    if baseline is None or current is None:
+        parser.error("baseline and scores files must exist")
+    report = compare(current["cases"], baseline["cases"], rounds=args.rounds)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
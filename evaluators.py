@@ -11,6 +11,8 @@ This script implements three evaluators described in the case study:
   - hallucination_detector
 
 It loads `test_cases.json` and `predictions.json` and prints per-case and aggregate scores.
+Results are cached by content (see eval_cache.py): only cases whose prediction or
+expected answer changed, or all cases after an evaluator change, are re-scored.
 """
 
 import json
@@ -18,6 +20,8 @@ import re
 from pathlib import Path
 import argparse
 
+from eval_cache import DEFAULT_CACHE_PATH, EvalCache, code_version
+
 
 def spec_accuracy_evaluator(prediction: str, expected: str):
     """Improved spec accuracy evaluator with better number extraction and fuzzy matching"""
@@ -197,9 +201,18 @@ def hallucination_detector(prediction: str, expected: str):
     }
 
 
-def run_evaluation(test_cases_path: Path, predictions_path: Path):
+EVALUATORS = (spec_accuracy_evaluator, pricing_evaluator, hallucination_detector)
+EVALUATOR_VERSION = code_version(*EVALUATORS)
+
+
+def evaluate_case(prediction: str, expected: str):
+    return [evaluator(prediction, expected) for evaluator in EVALUATORS]
+
+
+def run_evaluation(test_cases_path: Path, predictions_path: Path, cache: EvalCache = None):
     tests = json.loads(test_cases_path.read_text())
     preds = json.loads(predictions_path.read_text())
+    cache = cache if cache is not None else EvalCache(None)
 
     results = []
     agg = {"spec_accuracy": [], "pricing_accuracy": [], "hallucination_check": []}
@@ -210,9 +223,8 @@ def run_evaluation(test_cases_path: Path, predictions_path: Path):
         expected = case.get("expected_answer", "")
         prediction = preds.get(cid, "")
 
-        spec_r = spec_accuracy_evaluator(prediction, expected)
-        price_r = pricing_evaluator(prediction, expected)
-        hall_r = hallucination_detector(prediction, expected)
+        spec_r, price_r, hall_r = cache.get_or_compute(
+            EVALUATOR_VERSION, prediction, expected, lambda: evaluate_case(prediction, expected))
 
         agg[spec_r['key']].append(spec_r['score'])
         agg[price_r['key']].append(price_r['score'])
@@ -239,11 +251,16 @@ def run_evaluation(test_cases_path: Path, predictions_path: Path):
     print("\nAggregate summary:")
     print(json.dumps(summary, indent=2))
 
+    cache.save()
+    print(f"\nℹ️ Evaluation cache (version {EVALUATOR_VERSION}): {cache.summary()}")
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--tests", type=str, default="test_cases.json", help="Path to test_cases.json")
     parser.add_argument("--predictions", type=str, default="predictions.json", help="Path to predictions.json")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE_PATH, help="Path to the evaluation result cache")
+    parser.add_argument("--no-cache", action="store_true", help="Re-score every case and leave the cache untouched")
     args = parser.parse_args()
 
     tests_path = Path(args.tests)
@@ -257,7 +274,7 @@ def main():
         print("Create predictions.json mapping test id -> output, or run ZenBot to capture outputs into the file.")
         return
 
-    run_evaluation(tests_path, preds_path)
+    run_evaluation(tests_path, preds_path, EvalCache(None if args.no_cache else args.cache))
 
 
 if __name__ == "__main__":
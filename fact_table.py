@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Structured fact table and extractive fast path for lookup questions.
+
+Most production questions ("price of TMT 16mm", "delivery cost to Ranchi",
+"yield strength of Fe 550D") are answered verbatim by one sentence of one
+retrieved document, so calling Gemini for them only adds latency and cost.
+
+``FactTable`` extracts facts from every KB document once per snapshot (via
+``KBSnapshot.derived``): each fact has product, size, location, attribute,
+value, unit, the source sentence, source file and date. ``lookup`` parses the
+question into an intent (attribute) and slots (grade/product, size, location)
+and answers from the table when exactly one fact from the retrieved documents
+fits. Anything else (comparisons, advice, several intents or grades, no or
+ambiguous facts) returns None and goes to the LLM.
+
+Usage:
+  python3 fact_table.py "Price for TMT 16mm?"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+_GRADE_RE = re.compile(r"\bfe\s?(\d{3})(d)?\b", re.IGNORECASE)
+_TMT_RE = re.compile(r"\btmt\b", re.IGNORECASE)
+_SIZE_RE = re.compile(r"\b(\d{1,2})\s?mm\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z]+")
+
+# attribute -> sentence pattern with value/unit (and optional location) groups
+ATTRIBUTE_PATTERNS = {
+    "price": re.compile(r"^price:\s*(?P<value>₹\s?[\d,]+(?:\.\d+)?)\s*(?P<unit>per\s+\w+)", re.IGNORECASE),
+    "yield_strength": re.compile(r"yield strength:\s*(?P<value>[\d.]+)\s*(?P<unit>N/mm²|N/mm2|MPa)", re.IGNORECASE),
+    "tensile_strength": re.compile(r"tensile strength:\s*(?P<value>[\d.]+)\s*(?P<unit>N/mm²|N/mm2|MPa)",
+                                   re.IGNORECASE),
+    "delivery_time": re.compile(r"delivery time to (?P<location>[a-z]+):\s*(?P<value>\d+(?:\s*[-–]\s*\d+)?)\s*"
+                                r"(?P<unit>(?:business |working )?days)", re.IGNORECASE),
+    "delivery_cost": re.compile(r"delivery cost to (?P<location>[a-z]+):\s*(?P<value>₹\s?[\d,]+)\s*"
+                                r"(?P<unit>per\s+\w+)", re.IGNORECASE),
+}
+
+# Questions that need reasoning or comparison, never answered from the table
+_OPEN_ENDED = ("difference", "compare", "comparison", " vs", "versus", "why", "should", "can i",
+               "suitable", "recommend", "explain", "better", "which", " and ")
+
+
+def _grades(text: str) -> List[str]:
+    return sorted({f"Fe {num}{(d or '').upper()}" for num, d in _GRADE_RE.findall(text)})
+
+
+def _product(text: str) -> Optional[str]:
+    grades = _grades(text)
+    if grades:
+        return grades[0]
+    return "TMT" if _TMT_RE.search(text) else None
+
+
+def _size(text: str) -> Optional[str]:
+    m = _SIZE_RE.search(text)
+    return f"{m.group(1)}mm" if m else None
+
+
+def extract_facts(doc: Dict) -> List[Dict]:
+    """Facts stated in one KB document."""
+    title = doc.get("title", "")
+    meta = doc.get("metadata", {})
+    facts = []
+    for sentence in _SENTENCE_RE.split(" ".join(doc.get("text", "").split())):
+        for attribute, pattern in ATTRIBUTE_PATTERNS.items():
+            m = pattern.search(sentence)
+            if not m:
+                continue
+            groups = m.groupdict()
+            facts.append({
+                "attribute": attribute,
+                # A grade or size in the sentence itself beats the document title
+                "product": _product(sentence) or _product(title),
+                "size": _size(sentence) or _size(title),
+                "location": (groups.get("location") or "").lower() or None,
+                "value": groups["value"],
+                "unit": groups["unit"],
+                "sentence": sentence,
+                "doc_id": doc["id"],
+                "source": meta.get("source"),
+                "date": meta.get("date"),
+            })
+    return facts
+
+
+def parse_question(question: str) -> Optional[Dict]:
+    """Intent and slots of a lookup question, or None for open-ended questions."""
+    q = f" {question.lower()} "
+    if any(w in q for w in _OPEN_ENDED):
+        return None
+    words = set(_WORD_RE.findall(q))
+
+    intents = set()
+    if "delivery" in words or "shipping" in words:
+        if words & {"cost", "charge", "charges", "price", "rate"}:
+            intents.add("delivery_cost")
+        if words & {"time", "long", "days", "take", "when"}:
+            intents.add("delivery_time")
+    else:
+        if words & {"price", "cost", "rate"}:
+            intents.add("price")
+        if "yield" in words:
+            intents.add("yield_strength")
+        if "tensile" in words:
+            intents.add("tensile_strength")
+    if len(intents) != 1 or len(_grades(question)) > 1:
+        return None
+
+    return {
+        "attribute": intents.pop(),
+        "product": _product(question),
+        "size": _size(question),
+        "words": words,
+    }
+
+
+def _slot_fits(fact: Dict, parsed: Dict) -> bool:
+    # A fact about a specific location or size must be asked about explicitly;
+    # a product-level fact (no size) also answers a size-specific question.
+    if fact["location"] and fact["location"] not in parsed["words"]:
+        return False
+    if fact["size"] and fact["size"] != parsed["size"]:
+        return False
+    if parsed["product"] and fact["product"] and parsed["product"] != fact["product"]:
+        # "TMT" is generic; only a grade-vs-grade mismatch rules a fact out
+        if "TMT" not in (parsed["product"], fact["product"]):
+            return False
+    return True
+
+
+class FactTable:
+    """Facts of one KB snapshot, indexed by document id."""
+
+    def __init__(self, docs: Iterable[Dict]):
+        self.by_doc: Dict[str, List[Dict]] = {}
+        for doc in docs:
+            facts = extract_facts(doc)
+            if facts:
+                self.by_doc.setdefault(doc["id"], []).extend(facts)
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "FactTable":
+        return cls(d for docs in snapshot.documents.values() for d in docs)
+
+    def __len__(self) -> int:
+        return sum(len(f) for f in self.by_doc.values())
+
+    def lookup(self, question: str, docs: List[Dict]) -> Optional[Dict]:
+        """The single fact answering ``question`` from the retrieved ``docs``, or None."""
+        parsed = parse_question(question)
+        if parsed is None:
+            return None
+        matches = [
+            fact
+            for d in docs
+            for fact in self.by_doc.get(d["id"], ())
+            if fact["attribute"] == parsed["attribute"] and _slot_fits(fact, parsed)
+        ]
+        if len({(f["value"], f["unit"]) for f in matches}) != 1:
+            return None
+        return matches[0]
+
+
+def fact_answer(fact: Dict) -> str:
+    """Verbatim answer sentence with its citation."""
+    return f"According to {fact['source']} (dated {fact['date']}): {fact['sentence']}"
+
+
+def main():
+    from zenbot import KB_SNAPSHOTS, retrieve_documents
+
+    parser = argparse.ArgumentParser(description="Answer a lookup question from the KB fact table")
+    parser.add_argument("question")
+    parser.add_argument("--version", default="fixed", choices=["fixed", "buggy"])
+    args = parser.parse_args()
+    with KB_SNAPSHOTS.current() as kb:
+        table = kb.derived("fact_table", FactTable.from_snapshot)
+        docs = retrieve_documents(args.version, args.question, kb=kb)
+        fact = table.lookup(args.question, docs)
+    parsed = parse_question(args.question)
+    if parsed is not None:
+        parsed.pop("words")
+    print(json.dumps({"facts": len(table), "parsed": parsed,
+                      "answer": fact_answer(fact) if fact else None}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -36,9 +36,15 @@ function App() {
 
   useEffect(() => {
     fetchMetrics();
-    // Refresh metrics every 5 seconds
-    const interval = setInterval(fetchMetrics, 5000);
-    return () => clearInterval(interval);
+    // Refresh when the backend pushes a finished evaluation
+    const events = new EventSource('/api/metrics/stream');
+    events.onmessage = () => fetchMetrics();
+    // Slow polling as a fallback if the event stream drops
+    const interval = setInterval(fetchMetrics, 30000);
+    return () => {
+      events.close();
+      clearInterval(interval);
+    };
   }, []);
 
   return (
@@ -18,12 +18,27 @@ interface Props {
   onMessageSent: () => void;
 }
 
+// Poll a background evaluation until its scores are ready
+const pollEvaluation = async (evaluationId: string, attempts = 20) => {
+  for (let i = 0; i < attempts; i++) {
+    const response = await fetch(`/api/evaluations/${evaluationId}`);
+    if (!response.ok) return null;
+    const data = await response.json();
+    if (data.status === 'done') return data.evaluation;
+    if (data.status !== 'pending') return null;
+    await new Promise(resolve => setTimeout(resolve, 500));
+  }
+  return null;
+};
+
 const ChatInterface = ({ onMessageSent }: Props) => {
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [mode, setMode] = useState<'fixed' | 'buggy'>('fixed');
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // One session per page load, so the backend can resolve follow-up questions
+  const sessionId = useRef(`s-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`);
 
   // Scroll to bottom when messages change
   useEffect(() => {
@@ -59,14 +74,25 @@ const ChatInterface = ({ onMessageSent }: Props) => {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ message: input, mode }),
+        body: JSON.stringify({ message: input, mode, session_id: sessionId.current }),
       });
 
+      if (response.status === 429 || response.status === 503) {
+        // Shed by admission control; tell the user when to retry
+        const retryAfter = response.headers.get('Retry-After') || 'a few';
+        setMessages(prev => [
+          ...prev,
+          {
+            id: (Date.now() + 1).toString(),
+            role: 'assistant',
+            content: `ZenBot is busy right now. Please try again in ${retryAfter} seconds.`,
+            timestamp: new Date(),
+          },
+        ]);
+        return;
+      }
       if (!response.body) throw new Error('No response body');
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
-
       let assistantMessage: Message = {
         id: (Date.now() + 1).toString(),
         role: 'assistant',
@@ -76,39 +102,87 @@ const ChatInterface = ({ onMessageSent }: Props) => {
 
       setMessages(prev => [...prev, assistantMessage]);
 
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        const chunk = decoder.decode(value);
-        const lines = chunk.split('\n');
-
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            const data = JSON.parse(line.slice(6));
-
-            if (data.type === 'token') {
-              assistantMessage.content += data.content;
-              setMessages(prev => {
-                const newMessages = [...prev];
-                newMessages[newMessages.length - 1] = { ...assistantMessage };
-                return newMessages;
-              });
-            } else if (data.type === 'evaluation') {
-              assistantMessage.evaluation = data.content;
-              setMessages(prev => {
-                const newMessages = [...prev];
-                newMessages[newMessages.length - 1] = { ...assistantMessage };
-                return newMessages;
-              });
-            } else if (data.type === 'done') {
-              onMessageSent();
-            } else if (data.type === 'error') {
-              console.error('Stream error:', data.content);
+      // The stream id comes with the response headers, before any frame (only
+      // heartbeats are sent while the answer is generated); frames carry
+      // "id: <stream>:<seq>", remembered so a dropped stream resumes where it stopped
+      let streamId = response.headers.get('X-Stream-ID') ?? '';
+      let lastEventId = '';
+      let finished = false;
+
+      const readStream = async (body: ReadableStream<Uint8Array>) => {
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        // A read can end mid-frame (coalesced frames are larger); keep the partial line
+        let partial = '';
+        let frameId = '';
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+
+          partial += decoder.decode(value, { stream: true });
+          const lines = partial.split('\n');
+          partial = lines.pop() ?? '';
+
+          for (const line of lines) {
+            if (line.startsWith('id: ')) {
+              frameId = line.slice(4);
+              streamId = frameId.slice(0, frameId.lastIndexOf(':'));
+            } else if (line.startsWith('data: ')) {
+              const data = JSON.parse(line.slice(6));
+              lastEventId = frameId;
+
+              if (data.type === 'token') {
+                assistantMessage.content += data.content;
+                setMessages(prev => {
+                  const newMessages = [...prev];
+                  newMessages[newMessages.length - 1] = { ...assistantMessage };
+                  return newMessages;
+                });
+              } else if (data.type === 'evaluation') {
+                assistantMessage.evaluation = data.content;
+                setMessages(prev => {
+                  const newMessages = [...prev];
+                  newMessages[newMessages.length - 1] = { ...assistantMessage };
+                  return newMessages;
+                });
+              } else if (data.type === 'evaluation_pending') {
+                // Scores are computed off the request path; fill them in when ready
+                const pending = { ...assistantMessage };
+                pollEvaluation(data.evaluation_id).then(evaluation => {
+                  if (!evaluation) return;
+                  setMessages(prev => prev.map(m => (m.id === pending.id ? { ...m, evaluation } : m)));
+                });
+              } else if (data.type === 'done') {
+                finished = true;
+                onMessageSent();
+              } else if (data.type === 'error') {
+                finished = true;
+                console.error('Stream error:', data.content);
+              }
             }
           }
         }
+      };
+
+      try {
+        await readStream(response.body);
+      } catch (error) {
+        if (!streamId) throw error;
+      }
+      // Dropped mid-answer: resume the buffered stream rather than asking again
+      for (let attempt = 1; !finished && streamId && attempt <= 5; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+        try {
+          const resumed = await fetch(`/api/chat/stream/${streamId}`, {
+            headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+          });
+          if (resumed.status === 404) break;
+          if (resumed.ok && resumed.body) await readStream(resumed.body);
+        } catch (error) {
+          console.warn('Stream interrupted, reconnecting:', error);
+        }
       }
+      if (!finished) throw new Error('Stream ended before the answer completed');
     } catch (error) {
       console.error('Error sending message:', error);
       setMessages(prev => [
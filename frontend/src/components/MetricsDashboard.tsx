@@ -1,3 +1,4 @@
+import { useEffect, useState } from 'react';
 import './MetricsDashboard.css';
 
 interface Metrics {
@@ -12,6 +13,84 @@ interface Props {
   metrics: Metrics | null;
 }
 
+interface TrendPoint {
+  t: string;
+  overall_score: number | null;
+}
+
+interface Timeseries {
+  resolution: string;
+  series: Record<string, { points: TrendPoint[]; evaluated: number }>;
+}
+
+const RANGES: Record<string, number> = { '24h': 1, '7d': 7, '30d': 30 };
+const MODE_COLORS: Record<string, string> = { fixed: 'var(--success-color)', buggy: 'var(--danger-color)' };
+const CHART_WIDTH = 300;
+const CHART_HEIGHT = 120;
+
+// Overall score over time per mode, from the downsampled rollup series
+const TrendChart = ({ refreshKey }: { refreshKey: number }) => {
+  const [range, setRange] = useState('7d');
+  const [data, setData] = useState<Timeseries | null>(null);
+
+  useEffect(() => {
+    const since = new Date(Date.now() - RANGES[range] * 86400000);
+    // Local time without offset, matching the timestamps stored by the backend
+    const local = new Date(since.getTime() - since.getTimezoneOffset() * 60000).toISOString().slice(0, 19);
+    fetch(`/api/metrics/timeseries?since=${local}&points=${CHART_WIDTH / 2}`)
+      .then(res => res.json())
+      .then(setData)
+      .catch(error => console.error('Error fetching metric trends:', error));
+  }, [range, refreshKey]);
+
+  const start = Date.now() - RANGES[range] * 86400000;
+  const x = (t: string) => ((new Date(t).getTime() - start) / (RANGES[range] * 86400000)) * CHART_WIDTH;
+  const y = (score: number) => CHART_HEIGHT - score * CHART_HEIGHT;
+
+  return (
+    <div className="trend-chart">
+      <div className="trend-header">
+        <h3>Overall Score Trend</h3>
+        <div className="trend-ranges">
+          {Object.keys(RANGES).map(key => (
+            <button key={key} className={key === range ? 'active' : ''} onClick={() => setRange(key)}>
+              {key}
+            </button>
+          ))}
+        </div>
+      </div>
+      <svg viewBox={`0 0 ${CHART_WIDTH} ${CHART_HEIGHT}`} preserveAspectRatio="none" className="trend-svg">
+        <line x1="0" x2={CHART_WIDTH} y1={y(0.8)} y2={y(0.8)} className="trend-threshold" />
+        {data &&
+          Object.entries(data.series).map(([mode, series]) => (
+            <polyline
+              key={mode}
+              fill="none"
+              stroke={MODE_COLORS[mode] || 'var(--primary-light)'}
+              strokeWidth="2"
+              vectorEffect="non-scaling-stroke"
+              points={series.points
+                .filter(p => p.overall_score !== null)
+                .map(p => `${x(p.t).toFixed(1)},${y(p.overall_score as number).toFixed(1)}`)
+                .join(' ')}
+            />
+          ))}
+      </svg>
+      <div className="trend-footer">
+        {data && Object.keys(data.series).length === 0 && <span>No evaluations in this range</span>}
+        {data &&
+          Object.entries(data.series).map(([mode, series]) => (
+            <span key={mode} className="trend-mode">
+              <span className="legend-dot" style={{ background: MODE_COLORS[mode] || 'var(--primary-light)' }}></span>
+              {mode} ({series.evaluated})
+            </span>
+          ))}
+        {data && <span className="trend-resolution">per {data.resolution}</span>}
+      </div>
+    </div>
+  );
+};
+
 const MetricsDashboard = ({ metrics }: Props) => {
   const getScoreColor = (score: number): string => {
     if (score >= 0.8) return 'high';
@@ -136,6 +215,8 @@ const MetricsDashboard = ({ metrics }: Props) => {
         </div>
       </div>
 
+      <TrendChart refreshKey={metrics.total_queries} />
+
       <div className="metrics-legend">
         <div className="legend-item">
           <span className="legend-dot high"></span>
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Nearest golden question lookup for online evaluation.
+
+In API mode ``evaluate_response`` has no expected answer, so without help it
+scores a response against itself. ``GoldenIndex`` maps an incoming query to a
+known test case so live traffic can be scored against real ground truth:
+
+1. Exact: the normalized question (``query_normalizer.normalize_query``,
+   then stopwords removed) is looked up in a dict.
+2. Lexical: otherwise candidates sharing a token are scored with IDF-weighted
+   cosine similarity; the best one is accepted at ``min_similarity`` or above,
+   and only if every number in the query (sizes, grades) matches the case, so
+   "TMT 12mm" never borrows the answer for "TMT 16mm".
+
+Both steps are dict/set operations over a few thousand entries at most, so a
+lookup costs microseconds. Golden cases come from ``test_cases.json`` plus any
+files listed in ``ZENBOT_GOLDEN_SET`` (comma-separated JSON arrays or JSONL,
+each row with ``input`` and ``expected_answer``).
+
+Usage:
+  python3 golden_index.py "yield strength of fe 550d 16mm"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from kb_ingest import tokenize
+from query_normalizer import normalize_query
+
+DEFAULT_TEST_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_cases.json")
+DEFAULT_MIN_SIMILARITY = 0.8
+
+_NUMBER_RE = re.compile(r"\d")
+
+
+def _tokens(text: str) -> List[str]:
+    # Canonical grades/sizes/synonyms, so "Fe550D 16 mm" keys like "fe 550d 16mm"
+    return tokenize(normalize_query(text))
+
+
+def normalize_question(text: str) -> str:
+    """Canonical form used for the exact-match key."""
+    return " ".join(_tokens(text))
+
+
+def _numbers(tokens: Iterable[str]) -> frozenset:
+    return frozenset(t for t in tokens if _NUMBER_RE.search(t))
+
+
+def load_golden_cases(paths: Iterable[str]) -> List[Dict]:
+    """Read golden cases from JSON arrays or JSONL files; missing files are skipped."""
+    cases = []
+    for path in paths:
+        p = Path(path)
+        if not p.exists():
+            print(f"⚠️  Golden set not found: {p}")
+            continue
+        raw = p.read_text(encoding="utf-8")
+        if p.suffix == ".jsonl":
+            rows = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        else:
+            rows = json.loads(raw)
+        for row in rows:
+            if row.get("input") and row.get("expected_answer"):
+                cases.append({
+                    "id": str(row.get("id", len(cases) + 1)),
+                    "input": row["input"],
+                    "expected_answer": row["expected_answer"],
+                    "source": p.name,
+                })
+    return cases
+
+
+class GoldenIndex:
+    """Exact-hash then lexical nearest-neighbour lookup over golden questions."""
+
+    def __init__(self, cases: List[Dict], min_similarity: float = DEFAULT_MIN_SIMILARITY):
+        self.cases = cases
+        self.min_similarity = min_similarity
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._vectors: List[Dict[str, float]] = []
+        self._numbers: List[frozenset] = []
+
+        tokenized = [_tokens(c["input"]) for c in cases]
+        df = Counter(t for tokens in tokenized for t in set(tokens))
+        n = len(cases)
+        self._idf = {t: math.log((n + 1) / (f + 0.5)) for t, f in df.items()}
+        for i, tokens in enumerate(tokenized):
+            # First case wins on duplicate questions
+            self._exact.setdefault(" ".join(tokens), i)
+            for t in set(tokens):
+                self._postings.setdefault(t, []).append(i)
+            self._vectors.append(self._weigh(tokens))
+            self._numbers.append(_numbers(tokens))
+
+    @classmethod
+    def from_files(cls, paths: Optional[Iterable[str]] = None,
+                   min_similarity: Optional[float] = None) -> "GoldenIndex":
+        """Build from test_cases.json plus ZENBOT_GOLDEN_SET files."""
+        if paths is None:
+            extra = os.environ.get("ZENBOT_GOLDEN_SET", "")
+            paths = [DEFAULT_TEST_CASES] + [p.strip() for p in extra.split(",") if p.strip()]
+        if min_similarity is None:
+            min_similarity = float(os.environ.get("ZENBOT_GOLDEN_MIN_SIMILARITY", DEFAULT_MIN_SIMILARITY))
+        return cls(load_golden_cases(paths), min_similarity)
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def _weigh(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(tokens)
+        # Unknown tokens get the highest IDF: they count against a match
+        default_idf = math.log(len(self.cases) + 1) + 1.0
+        vec = {t: c * self._idf.get(t, default_idf) for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    def _result(self, i: int, method: str, confidence: float) -> Dict:
+        case = self.cases[i]
+        return {
+            "case_id": case["id"],
+            "question": case["input"],
+            "expected_answer": case["expected_answer"],
+            "source": case["source"],
+            "method": method,
+            "confidence": round(confidence, 3),
+        }
+
+    def match(self, query: str) -> Optional[Dict]:
+        """Nearest golden case for ``query``, or None below the threshold."""
+        tokens = _tokens(query)
+        if not tokens:
+            return None
+        exact = self._exact.get(" ".join(tokens))
+        if exact is not None:
+            return self._result(exact, "exact", 1.0)
+
+        vec = self._weigh(tokens)
+        numbers = _numbers(tokens)
+        candidates = {i for t in vec for i in self._postings.get(t, ())}
+        best, best_score = None, 0.0
+        for i in candidates:
+            if self._numbers[i] != numbers:
+                continue
+            case_vec = self._vectors[i]
+            score = sum(w * case_vec.get(t, 0.0) for t, w in vec.items())
+            if score > best_score:
+                best, best_score = i, score
+        if best is None or best_score < self.min_similarity:
+            return None
+        return self._result(best, "lexical", best_score)
+
+
+@lru_cache(maxsize=1)
+def default_index() -> GoldenIndex:
+    """Process-wide index, built on first use."""
+    index = GoldenIndex.from_files()
+    print(f"✅ Golden index loaded: {len(index)} cases")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up the nearest golden test case")
+    parser.add_argument("query")
+    parser.add_argument("--golden", nargs="*", help="Golden set files (default: test_cases.json + ZENBOT_GOLDEN_SET)")
+    args = parser.parse_args()
+    index = GoldenIndex.from_files(args.golden)
+    print(json.dumps(index.match(args.query), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
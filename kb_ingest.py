@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""Document ingestion for the ZenBot knowledge base.
+
+Reads a directory of text / markdown / PDF-extracted documents, chunks them,
+extracts metadata and writes a new *index generation* containing the
+documents, a lexical (BM25) index and a vector index:
+
+  <index>/gen-000007/documents.json   documents, chunks, per-file content hash
+  <index>/gen-000007/lexical.json     postings: term -> [[chunk, tf], ...]
+  <index>/gen-000007/vectors.f32      float32 chunk embeddings, row-major
+  <index>/gen-000007/meta.json        generation number, dims, counts
+  <index>/CURRENT                     name of the live generation
+
+Only files whose content hash changed since the previous generation are
+re-chunked and re-embedded (everything is, if the embedder or the chunk size
+changed). The generation is written to a temporary directory, renamed to the
+next free ``gen-NNNNNN`` (a concurrent ingest that took the number first makes
+this one move on to the next) and published by atomically replacing
+``CURRENT``; the service's KB snapshot
+watcher (kb_snapshot.py) notices the new pointer and swaps it in, so a running
+service picks up a price update without a restart.
+
+Metadata comes from an optional front-matter block at the top of the file:
+
+  ---
+  id: tmt_12mm_price_current
+  title: TMT 12mm pricing
+  source: pricing_december_2024.pdf
+  date: 2024-12-01
+  version: current          # or "outdated"
+  ---
+
+Missing fields fall back to ``Source:`` / ``Date:`` lines in the text, the
+first markdown heading, the first ISO date, the file name and its mtime.
+A document whose id matches a built-in document replaces it.
+
+Usage:
+  python3 kb_ingest.py kb_docs/ --index kb_index
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import time
+import uuid
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from context_packer import DEFAULT_CHUNK_TOKENS, chunk_document
+
+DEFAULT_INDEX_DIR = os.environ.get(
+    "ZENBOT_KB_INDEX", os.path.join(os.path.dirname(os.path.abspath(__file__)), "kb_index")
+)
+SUPPORTED_SUFFIXES = (".txt", ".md", ".markdown")
+KEEP_GENERATIONS = 3
+
+EMBEDDING_DIM = 256
+EMBEDDER = f"hashing-v1-{EMBEDDING_DIM}"
+# Chunks (and so their term counts and embeddings) are reused only if they were cut the same way
+CHUNKER = f"sentences-v1-{DEFAULT_CHUNK_TOKENS}"
+
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or per the "
+    "to was what whats which with you your".split()
+)
+_DATE_RE = re.compile(r"\b(20\d{2}-\d{2}-\d{2})\b")
+_FIELD_RE = re.compile(r"^(source|date)\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+# -- parsing ------------------------------------------------------------------
+
+def _parse_front_matter(text: str) -> Tuple[Dict[str, str], str]:
+    if not text.startswith("---"):
+        return {}, text
+    end = text.find("\n---", 3)
+    if end == -1:
+        return {}, text
+    fields = {}
+    for line in text[3:end].splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            value = value.split("#", 1)[0].strip()
+            if value:
+                fields[key.strip().lower()] = value
+    return fields, text[end + 4:].lstrip("\n")
+
+
+def parse_document(path: Path, root: Path, raw: str) -> Dict:
+    """Build a KB document dict (id, title, text, metadata) from a file."""
+    fields, body = _parse_front_matter(raw)
+    inline = {m.group(1).lower(): m.group(2).strip() for m in _FIELD_RE.finditer(body)}
+
+    title = fields.get("title")
+    if not title:
+        heading = re.search(r"^#\s+(.+)$", body, re.MULTILINE)
+        title = heading.group(1).strip() if heading else path.stem.replace("_", " ")
+
+    date = fields.get("date") or inline.get("date")
+    if not date:
+        found = _DATE_RE.search(body)
+        date = found.group(1) if found else datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d")
+
+    rel = path.relative_to(root).with_suffix("")
+    doc_id = fields.get("id") or re.sub(r"\W+", "_", str(rel)).strip("_").lower()
+    version = fields.get("version", "current").lower()
+    return {
+        "id": doc_id,
+        "title": title,
+        "text": body.strip() if path.suffix.lower() in (".md", ".markdown") else " ".join(body.split()),
+        "metadata": {
+            "source": fields.get("source") or inline.get("source") or path.name,
+            "date": date,
+            "version": "outdated" if version == "outdated" else "current",
+        },
+    }
+
+
+# -- indexing -----------------------------------------------------------------
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def embed_text(text: str) -> List[float]:
+    """Feature-hashing embedding (unigrams + bigrams), L2-normalised.
+
+    A local stand-in for a sentence embedding model; swap this function (and
+    EMBEDDER) for a real model. Generations record EMBEDDER, and a change
+    forces every chunk to be re-embedded.
+    """
+    vec = [0.0] * EMBEDDING_DIM
+    words = tokenize(text)
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % EMBEDDING_DIM] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _generation_number(name: str) -> int:
+    try:
+        return int(name.rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def current_generation(index_dir: str = DEFAULT_INDEX_DIR) -> Optional[str]:
+    """Name of the live generation, or None if nothing was ingested yet."""
+    try:
+        name = (Path(index_dir) / "CURRENT").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return name or None
+
+
+def ingest(source_dir: str, index_dir: str = DEFAULT_INDEX_DIR) -> Dict:
+    """Ingest ``source_dir`` into a new generation and publish it."""
+    root = Path(source_dir)
+    index = Path(index_dir)
+    index.mkdir(parents=True, exist_ok=True)
+
+    previous: Dict[str, Dict] = {}
+    prev_vectors = array("f")
+    prev_name = current_generation(index_dir)
+    if prev_name:
+        prev_dir = index / prev_name
+        prev_meta = json.loads((prev_dir / "meta.json").read_text(encoding="utf-8"))
+        if prev_meta.get("embedder") == EMBEDDER and prev_meta.get("chunker") == CHUNKER:
+            previous = json.loads((prev_dir / "documents.json").read_text(encoding="utf-8"))["files"]
+            with open(prev_dir / "vectors.f32", "rb") as f:
+                prev_vectors.frombytes(f.read())
+
+    files: Dict[str, Dict] = {}
+    vectors = array("f")
+    changed, reused = 0, 0
+    for path in sorted(p for p in root.rglob("*") if p.suffix.lower() in SUPPORTED_SUFFIXES):
+        raw_bytes = path.read_bytes()
+        digest = hashlib.sha256(raw_bytes).hexdigest()
+        rel = str(path.relative_to(root))
+        old = previous.get(rel)
+
+        if old and old["hash"] == digest:
+            # Unchanged file: reuse chunks, term counts and embeddings
+            entry = dict(old)
+            start = len(vectors) // EMBEDDING_DIM
+            for row in old["rows"]:
+                vectors.extend(prev_vectors[row * EMBEDDING_DIM:(row + 1) * EMBEDDING_DIM])
+            entry["rows"] = list(range(start, start + len(old["rows"])))
+            reused += 1
+        else:
+            doc = parse_document(path, root, raw_bytes.decode("utf-8", errors="replace"))
+            chunks = chunk_document(doc, DEFAULT_CHUNK_TOKENS)
+            start = len(vectors) // EMBEDDING_DIM
+            terms = []
+            for c in chunks:
+                vectors.extend(embed_text(f"{doc['title']} {c['text']}"))
+                counts: Dict[str, int] = {}
+                for t in tokenize(f"{doc['title']} {c['text']}"):
+                    counts[t] = counts.get(t, 0) + 1
+                terms.append(counts)
+            if len(chunks) > 1:
+                doc["chunks"] = chunks
+            entry = {"hash": digest, "doc": doc, "terms": terms,
+                     "rows": list(range(start, start + len(chunks)))}
+            changed += 1
+        files[rel] = entry
+
+    # Lexical index over every chunk (term counts are cached per file)
+    postings: Dict[str, List[List[int]]] = {}
+    lengths: List[int] = []
+    chunk_owner: List[str] = []
+    for rel, entry in files.items():
+        for row, counts in zip(entry["rows"], entry["terms"]):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append([row, tf])
+            lengths.append(sum(counts.values()))
+            chunk_owner.append(rel)
+
+    # Unique per call, so concurrent ingests (threads included) never share it
+    tmp = index / f".gen.tmp{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    tmp.mkdir()
+    (tmp / "documents.json").write_text(
+        json.dumps({"files": files, "chunk_owner": chunk_owner}, ensure_ascii=False), encoding="utf-8")
+    (tmp / "lexical.json").write_text(json.dumps({"postings": postings, "lengths": lengths}), encoding="utf-8")
+    with open(tmp / "vectors.f32", "wb") as f:
+        vectors.tofile(f)
+    meta = {
+        "created": datetime.now().isoformat(),
+        "embedder": EMBEDDER,
+        "chunker": CHUNKER,
+        "dim": EMBEDDING_DIM,
+        "documents": len(files),
+        "chunks": len(chunk_owner),
+        "changed": changed,
+        "reused": reused,
+    }
+    number = max((_generation_number(p.name) for p in index.glob("gen-*")), default=0) + 1
+    while True:
+        name = f"gen-{number:06d}"
+        meta["generation"] = name
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        try:
+            # Fails if the directory exists: another ingest published this number first
+            os.rename(tmp, index / name)
+            break
+        except OSError:
+            if not (index / name).exists():
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+            number += 1
+
+    # Publish: readers switch on the next poll. A concurrent ingest that
+    # already published a later generation stays live.
+    live = current_generation(index_dir)
+    if not live or _generation_number(live) < number:
+        pointer_tmp = index / f"CURRENT{tmp.name}"
+        pointer_tmp.write_text(name, encoding="utf-8")
+        os.replace(pointer_tmp, index / "CURRENT")
+
+    generations = sorted((p for p in index.glob("gen-*") if p.is_dir()), key=lambda p: _generation_number(p.name))
+    for old_dir in generations[:-KEEP_GENERATIONS]:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+# -- reading ------------------------------------------------------------------
+
+class KBIndex:
+    """One loaded, read-only index generation."""
+
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.generation = self.meta["generation"]
+        data = json.loads((self.path / "documents.json").read_text(encoding="utf-8"))
+        lexical = json.loads((self.path / "lexical.json").read_text(encoding="utf-8"))
+        self.postings: Dict[str, List[List[int]]] = lexical["postings"]
+        self.lengths: List[int] = lexical["lengths"]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 1.0
+        # Memory-mapped read-only, so every worker process on the host shares
+        # one copy of the embeddings through the page cache
+        self.dim = self.meta["dim"]
+        self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        with open(self.path / "vectors.f32", "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.vectors = np.frombuffer(mapped, dtype=np.float32).reshape(-1, self.dim)
+
+        self.row_doc: Dict[int, Dict] = {}
+        self.docs: Dict[str, List[Dict]] = {"current": [], "outdated": []}
+        for entry in data["files"].values():
+            doc = entry["doc"]
+            self.docs[doc["metadata"].get("version", "current")].append(doc)
+            for row in entry["rows"]:
+                self.row_doc[row] = doc
+
+    def _bm25(self, terms: List[str]) -> Dict[int, float]:
+        n = len(self.lengths)
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for row, tf in plist:
+                norm = tf + self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * self.lengths[row] / self.avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.BM25_K1 + 1) / norm
+        return scores
+
+    def _cosine_many(self, queries: List[str], min_cosine: float) -> List[Dict[int, float]]:
+        """Chunks with a cosine similarity of at least ``min_cosine`` to each query.
+
+        Embeddings are L2-normalised, so this is one (queries x dim) @ (dim x
+        chunks) product over the memory-mapped vectors.
+        """
+        embedded = np.array([embed_text(q) for q in queries], dtype=np.float32).reshape(len(queries), self.dim)
+        similarity = embedded @ self.vectors.T
+        scores = []
+        for row_scores in similarity:
+            rows = np.flatnonzero(row_scores >= min_cosine)
+            scores.append(dict(zip(rows.tolist(), row_scores[rows].tolist())))
+        return scores
+
+    def search(self, query: str, version_key: str = "current", k: int = 3,
+               min_cosine: float = 0.25) -> List[Dict]:
+        """Hybrid lexical + vector search, returning whole documents.
+
+        Rankings are merged with reciprocal rank fusion; chunks need a BM25 hit
+        or a cosine similarity of at least ``min_cosine`` to qualify.
+        """
+        return self.search_many([query], version_key, k, min_cosine)[0]
+
+    def search_many(self, queries: List[str], version_key: str = "current", k: int = 3,
+                    min_cosine: float = 0.25) -> List[List[Dict]]:
+        """``search`` for several queries, reading each chunk vector once."""
+        results = []
+        for query, dense in zip(queries, self._cosine_many(queries, min_cosine)):
+            lexical = self._bm25(tokenize(query))
+            fused: Dict[int, float] = {}
+            for ranking in (lexical, dense):
+                for pos, row in enumerate(sorted(ranking, key=ranking.get, reverse=True)):
+                    fused[row] = fused.get(row, 0.0) + 1.0 / (60 + pos)
+
+            hits, seen = [], set()
+            for row in sorted(fused, key=fused.get, reverse=True):
+                doc = self.row_doc[row]
+                if doc["metadata"].get("version", "current") != version_key or doc["id"] in seen:
+                    continue
+                seen.add(doc["id"])
+                hits.append(doc)
+                if len(hits) >= k:
+                    break
+            results.append(hits)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest documents into the ZenBot KB index")
+    parser.add_argument("source", help="Directory of .txt/.md documents")
+    parser.add_argument("--index", default=DEFAULT_INDEX_DIR, help="Index directory")
+    args = parser.parse_args()
+
+    if not Path(args.source).is_dir():
+        print(f"Source directory not found: {args.source}")
+        return
+    started = time.perf_counter()
+    meta = ingest(args.source, args.index)
+    elapsed = time.perf_counter() - started
+    print(f"Published {meta['generation']}: {meta['documents']} documents, {meta['chunks']} chunks "
+          f"({meta['changed']} changed, {meta['reused']} reused) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Versioned, immutable knowledge base snapshots with read-copy-update swaps.
+
+A ``KBSnapshot`` is the complete KB a query runs against: the built-in
+documents overlaid with one ingested index generation. ``SnapshotManager``
+holds a pointer to the live snapshot:
+
+- readers pin the live snapshot for the duration of a query
+  (``with manager.current() as kb: ...``);
+- ``refresh()`` builds a new snapshot off to the side and swaps the pointer
+  under a short lock, so new queries see it immediately while in-flight queries
+  finish on the snapshot they started with;
+- a retired snapshot drops its documents and index once its last reader is
+  done, so memory is released even if something still holds the object.
+
+A background watcher polls for new index generations, so a daily price-list
+refresh never blocks a request or requires restarting workers.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class KBSnapshot:
+    """Immutable KB contents plus the version stamped into responses and traces."""
+
+    def __init__(self, documents: Dict[str, List[Dict]], index=None, generation: Optional[str] = None):
+        self.documents = {k: tuple(v) for k, v in documents.items()}
+        self.index = index
+        self.generation = generation
+        payload = json.dumps(documents, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:8]
+        self.version = f"kb-{generation or 'builtin'}-{digest}"
+        self._readers = 0
+        self._retired = False
+        self._released = False
+        self._derived: Dict[str, object] = {}
+        # Guards _derived; each key also has a lock held while it is built
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def docs(self, version_key: str):
+        return self.documents.get(version_key, ())
+
+    def derived(self, key: str, factory: Callable[["KBSnapshot"], object]):
+        """Return a structure computed once from this snapshot (e.g. a lookup table).
+
+        Concurrent first calls for a key wait for one build instead of each
+        running ``factory``; other keys build in parallel.
+        """
+        with self._lock:
+            value = self._derived.get(key)
+            if value is not None:
+                return value
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                value = self._derived.get(key)
+            if value is None:
+                value = factory(self)
+                with self._lock:
+                    # Not kept once released, or it would outlive the snapshot's data
+                    if not self._released:
+                        self._derived[key] = value
+        return value
+
+    def release(self) -> None:
+        """Drop references to the documents, index and derived data (last reader gone)."""
+        with self._lock:
+            self._released = True
+            self.documents = {}
+            self.index = None
+            self._derived = {}
+            self._build_locks = {}
+
+    def __repr__(self) -> str:
+        return f"KBSnapshot({self.version})"
+
+
+class SnapshotManager:
+    """Holds the live snapshot pointer and swaps it atomically."""
+
+    def __init__(self, loader: Callable[[], KBSnapshot], probe: Callable[[], Optional[str]] = None):
+        """``loader`` builds a full snapshot; ``probe`` cheaply returns the
+        generation that ``loader`` would load (used to skip no-op reloads)."""
+        self._loader = loader
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._current: Optional[KBSnapshot] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def version(self) -> Optional[str]:
+        snap = self._current
+        return snap.version if snap is not None else None
+
+    def _ensure_loaded(self) -> None:
+        if self._current is None:
+            self.refresh(force=True)
+
+    @contextmanager
+    def current(self) -> Iterator[KBSnapshot]:
+        """Pin the live snapshot for the duration of the ``with`` block."""
+        self._ensure_loaded()
+        with self._lock:
+            snap = self._current
+            snap._readers += 1
+        try:
+            yield snap
+        finally:
+            with self._lock:
+                snap._readers -= 1
+                done = snap._retired and snap._readers == 0
+            if done:
+                snap.release()
+
+    def swap(self, new: KBSnapshot) -> KBSnapshot:
+        """Publish ``new`` as the live snapshot and retire the old one."""
+        with self._lock:
+            old, self._current = self._current, new
+            if old is not None:
+                old._retired = True
+                done = old._readers == 0
+            else:
+                done = False
+        if done:
+            old.release()
+        return new
+
+    def refresh(self, force: bool = False) -> bool:
+        """Build and publish a new snapshot if the source changed.
+
+        Building happens outside the pointer lock; only the swap is serialised.
+        Returns True if a new snapshot was published.
+        """
+        with self._refresh_lock:
+            current = self._current
+            if not force and current is not None and self._probe is not None:
+                if self._probe() == current.generation:
+                    return False
+            new = self._loader()
+            if current is not None and new.version == current.version:
+                return False
+            self.swap(new)
+            print(f"KB snapshot {new.version} is live")
+            return True
+
+    def start_watcher(self, interval: float = 5.0) -> None:
+        """Poll for new index generations in a daemon thread."""
+        if self._watcher is not None:
+            return
+
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Warning: KB refresh failed: {e}")
+
+        self._watcher = threading.Thread(target=_run, name="kb-snapshot-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
@@ -0,0 +1,96 @@
+"""Precompiled prompt template for ZenBot.
+
+``build_prompt`` used to rebuild the instruction string and re-format every
+document block with an f-string on each call. ``PromptTemplate`` renders the
+fixed instruction prefix once and caches each formatted document block, keyed
+by the document id and every field that appears in the block (so an updated
+price or date produces a new block, never a stale one). Rendering a prompt is
+then a single ``"".join`` over cached segments.
+
+``prefix_hash`` identifies the fixed instruction prefix and can be used as the
+key for provider-side prompt/context caching.
+"""
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Bump whenever the wording or layout of rendered prompts changes
+PROMPT_TEMPLATE_ID = "zenbot-rag-v2"
+
+SYSTEM_INSTRUCTIONS = (
+    "You are ZenithSteel ZenBot. Answer only using the information explicitly provided in the\n"
+    "retrieved documents below. Do not hallucinate. For specifications, cite the standard.\n"
+    "For prices, include the document date. If information isn't available in the retrieved\n"
+    "documents, admit you don't have it. Provide short, factual answers and include the\n"
+    "document source and date for each factual claim."
+)
+
+NO_DOCUMENTS = "(No retrieved documents)"
+DOC_SEPARATOR = "\n\n"
+
+
+class PromptTemplate:
+    """Compiled prompt: static prefix, cached document blocks and a suffix."""
+
+    def __init__(self, template_id: str = PROMPT_TEMPLATE_ID,
+                 instructions: str = SYSTEM_INSTRUCTIONS, max_cached_blocks: int = 4096):
+        self.template_id = template_id
+        self.instructions = instructions
+        self.prefix = f"{instructions}\n\nRetrieved documents:\n"
+        self.conversation_prefix = "\n\nConversation so far:\n"
+        self.question_prefix = "\n\nUser question: "
+        self.suffix = "\n\nAnswer:"
+        self.prefix_hash = hashlib.sha256(
+            f"{template_id}\x00{self.prefix}".encode("utf-8")
+        ).hexdigest()
+        self._block = lru_cache(maxsize=max_cached_blocks)(self._format_block)
+
+    @staticmethod
+    def doc_key(doc: Dict) -> Tuple[str, str, str, str, str]:
+        """Cache key for a document version (id plus every rendered field)."""
+        meta = doc.get("metadata", {})
+        return (doc["id"], doc.get("title", ""), meta.get("source", ""),
+                meta.get("date", ""), doc.get("text", ""))
+
+    @staticmethod
+    def _format_block(doc_id: str, title: str, source: str, date: str, text: str) -> str:
+        return f"Document ID: {doc_id}\nTitle: {title}\nSource: {source}\nDate: {date}\nContent: {text}"
+
+    def doc_block(self, doc: Dict) -> str:
+        """Return the (cached) rendered block for one document."""
+        return self._block(*self.doc_key(doc))
+
+    def segments(self, question: str, docs: List[Dict], conversation: Optional[str] = None) -> List[str]:
+        """Return the prompt as a list of segments; the first is the fixed prefix.
+
+        ``conversation`` (earlier turns of the session) goes between the
+        documents and the question, so the cacheable prefix is unchanged.
+        """
+        parts = [self.prefix]
+        if docs:
+            for i, d in enumerate(docs):
+                if i:
+                    parts.append(DOC_SEPARATOR)
+                parts.append(self.doc_block(d))
+        else:
+            parts.append(NO_DOCUMENTS)
+        if conversation:
+            parts.extend((self.conversation_prefix, conversation))
+        parts.extend((self.question_prefix, question, self.suffix))
+        return parts
+
+    def render(self, question: str, docs: List[Dict], conversation: Optional[str] = None) -> str:
+        """Assemble the full prompt string."""
+        return "".join(self.segments(question, docs, conversation))
+
+    def cache_info(self):
+        """Hit/miss statistics of the document block cache."""
+        return self._block.cache_info()
+
+    def clear_cache(self) -> None:
+        self._block.cache_clear()
+
+
+DEFAULT_TEMPLATE = PromptTemplate()
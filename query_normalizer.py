@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Query normalization and intent classification.
+
+Retrieval, the answer cache, the golden index, the fact-table fast path and
+``match_tests_to_traces`` all used to lowercase the raw question and match
+substrings, so "Fe550D", "fe 550 d", "16 mm" and "16mm" missed each other.
+Every consumer now goes through ``analyze``:
+
+- ``normalize_query``: lowercase, drop apostrophes, canonical grades
+  ("fe 550d"), sizes ("16mm"), units ("per mt", "n/mm2"), domain synonyms
+  ("rebar" -> "tmt", "shipping" -> "delivery") and spelling tolerance
+  (one-edit typos of domain words, via a precomputed deletion index).
+- ``IntentClassifier``: multinomial naive Bayes over normalized unigrams and
+  bigrams (spec, price, delivery, availability, engineering). It is trained
+  offline from ``intent_examples.json`` into ``intent_model.json`` and
+  classifying is a dict lookup per feature.
+
+``analyze`` is memoized, so repeated questions cost one cache hit.
+
+Usage:
+  python3 query_normalizer.py train      # rebuild intent_model.json
+  python3 query_normalizer.py "wats the yeild strenght of fe550 d 16 mm"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from kb_ingest import tokenize
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_EXAMPLES = os.path.join(_HERE, "intent_examples.json")
+DEFAULT_MODEL = os.path.join(_HERE, "intent_model.json")
+INTENTS = ("spec", "price", "delivery", "availability", "engineering")
+
+_GRADE_RE = re.compile(r"\bfe\s*-?\s*(\d{3})\s*(d\b)?")
+_SIZE_RE = re.compile(r"\b(\d{1,2})\s*(?:mm|millimet(?:er|re)s?)\b")
+_PER_TON_RE = re.compile(r"(?:\bper\b|/)\s*(?:metric\s+)?(?:mt|tons?|tonnes?)\b")
+_STRENGTH_UNIT_RE = re.compile(r"\bn\s*/\s*mm(?:2|²|\^2)")
+_PUNCT_RE = re.compile(r"[?!,;:()\"]")
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+# Whole-word synonyms, applied after canonicalization
+SYNONYMS = {
+    "rebar": "tmt", "rebars": "tmt", "tor": "tmt",
+    "shipping": "delivery", "shipment": "delivery", "transport": "delivery", "freight": "delivery",
+    "dispatch": "delivery",
+    "rate": "price", "rates": "price", "pricing": "price",
+    "tonne": "ton", "tonnes": "ton", "tons": "ton",
+    "storey": "story", "storeys": "story", "stories": "story",
+    "mpa": "n/mm2",
+}
+
+# Words typos are corrected towards (spelling tolerance is limited to these)
+DOMAIN_TERMS = (
+    "yield tensile strength elongation ductility weldability chemical chemicals composition carbon "
+    "manganese sulfur sulphur phosphorus specification specifications grade price cost charge charges "
+    "delivery ranchi jamshedpur dhanbad express available availability stock inventory offer size "
+    "sizes difference compare building foundation structural engineer engineering seismic bridge "
+    "column beam slab current latest minimum maximum standard"
+).split()
+
+
+def _edits1_deletes(word: str) -> List[str]:
+    return [word[:i] + word[i + 1:] for i in range(len(word))]
+
+
+def _damerau1(a: str, b: str) -> bool:
+    """True if a and b differ by one insertion, deletion, substitution or adjacent swap."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < min(la, lb) and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+    return a[i + 1:] == b[i:] if la > lb else a[i:] == b[i + 1:]
+
+
+class _SpellIndex:
+    """Symmetric-delete index (edit distance 1) over a fixed vocabulary."""
+
+    def __init__(self, vocabulary: Iterable[str]):
+        self.vocabulary = set(vocabulary)
+        self._deletes: Dict[str, set] = {}
+        for word in self.vocabulary:
+            for key in [word] + _edits1_deletes(word):
+                self._deletes.setdefault(key, set()).add(word)
+
+    def correct(self, token: str) -> str:
+        if token in self.vocabulary or len(token) < 5:
+            return token
+        candidates = set()
+        for key in [token] + _edits1_deletes(token):
+            candidates |= self._deletes.get(key, set())
+        candidates = {w for w in candidates if _damerau1(token, w)}
+        return candidates.pop() if len(candidates) == 1 else token
+
+
+def _load_examples(path: str = DEFAULT_EXAMPLES) -> List[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+@lru_cache(maxsize=1)
+def _spell_index() -> _SpellIndex:
+    vocabulary = set(DOMAIN_TERMS) | set(SYNONYMS) | set(SYNONYMS.values())
+    for example in _load_examples():
+        vocabulary.update(_TOKEN_RE.findall(example["text"].lower().replace("'", "")))
+    return _SpellIndex(w for w in vocabulary if w.isalpha())
+
+
+def normalize_query(text: str) -> str:
+    """Canonical lowercase form of a question (grades, sizes, units, synonyms, typos)."""
+    q = text.lower().replace("'", "").replace("’", "")
+    q = _PUNCT_RE.sub(" ", q)
+    q = _STRENGTH_UNIT_RE.sub(" n/mm2 ", q)
+    q = _PER_TON_RE.sub(" per mt ", q)
+    q = _SIZE_RE.sub(lambda m: f" {m.group(1)}mm ", q)
+    q = _GRADE_RE.sub(lambda m: f" fe {m.group(1)}{'d' if m.group(2) else ''} ", q)
+    spell = _spell_index()
+    words = []
+    for word in q.split():
+        if word.isalpha():
+            word = spell.correct(word)
+            word = SYNONYMS.get(word, word)
+        words.append(word.strip("."))
+    return " ".join(w for w in words if w)
+
+
+def _features(normalized: str) -> List[str]:
+    tokens = tokenize(normalized)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes over normalized unigrams + bigrams."""
+
+    def __init__(self, model: Dict):
+        self.labels: List[str] = model["labels"]
+        self.priors: Dict[str, float] = model["priors"]
+        self.log_probs: Dict[str, Dict[str, float]] = model["log_probs"]
+        self.unknown: Dict[str, float] = model["unknown"]
+
+    @classmethod
+    def train(cls, examples: List[Dict], alpha: float = 0.5) -> "IntentClassifier":
+        counts = {label: Counter() for label in INTENTS}
+        docs = Counter()
+        for example in examples:
+            label = example["intent"]
+            docs[label] += 1
+            counts[label].update(_features(normalize_query(example["text"])))
+        vocabulary = set().union(*counts.values())
+        total_docs = sum(docs.values())
+        model = {"labels": list(INTENTS), "priors": {}, "log_probs": {}, "unknown": {}}
+        for label in INTENTS:
+            total = sum(counts[label].values()) + alpha * (len(vocabulary) + 1)
+            model["priors"][label] = math.log((docs[label] + 1) / (total_docs + len(INTENTS)))
+            model["log_probs"][label] = {f: math.log((counts[label][f] + alpha) / total) for f in counts[label]}
+            model["unknown"][label] = math.log(alpha / total)
+        return cls(model)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL) -> "IntentClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str = DEFAULT_MODEL) -> None:
+        model = {"labels": self.labels, "priors": self.priors, "log_probs": self.log_probs,
+                 "unknown": self.unknown}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(model, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    def classify(self, normalized: str) -> Tuple[Optional[str], float]:
+        """(intent, probability) for an already normalized query."""
+        features = _features(normalized)
+        if not features:
+            return None, 0.0
+        scores = {}
+        for label in self.labels:
+            probs, unknown = self.log_probs[label], self.unknown[label]
+            scores[label] = self.priors[label] + sum(probs.get(f, unknown) for f in features)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+
+@lru_cache(maxsize=1)
+def default_classifier() -> Optional[IntentClassifier]:
+    """Classifier from intent_model.json, or None if it has not been trained."""
+    try:
+        return IntentClassifier.load()
+    except FileNotFoundError:
+        print("⚠️  intent_model.json not found; run `python3 query_normalizer.py train`")
+        return None
+
+
+@lru_cache(maxsize=4096)
+def analyze(question: str) -> Dict:
+    """Normalized text, cache key, intent and confidence for a question."""
+    normalized = normalize_query(question)
+    classifier = default_classifier()
+    intent, confidence = classifier.classify(normalized) if classifier else (None, 0.0)
+    return {
+        "normalized": normalized,
+        "key": " ".join(tokenize(normalized)),
+        "intent": intent,
+        "confidence": round(confidence, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZenBot query normalization and intent model")
+    parser.add_argument("query", help='A question to analyze, or "train" to rebuild the intent model')
+    parser.add_argument("--examples", default=DEFAULT_EXAMPLES)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+    if args.query == "train":
+        examples = _load_examples(args.examples)
+        classifier = IntentClassifier.train(examples)
+        classifier.save(args.model)
+        correct = sum(classifier.classify(normalize_query(e["text"]))[0] == e["intent"] for e in examples)
+        print(f"✅ Trained on {len(examples)} examples ({correct}/{len(examples)} fit) -> {args.model}")
+        return
+    print(json.dumps(analyze(args.query), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
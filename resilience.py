@@ -0,0 +1,248 @@
+"""Resilience layer for the Gemini call in ``run_query``.
+
+``run_query`` used to call ``llm.invoke`` with no timeout, so a slow provider
+stalled users indefinitely. ``ResilientLLM`` wraps the call:
+
+- Per-attempt timeout: the call runs on a worker thread and is abandoned after
+  ``timeout`` seconds.
+- Circuit breaker per model: when the share of failed or too-slow calls
+  (latency above ``slow_call_seconds``) in the recent window crosses
+  ``failure_rate``, the model is skipped for ``open_seconds``; then a single
+  probe call decides whether it closes again.
+- Hedged requests (optional): if a call has not returned after the model's
+  recent p95 latency, a second identical call is started and the first answer
+  wins. Hedges are capped at ``max_hedge_ratio`` of calls.
+- Fallback tiers: models are tried in order (e.g. the primary model, then a
+  faster one). When every tier fails ``generate`` raises ``LLMUnavailable`` and
+  the caller falls back to a cached answer (``AnswerCache``) or a
+  retrieval-only template answer.
+
+Chat clients are created once per model and reused across queries.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class LLMUnavailable(RuntimeError):
+    """Every model tier failed, timed out or had its circuit open."""
+
+
+class CircuitBreaker:
+    """Closed -> open on too many failures/slow calls -> half-open probe -> closed."""
+
+    def __init__(self, name: str = "llm", failure_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 slow_call_seconds: float = 10.0, open_seconds: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._outcomes: deque = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def effective_state(self) -> str:
+        """State as the next call would see it (an expired open circuit is half-open)."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                return "half_open"
+            return self.state
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        failed = not ok or elapsed > self.slow_call_seconds
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+                if failed:
+                    self._trip()
+                else:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and \
+                    sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._trip()
+
+    def _trip(self) -> None:
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        print(f"⚠️  Circuit for {self.name} opened for {self.open_seconds:.0f}s")
+
+
+class LatencyTracker:
+    """Recent successful call latencies, for the hedging delay."""
+
+    def __init__(self, window: int = 200, default: float = 2.0):
+        self.default = default
+        self._samples: deque = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def p95(self) -> float:
+        if len(self._samples) < 20:
+            return self.default
+        ordered = sorted(self._samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class AnswerCache:
+    """LRU of recent good answers, keyed by KB version, mode and normalized question."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple, answer: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _Tier:
+    def __init__(self, model: str, breaker: CircuitBreaker):
+        self.model = model
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.client = None
+
+
+class ResilientLLM:
+    """Timeouts, circuit breakers, hedging and model fallback around a chat model."""
+
+    def __init__(self, models: List[str], client_factory: Callable[[str], object],
+                 invoke: Callable[[object, str, list], str], timeout: float = 15.0,
+                 hedge: bool = False, max_hedge_ratio: float = 0.1, max_workers: int = 32,
+                 breaker_factory: Callable[[str], CircuitBreaker] = CircuitBreaker):
+        self.tiers = [_Tier(m, breaker_factory(m)) for m in models]
+        self.client_factory = client_factory
+        self.invoke = invoke
+        self.timeout = timeout
+        self.hedge = hedge
+        self.max_hedge_ratio = max_hedge_ratio
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "hedged": 0, "timeouts": 0, "errors": 0, "short_circuited": 0}
+
+    @classmethod
+    def from_env(cls, client_factory, invoke) -> "ResilientLLM":
+        """Configure from ZENBOT_LLM_* / ZENBOT_BREAKER_* environment variables."""
+        env = os.environ.get
+        models = [m.strip() for m in env("ZENBOT_LLM_MODELS", "gemini-2.5-flash,gemini-2.0-flash-lite").split(",")
+                  if m.strip()]
+        slow = float(env("ZENBOT_LLM_SLOW_SECONDS", "10"))
+        return cls(
+            models, client_factory, invoke,
+            timeout=float(env("ZENBOT_LLM_TIMEOUT", "15")),
+            hedge=env("ZENBOT_LLM_HEDGE", "0") == "1",
+            breaker_factory=lambda model: CircuitBreaker(
+                model,
+                failure_rate=float(env("ZENBOT_BREAKER_FAILURE_RATE", "0.5")),
+                slow_call_seconds=slow,
+                open_seconds=float(env("ZENBOT_BREAKER_OPEN_SECONDS", "30")),
+            ),
+        )
+
+    def _client(self, tier: _Tier):
+        with self._lock:
+            if tier.client is None:
+                tier.client = self.client_factory(tier.model)
+            return tier.client
+
+    def warm_up(self) -> None:
+        """Create every tier's client now instead of on its first call."""
+        for tier in self.tiers:
+            self._client(tier)
+
+    def _should_hedge(self) -> bool:
+        with self._lock:
+            return self.hedge and self.stats["hedged"] < self.max_hedge_ratio * max(self.stats["calls"], 1)
+
+    def _attempt(self, tier: _Tier, prompt: str, callbacks: list) -> str:
+        """One call with hedging and a deadline; raises on error or timeout."""
+        client = self._client(tier)
+        deadline = time.monotonic() + self.timeout
+        futures = [self._pool.submit(self.invoke, client, prompt, callbacks)]
+        if self._should_hedge():
+            done, _ = wait(futures, timeout=min(tier.latency.p95(), self.timeout))
+            if not done:
+                with self._lock:
+                    self.stats["hedged"] += 1
+                futures.append(self._pool.submit(self.invoke, client, prompt, callbacks))
+        errors = []
+        while futures:
+            done, pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                # The abandoned call finishes on its worker thread and is ignored
+                raise TimeoutError(f"{tier.model} did not answer within {self.timeout:.0f}s")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                errors.append(future.exception())
+            futures = list(pending)
+        raise errors[-1]
+
+    def generate(self, prompt: str, callbacks: Optional[list] = None) -> Tuple[str, str]:
+        """Return (answer, model) from the first healthy tier, or raise LLMUnavailable."""
+        with self._lock:
+            self.stats["calls"] += 1
+        failures = []
+        for tier in self.tiers:
+            if not tier.breaker.allow():
+                with self._lock:
+                    self.stats["short_circuited"] += 1
+                failures.append(f"{tier.model}: circuit open")
+                continue
+            started = time.monotonic()
+            try:
+                answer = self._attempt(tier, prompt, callbacks or [])
+            except Exception as e:
+                elapsed = time.monotonic() - started
+                tier.breaker.record(False, elapsed)
+                with self._lock:
+                    self.stats["timeouts" if isinstance(e, TimeoutError) else "errors"] += 1
+                failures.append(f"{tier.model}: {e}")
+                continue
+            elapsed = time.monotonic() - started
+            tier.breaker.record(True, elapsed)
+            tier.latency.add(elapsed)
+            return answer, tier.model
+        raise LLMUnavailable("; ".join(failures))
+
+    def health(self) -> Dict[str, str]:
+        """Circuit state per model."""
+        return {tier.model: tier.breaker.effective_state() for tier in self.tiers}
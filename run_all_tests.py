@@ -8,14 +8,17 @@ for both "buggy" and "fixed" versions, generating comprehensive trace coverage.
 import os
 import json
 import sys
-from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Load environment variables FIRST before importing zenbot
-load_dotenv()
+from config import load_env
+
+load_env()
 
 # Import from zenbot AFTER loading environment
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from zenbot import run_query, LangChainTracer
+from zenbot import run_query, tracer_class
+from trace_store import TraceStore, DEFAULT_STORE_DIR
 
 
 def main():
@@ -28,6 +31,7 @@ def main():
     
     # Create tracer
     tracer = None
+    LangChainTracer = tracer_class()  # imported on first use
     if LangChainTracer is not None:
         project = os.environ.get("LANGSMITH_PROJECT", "Zen_Project")
         tracer = LangChainTracer(project_name=project)
@@ -35,9 +39,9 @@ def main():
     else:
         print("⚠️  LangSmith tracer not available (imports failed)")
     
-    # Create output directory
-    outdir = "langsmith_traces"
-    os.makedirs(outdir, exist_ok=True)
+    # Traces are appended to the compact segment store
+    outdir = DEFAULT_STORE_DIR
+    store = TraceStore(outdir)
     
     total_success = 0
     total_failed = 0
@@ -64,18 +68,18 @@ def main():
                 answer = trace["answer"].strip()
                 print(f"[Test {test_id}] Answer: {answer[:100]}...")
                 
-                # Save trace to file using test_id for consistent naming
-                fname = os.path.join(outdir, f"sim_trace_{version}_{test_id}.json")
-                with open(fname, "w", encoding="utf-8") as f:
-                    json.dump(trace, f, indent=2, ensure_ascii=False)
+                # Keep the test id with the trace for consistent matching
+                store.append({**trace, "test_id": test_id})
                 
-                print(f"[Test {test_id}] ✅ Trace saved to: {fname}")
+                print(f"[Test {test_id}] ✅ Trace recorded")
                 total_success += 1
                 
             except Exception as e:
                 print(f"[Test {test_id}] ❌ Error running query: {e}")
                 total_failed += 1
     
+    store.flush()
+    
     # Summary
     print(f"\n{'='*80}")
     print(f"📊 SUMMARY")
@@ -84,7 +88,7 @@ def main():
     print(f"❌ Failed: {total_failed}")
     print(f"📁 Traces saved to: {outdir}/")
     print(f"\nNext steps:")
-    print(f"1. Run: python scripts/langsmith_to_predictions.py --trace-dir {outdir}")
+    print(f"1. Run: python scripts/langsmith_to_predictions.py --tests test_cases.json --trace-file {outdir}")
     print(f"2. Run: python evaluators.py --predictions predictions_real.json")
     print(f"3. Check results and adjust thresholds if needed")
 
@@ -5,15 +5,20 @@ Exit codes:
   0 - pass
   1 - fail
 
-Thresholds (based on real baseline performance):
+Regression gate: when a baseline run exists (eval_baseline.json, see
+eval_regression.py), per-case scores are compared to it with paired diffs and
+bootstrap confidence intervals. A metric fails when its mean dropped
+significantly; the report lists the cases that flipped between pass and fail.
+Record a new baseline with --update-baseline.
+
+Absolute floors (checked with or without a baseline):
  - spec_accuracy average must be >= 0.08 (baseline: 0.10, allowing slight degradation)
  - hallucination_check average must be >= 0.50 (baseline: 0.70 in evaluators, 0.55 in check_results)
 
-NOTE: These thresholds are conservative based on the current ZenBot implementation.
-As the knowledge base expands and retrieval improves, thresholds should be increased.
-
 This script loads `test_cases.json` and `predictions.json` and computes simple scores.
+Scores are cached by content in the same file as evaluators.py (see eval_cache.py).
 """
+import argparse
 import json
 import re
 from pathlib import Path
@@ -24,6 +29,14 @@ from email.mime.multipart import MIMEMultipart
 import os
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from eval_cache import DEFAULT_CACHE_PATH, EvalCache, code_version
+from eval_regression import (BOOTSTRAP_ROUNDS, DEFAULT_BASELINE_PATH, compare, format_report,
+                             load_baseline, save_baseline)
+
+SPEC_MIN = 0.08
+HALL_MIN = 0.50
+
 
 def spec_score(prediction: str, expected: str):
     """Improved spec scoring - matches evaluators.py spec_accuracy_evaluator"""
@@ -91,6 +104,9 @@ def hallucination_score(prediction: str):
         return 0.5
 
 
+SCORES_VERSION = code_version(spec_score, hallucination_score)
+
+
 def send_email_alert(spec_avg, hall_avg, failed_checks):
     """Send email alert when quality checks fail"""
     
@@ -141,16 +157,16 @@ def send_email_alert(spec_avg, hall_avg, failed_checks):
                 <td>Spec Accuracy</td>
                 <td>{spec_avg:.1%}</td>
                 <td>≥ 8%</td>
-                <td class="{'fail' if spec_avg < 0.08 else 'pass'}">
-                    {"❌ FAILED" if spec_avg < 0.08 else "✅ PASSED"}
+                <td class="{'fail' if spec_avg < SPEC_MIN else 'pass'}">
+                    {"❌ FAILED" if spec_avg < SPEC_MIN else "✅ PASSED"}
                 </td>
             </tr>
             <tr>
                 <td>Hallucination Check</td>
                 <td>{hall_avg:.1%}</td>
                 <td>≥ 50%</td>
-                <td class="{'fail' if hall_avg < 0.50 else 'pass'}">
-                    {"❌ FAILED" if hall_avg < 0.50 else "✅ PASSED"}
+                <td class="{'fail' if hall_avg < HALL_MIN else 'pass'}">
+                    {"❌ FAILED" if hall_avg < HALL_MIN else "✅ PASSED"}
                 </td>
             </tr>
         </table>
@@ -213,12 +229,12 @@ def send_discord_status(spec_avg, hall_avg, passed=True):
         "fields": [
             {
                 "name": "📊 Spec Accuracy",
-                "value": f"**{spec_avg:.1%}**\n{'✅ Pass' if spec_avg >= 0.08 else '❌ Fail'} (threshold: ≥8%)",
+                "value": f"**{spec_avg:.1%}**\n{'✅ Pass' if spec_avg >= SPEC_MIN else '❌ Fail'} (threshold: ≥8%)",
                 "inline": True
             },
             {
                 "name": "🔍 Hallucination Check",
-                "value": f"**{hall_avg:.1%}**\n{'✅ Pass' if hall_avg >= 0.50 else '❌ Fail'} (threshold: ≥50%)",
+                "value": f"**{hall_avg:.1%}**\n{'✅ Pass' if hall_avg >= HALL_MIN else '❌ Fail'} (threshold: ≥50%)",
                 "inline": True
             },
             {
@@ -295,12 +311,12 @@ def send_discord_alert(spec_avg, hall_avg, failed_checks):
         "fields": [
             {
                 "name": "📊 Spec Accuracy",
-                "value": f"{spec_avg:.1%} {'❌' if spec_avg < 0.08 else '✅'} (threshold: ≥8%)",
+                "value": f"{spec_avg:.1%} {'❌' if spec_avg < SPEC_MIN else '✅'} (threshold: ≥8%)",
                 "inline": True
             },
             {
                 "name": "🔍 Hallucination Check",
-                "value": f"{hall_avg:.1%} {'❌' if hall_avg < 0.50 else '✅'} (threshold: ≥50%)",
+                "value": f"{hall_avg:.1%} {'❌' if hall_avg < HALL_MIN else '✅'} (threshold: ≥50%)",
                 "inline": True
             },
             {
@@ -359,8 +375,19 @@ def send_discord_alert(spec_avg, hall_avg, failed_checks):
 
 
 def main():
-    tests_path = Path('test_cases.json')
-    preds_path = Path('predictions.json')
+    parser = argparse.ArgumentParser(description="Check evaluation results against the baseline and floors")
+    parser.add_argument('--tests', default='test_cases.json', help='Path to test_cases.json')
+    parser.add_argument('--predictions', default='predictions.json', help='Path to predictions.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='Baseline run to compare to')
+    parser.add_argument('--update-baseline', action='store_true', help='Save this run as the baseline and exit')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help='Fail instead of falling back to the floors when there is no baseline')
+    parser.add_argument('--rounds', type=int, default=BOOTSTRAP_ROUNDS, help='Bootstrap resamples')
+    parser.add_argument('--report', help='Also write the regression report (Markdown) to this file')
+    args = parser.parse_args()
+
+    tests_path = Path(args.tests)
+    preds_path = Path(args.predictions)
     if not tests_path.exists() or not preds_path.exists():
         print('Missing test_cases.json or predictions.json')
         sys.exit(1)
@@ -368,14 +395,28 @@ def main():
     tests = json.loads(tests_path.read_text())
     preds = json.loads(preds_path.read_text())
 
+    # ZENBOT_EVAL_CACHE= (empty) disables the cache
+    cache = EvalCache(DEFAULT_CACHE_PATH or None)
     spec_scores = []
     hall_scores = []
+    case_scores = {}
     for t in tests:
         tid = str(t.get('id'))
         expected = t.get('expected_answer','')
         pred = preds.get(tid, '')
-        spec_scores.append(spec_score(pred, expected))
-        hall_scores.append(hallucination_score(pred))
+        spec, hall = cache.get_or_compute(
+            SCORES_VERSION, pred, expected,
+            lambda: [spec_score(pred, expected), hallucination_score(pred)])
+        spec_scores.append(spec)
+        hall_scores.append(hall)
+        case_scores[tid] = {'spec_accuracy': spec, 'hallucination_check': hall}
+    cache.save()
+    print(f"ℹ️ Score cache: {cache.summary()}")
+
+    if args.update_baseline:
+        save_baseline(case_scores, args.baseline, version=SCORES_VERSION)
+        print(f"✅ Saved {len(case_scores)} cases as the baseline in {args.baseline}")
+        sys.exit(0)
 
     spec_avg = sum(spec_scores) / len(spec_scores)
     hall_avg = sum(hall_scores) / len(hall_scores)
@@ -386,19 +427,40 @@ def main():
     # Collect failed checks
     failed_checks = []
     threshold_failed = False
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None and args.require_baseline:
+        print(f"❌ No baseline at {args.baseline}; record one with --update-baseline and commit it")
+        sys.exit(1)
+    if baseline is None:
+        print(f"ℹ️ No baseline at {args.baseline}; only the absolute floors apply (record one with --update-baseline)")
+    else:
+        if baseline.get('version') != SCORES_VERSION:
+            print("⚠️ Baseline was scored by a different version of the scoring functions")
+        report = compare(case_scores, baseline.get('cases', {}), rounds=args.rounds)
+        report_text = format_report(report)
+        print(report_text)
+        if args.report:
+            Path(args.report).write_text(report_text + "\n", encoding='utf-8')
+        for metric in report['regressed']:
+            row = report['metrics'][metric]
+            failed_checks.append(f"{metric} regressed: {row['baseline']:.1%} → {row['current']:.1%} "
+                                 f"(diff CI [{row['ci'][0]:+.3f}, {row['ci'][1]:+.3f}])")
+            threshold_failed = True
+            print(f'REGRESSION: {failed_checks[-1]}')
     
     # Thresholds - realistic based on current baseline
     # Baseline: spec=0.10, hallucination=0.55
     # Allow 20% degradation buffer for safety
-    if spec_avg < 0.08:
-        failed_checks.append(f'Spec accuracy too low: {spec_avg:.1%} < 8%')
+    if spec_avg < SPEC_MIN:
+        failed_checks.append(f'Spec accuracy too low: {spec_avg:.1%} < {SPEC_MIN:.0%}')
         threshold_failed = True
-        print(f'SPEC ACCURACY THRESHOLD FAILED: {spec_avg:.3f} < 0.08')
+        print(f'SPEC ACCURACY THRESHOLD FAILED: {spec_avg:.3f} < {SPEC_MIN:.2f}')
     
-    if hall_avg < 0.50:
-        failed_checks.append(f'Hallucination score too low: {hall_avg:.1%} < 50%')
+    if hall_avg < HALL_MIN:
+        failed_checks.append(f'Hallucination score too low: {hall_avg:.1%} < {HALL_MIN:.0%}')
         threshold_failed = True
-        print(f'HALLUCINATION THRESHOLD FAILED: {hall_avg:.3f} < 0.50')
+        print(f'HALLUCINATION THRESHOLD FAILED: {hall_avg:.3f} < {HALL_MIN:.2f}')
     
     # Send alerts if any checks failed
     if threshold_failed:
@@ -418,8 +480,8 @@ def main():
 
     # All checks passed - send success status to Discord
     print('✅ All checks passed!')
-    print(f'  Spec accuracy: {spec_avg:.3f} >= 0.08')
-    print(f'  Hallucination: {hall_avg:.3f} >= 0.50')
+    print(f'  Spec accuracy: {spec_avg:.3f} >= {SPEC_MIN:.2f}')
+    print(f'  Hallucination: {hall_avg:.3f} >= {HALL_MIN:.2f}')
     
     # Send success status to Discord
     send_discord_status(spec_avg, hall_avg, passed=True)
@@ -4,6 +4,7 @@
 This script supports two modes:
  - Local trace file: pass --trace-file traces.json (JSON array or JSONL). It will attempt
    to match tests from test_cases.json to trace inputs and extract the assistant's output.
+   --trace-file may also point at a trace store directory (see trace_store.py).
  - (Optional) LangSmith API: if you provide LANGSMITH_API_KEY and the project slug, you
    can implement an API fetch by editing the fetch_traces() function. The code is left
    intentionally simple and safe (no network calls by default).
@@ -18,13 +19,22 @@ import json
 from pathlib import Path
 import argparse
 import os
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from trace_store import TraceStore, is_trace_store
+from query_normalizer import normalize_query
 
 
 def load_tests(tests_path: Path):
     return json.loads(tests_path.read_text())
 
 
-def load_traces_from_file(trace_path: Path):
+def load_traces_from_file(trace_path: Path, version: str = None):
+    # Compact segment store: only the matching segments are decompressed
+    if is_trace_store(trace_path):
+        return TraceStore(str(trace_path)).read(version=version)
+
     text = trace_path.read_text()
     # Try JSON array first
     try:
@@ -143,7 +153,7 @@ def match_tests_to_traces(tests, traces):
 
     for t in tests:
         tid = str(t.get('id'))
-        inp = t.get('input', '').lower().strip()
+        inp = normalize_query(t.get('input', ''))
         matched = False
         
         # Try fixed traces first
@@ -156,7 +166,7 @@ def match_tests_to_traces(tests, traces):
                 user_text, assistant_text = extract_input_and_output(tr)
                 if not user_text or not assistant_text:
                     continue
-                if inp and inp == user_text.lower().strip():
+                if inp and inp == normalize_query(user_text):
                     preds[tid] = assistant_text
                     matched = True
                     print(f"Exact match for test {tid} ({version}): '{inp[:30]}...'")
@@ -181,7 +191,7 @@ def match_tests_to_traces(tests, traces):
                     user_text, assistant_text = extract_input_and_output(tr)
                     if not user_text or not assistant_text:
                         continue
-                    user_lower = user_text.lower()
+                    user_lower = normalize_query(user_text)
                     
                     # Check if most key terms match
                     matches = sum(1 for term in key_terms if term in user_lower)
@@ -201,7 +211,7 @@ def match_tests_to_traces(tests, traces):
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--tests', required=True, help='Path to test_cases.json')
-    parser.add_argument('--trace-file', help='Path to local traces export (JSON or JSONL)')
+    parser.add_argument('--trace-file', help='Path to local traces export (JSON, JSONL or trace store directory)')
     parser.add_argument('--out', default='predictions.json', help='Output predictions.json path')
     parser.add_argument('--use-langsmith', action='store_true', help='(Optional) attempt to fetch traces from LangSmith API (not implemented)')
     args = parser.parse_args()
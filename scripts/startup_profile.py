@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Startup profile for the ZenBot API (import time and time to first response).
+
+Runs ``python -X importtime -c "import main"`` in backend/ a few times in fresh
+interpreters and summarizes the report: total import time (median) and the
+packages with the largest self time. With ``--serve`` it also starts the API
+with uvicorn on a free port and measures how long until ``/api/health``
+answers, which is what an autoscaled worker's readiness depends on.
+
+Usage:
+  python3 scripts/startup_profile.py
+  python3 scripts/startup_profile.py --runs 5 --top 15 --serve --max-ms 1000
+"""
+import argparse
+import json
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module: str = "main") -> dict:
+    """One fresh-interpreter import of ``module``; times in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, capture_output=True, text=True,
+    )
+    self_ms = defaultdict(float)
+    total_ms = 0.0
+    for line in result.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        own, cumulative, indent, name = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        self_ms[name.split(".")[0]] += own / 1000
+        if len(indent) == 1 and name == module:
+            total_ms = cumulative / 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return {"total_ms": total_ms, "packages": dict(self_ms)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_profile(timeout: float = 30.0) -> float:
+    """Milliseconds from starting uvicorn to the first successful /api/health."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as r:
+                    if r.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"API did not answer within {timeout:.0f}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile ZenBot API startup")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to import in")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list by self time")
+    parser.add_argument("--serve", action="store_true", help="Also measure time to first /api/health")
+    parser.add_argument("--max-ms", type=float, help="Fail if startup (serve, else import) exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    runs = [import_profile() for _ in range(args.runs)]
+    packages = defaultdict(list)
+    for run in runs:
+        for name, ms in run["packages"].items():
+            packages[name].append(ms)
+    report = {
+        "import_ms": round(statistics.median(r["total_ms"] for r in runs), 1),
+        "top_packages": [
+            {"package": name, "self_ms": round(statistics.median(values), 1)}
+            for name, values in sorted(packages.items(), key=lambda kv: -statistics.median(kv[1]))[:args.top]
+        ],
+    }
+    if args.serve:
+        report["serve_ms"] = round(serve_profile(), 1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"📦 import main: {report['import_ms']:.0f} ms (median of {args.runs})")
+        for row in report["top_packages"]:
+            print(f"   {row['self_ms']:8.1f} ms  {row['package']}")
+        if "serve_ms" in report:
+            print(f"🚀 first /api/health: {report['serve_ms']:.0f} ms after process start")
+
+    limit_ms = report.get("serve_ms", report["import_ms"])
+    if args.max_ms is not None and limit_ms > args.max_ms:
+        print(f"❌ Startup {limit_ms:.0f} ms exceeds {args.max_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
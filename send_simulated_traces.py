@@ -1,5 +1,4 @@
 import os
-import json
 from datetime import datetime, timezone
 import uuid
 
@@ -11,6 +10,8 @@ from langsmith import Client
 
 # Import helper functions from zenbot
 from zenbot import retrieve_documents, build_prompt
+from trace_store import TraceStore, DEFAULT_STORE_DIR
+from trace_exporter import TraceExporter, LangSmithSink
 
 
 def simulate_answer(question: str, docs: list[dict]) -> str:
@@ -42,8 +43,10 @@ def create_and_send_runs():
 
     versions = ["buggy", "fixed"]
 
-    outdir = "langsmith_traces"
-    os.makedirs(outdir, exist_ok=True)
+    # Runs are sent in batches by a background thread; shutdown() flushes them
+    exporter = TraceExporter(LangSmithSink(client, project))
+
+    store = TraceStore(DEFAULT_STORE_DIR)
 
     created = []
 
@@ -56,46 +59,46 @@ def create_and_send_runs():
             run_id = uuid.uuid4()
             now = datetime.now(timezone.utc)
 
-            # Create a run in LangSmith
-            try:
-                client.create_run(
-                    id=str(run_id),
-                    project_name=project,
-                    name=f"zenbot_{version}",
-                    run_type="llm",
-                    inputs={
-                        "question": q,
-                        "retrieved_documents": [{
-                            "id": d["id"],
-                            "title": d.get("title"),
-                            "source": d.get("metadata", {}).get("source"),
-                            "date": d.get("metadata", {}).get("date"),
-                        } for d in docs],
-                        "prompt": prompt,
-                    },
-                    outputs={"answer": answer},
-                    start_time=now,
-                    end_time=now,
-                )
-                created.append(str(run_id))
-            except Exception as e:
-                print(f"Failed to create run in LangSmith: {e}")
-
-            # Save local JSON trace
-            fname = os.path.join(outdir, f"sim_trace_{version}_{abs(hash(q)) % (10**8)}.json")
-            with open(fname, "w", encoding="utf-8") as f:
-                json.dump({
-                    "id": str(run_id),
-                    "project": project,
-                    "version": version,
+            # Queue a run for LangSmith
+            queued = exporter.submit(dict(
+                id=str(run_id),
+                project_name=project,
+                name=f"zenbot_{version}",
+                run_type="llm",
+                inputs={
                     "question": q,
-                    "retrieved_documents": docs,
+                    "retrieved_documents": [{
+                        "id": d["id"],
+                        "title": d.get("title"),
+                        "source": d.get("metadata", {}).get("source"),
+                        "date": d.get("metadata", {}).get("date"),
+                    } for d in docs],
                     "prompt": prompt,
-                    "answer": answer,
-                }, f, indent=2, ensure_ascii=False)
-            print(f"Saved simulated trace: {fname}")
+                },
+                outputs={"answer": answer},
+                start_time=now,
+                end_time=now,
+            ))
+            if queued:
+                created.append(str(run_id))
 
+            # Keep a local copy of the trace
+            store.append({
+                "id": str(run_id),
+                "project": project,
+                "version": version,
+                "question": q,
+                "retrieved_documents": docs,
+                "prompt": prompt,
+                "answer": answer,
+            }, timestamp=now.timestamp())
+
+    segment = store.flush()
+    print(f"Saved simulated traces: {segment}")
+
+    exporter.shutdown()
     print("Created runs:", created)
+    print(f"Export stats: {exporter.stats}")
 
 
 if __name__ == "__main__":
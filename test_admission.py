@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Tests for backend/admission.py rate limits, queueing, lanes and client keys.
+
+Run: python3 test_admission.py   (or pytest test_admission.py)
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+async def rejected(controller: AdmissionController, client: str) -> AdmissionRejected:
+    try:
+        await controller.acquire(client)
+    except AdmissionRejected as exc:
+        return exc
+    raise AssertionError("expected AdmissionRejected")
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, burst=2)
+    bucket.updated = 100.0
+    assert bucket.take(100.0) == (True, 0.0) and bucket.take(100.0) == (True, 0.0)
+    ok, retry_after = bucket.take(100.0)
+    assert not ok and retry_after == 0.5
+    assert bucket.take(100.5)[0]
+    # Refill never exceeds the burst
+    assert [bucket.take(200.0)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_client_over_its_rate_gets_429():
+    async def run():
+        controller = AdmissionController(client_rate=0.5, client_burst=2)
+        for _ in range(2):
+            controller.release(await controller.acquire("10.0.0.1"))
+        await controller.acquire("10.0.0.2")  # other clients keep their own quota
+        return controller, await rejected(controller, "10.0.0.1")
+
+    controller, exc = asyncio.run(run())
+    assert (exc.status_code, exc.retry_after) == (429, 2)
+    assert controller.stats["rate_limited"] == 1 and controller.in_flight == 1
+
+
+def test_full_queue_and_long_expected_wait_are_shed():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5, client_burst=100)
+        admitted = await controller.acquire("a")
+        waiter = asyncio.ensure_future(controller.acquire("b"))
+        await asyncio.sleep(0)
+        shed = [await rejected(controller, "c")]
+        controller.release(admitted)
+        await waiter
+        slow = AdmissionController(max_concurrency=1, queue_timeout=1, client_burst=100)
+        slow.service_time = 3.0
+        await slow.acquire("a")
+        shed.append(await rejected(slow, "b"))
+        return controller, shed
+
+    controller, shed = asyncio.run(run())
+    assert [(e.status_code, e.detail) for e in shed] == [(503, "Server overloaded, please retry")] * 2
+    assert shed[1].retry_after == 3
+    assert controller.stats["shed"] == 1 and controller.stats["admitted"] == 2
+
+
+def test_waiter_times_out_at_its_deadline():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, queue_timeout=0.05, client_burst=100)
+        controller.service_time = 0.01
+        await controller.acquire("a")
+        return controller, await rejected(controller, "b")
+
+    controller, exc = asyncio.run(run())
+    assert exc.status_code == 503 and exc.detail == "Timed out waiting for capacity"
+    assert controller.stats["timed_out"] == 1 and controller.waiting == 0
+
+
+def test_priority_lane_is_served_first():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, client_burst=100, priority_clients=["vip"])
+        controller.service_time = 0.01
+        admitted = await controller.acquire("a")
+        order = []
+
+        async def request(client):
+            async with controller.slot(client):
+                order.append(client)
+
+        tasks = [asyncio.ensure_future(request(c)) for c in ("b", "c", "vip")]
+        await asyncio.sleep(0)
+        assert controller.waiting == 3
+        controller.release(admitted)
+        await asyncio.gather(*tasks)
+        return controller, order
+
+    controller, order = asyncio.run(run())
+    assert order == ["vip", "b", "c"]
+    assert controller.in_flight == 0 and controller.snapshot()["admitted"] == 4
+
+
+def test_cancelled_waiter_gives_back_its_slot():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, client_burst=100)
+        admitted = await controller.acquire("a")
+        waiter = asyncio.ensure_future(controller.acquire("b"))
+        await asyncio.sleep(0)
+        controller.release(admitted)  # hands the slot to "b" ...
+        waiter.cancel()  # ... which disconnects before running
+        try:
+            # Python < 3.12 may still return the slot; then the caller owns it
+            controller.release(await waiter)
+        except asyncio.CancelledError:
+            pass
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.in_flight == 0 and controller.waiting == 0
+
+
+def test_releaser_frees_once():
+    async def run():
+        controller = AdmissionController(client_burst=100)
+        release = controller.releaser(await controller.acquire("a"))
+        release()
+        release()
+        return controller
+
+    assert asyncio.run(run()).in_flight == 0
+
+
+def test_client_key_trusts_only_listed_proxies():
+    controller = AdmissionController(trusted_proxies=["10.0.0.0/8"])
+    spoofed = {"x-client-id": "someone-else", "x-forwarded-for": "1.2.3.4"}
+    assert controller.client_key("203.0.113.9", spoofed) == "203.0.113.9"
+    assert controller.client_key("10.0.0.5", spoofed) == "someone-else"
+    # Rightmost address our proxies did not add
+    assert controller.client_key("10.0.0.5", {"x-forwarded-for": "6.6.6.6, 198.51.100.7, 10.0.0.9"}) == \
+        "198.51.100.7"
+    assert controller.client_key("10.0.0.5", {}) == "10.0.0.5"
+    assert controller.client_key(None, spoofed) == "unknown"
+
+
+def test_from_env():
+    saved = dict(os.environ)
+    os.environ.update(ZENBOT_MAX_CONCURRENCY="3", ZENBOT_PRIORITY_CLIENTS="vip, ops",
+                      ZENBOT_TRUSTED_PROXIES="10.0.0.1")
+    try:
+        controller = AdmissionController.from_env()
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    assert controller.max_concurrency == 3 and controller.priority_clients == {"vip", "ops"}
+    assert controller.client_key("10.0.0.1", {"x-client-id": "app"}) == "app"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone admission tests")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Tests for /api/chat/batch, /api/chat/stream resumption and the admission slots of streamed chat responses.
+
+The Gemini client is replaced by a stand-in; nothing leaves the process.
+
+Run: python3 test_chat_batch.py   (or pytest test_chat_batch.py)
+"""
+import asyncio
+import json
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.join(_HERE, "backend"))
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("ZENBOT_LLM_PROBE_ADDRESS", "")
+
+import httpx
+
+import zenbot
+
+
+class FakeLLM:
+    def __init__(self, **kwargs):
+        pass
+
+    def invoke(self, messages, config=None):
+        return type("Msg", (), {"content": "According to the documents, it depends (as per IS 1786)."})()
+
+
+zenbot.ChatGoogleGenerativeAI = FakeLLM
+
+import main  # noqa: E402  (after the stand-in is installed)
+
+QUESTIONS = ["Price for TMT 16mm?", "Price for TMT 12mm?", "Price for TMT 16 mm?",
+             "Can I use Fe 550D for a 20-story building foundation?"]
+
+
+async def post_and_disconnect(path: str, body: dict) -> None:
+    """POST ``body`` over raw ASGI; the client is gone before the response body starts."""
+    messages = [{"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        await asyncio.sleep(0.05)  # slow network: the disconnect arrives first
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"content-type", b"application/json")], "client": ("10.0.0.1", 1000),
+             "server": ("test", 80)}
+    await main.app(scope, receive, send)
+
+
+def test_batch_streams_every_question_once():
+    async def run():
+        transport = httpx.ASGITransport(app=main.app, client=("10.0.0.2", 1000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            response = await client.post("/api/chat/batch", json={"questions": QUESTIONS})
+            empty = await client.post("/api/chat/batch", json={"questions": []})
+        return response, empty
+
+    response, empty = asyncio.run(run())
+    assert response.status_code == 200 and empty.status_code == 400
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results, done = lines[:-1], lines[-1]
+    assert sorted(r["index"] for r in results) == list(range(len(QUESTIONS)))
+    assert all(r["type"] == "result" and r["error"] is None for r in results)
+    # "16mm" and "16 mm" normalize to the same question and share one answer
+    by_index = {r["index"]: r for r in results}
+    assert by_index[0]["response"] == by_index[2]["response"]
+    assert done["type"] == "done" and done["questions"] == len(QUESTIONS)
+    assert set(by_index[0]["documents"]) <= set(done["documents"])
+    assert main.admission.in_flight == 0
+
+
+def test_batch_slot_freed_when_client_leaves_before_body():
+    async def run():
+        await post_and_disconnect("/api/chat/batch", {"questions": QUESTIONS[:1]})
+        await asyncio.sleep(0.2)
+        return main.admission.in_flight
+
+    assert asyncio.run(run()) == 0
+
+
+def test_stream_slot_freed_when_evicted_before_start():
+    start = main.streams.start
+
+    def start_then_evict(events):
+        stream = start(events)
+        stream.task.cancel()  # what StreamRegistry._evict does to the oldest streams
+        return stream
+
+    async def run():
+        await post_and_disconnect("/api/chat/stream", {"message": QUESTIONS[0]})
+        await asyncio.sleep(0.2)
+        return main.admission.in_flight
+
+    main.streams.start = start_then_evict
+    try:
+        assert asyncio.run(run()) == 0
+    finally:
+        main.streams.start = start
+
+
+def test_stream_resumes_after_last_event_id_without_a_new_answer():
+    question = {"message": "Can I use Fe 550D for a 12-story hospital foundation?", "session_id": "resume-test"}
+
+    def events(body: str) -> list:
+        return [frame for frame in body.split("\n\n") if frame.startswith("id: ")]
+
+    answer, answered = main.zenbot.answer, []
+
+    def counted_answer(*args, **kwargs):
+        if kwargs.get("snapshot") is None:  # not answer's own call with the pinned snapshot
+            answered.append(args[0])
+        return answer(*args, **kwargs)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app, client=("10.0.0.4", 1000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            first = await client.post("/api/chat/stream", json=question)
+            stream_id = first.headers["x-stream-id"]
+            replay = await client.get(f"/api/chat/stream/{stream_id}", headers={"Last-Event-ID": f"{stream_id}:0"})
+            # A repeated POST carrying Last-Event-ID resumes instead of answering again
+            again = await client.post("/api/chat/stream", json=question,
+                                      headers={"Last-Event-ID": f"{stream_id}:0"})
+            unknown = await client.get("/api/chat/stream/missing")
+            return first, replay, again, unknown
+
+    main.zenbot.answer = counted_answer
+    try:
+        first, replay, again, unknown = asyncio.run(run())
+    finally:
+        main.zenbot.answer = answer
+    frames = events(first.text)
+    assert answered == [question["message"]] and frames[0].startswith(f"id: {first.headers['x-stream-id']}:0\n")
+    assert '"type":"done"' in frames[-1]
+    assert events(replay.text) == frames[1:] and events(again.text) == frames[1:]
+    assert unknown.status_code == 404
+    assert main.admission.in_flight == 0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone chat batch tests")
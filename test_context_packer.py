@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Tests for context_packer.py chunking and token-budgeted packing.
+
+Run: python3 test_context_packer.py   (or pytest test_context_packer.py)
+"""
+from context_packer import chunk_document, estimate_tokens, pack_context
+
+META = {"source": "spec.pdf", "date": "2024-11-01"}
+
+
+def long_doc(doc_id: str, sentences: int, topic: str = "yield strength") -> dict:
+    text = " ".join(f"Sentence {i} covers {topic} of TMT bars in detail." for i in range(sentences))
+    return {"id": doc_id, "title": doc_id, "text": text, "metadata": META}
+
+
+def test_short_documents_pass_through():
+    doc = {"id": "d1", "title": "Price", "text": "Price: ₹52,500 per MT.", "metadata": META}
+    assert chunk_document(doc) == [doc]
+    assert pack_context("price?", [doc], budget=1000) == [doc]
+
+
+def test_long_documents_split_on_sentences_within_budget():
+    doc = long_doc("spec", 60)
+    chunks = chunk_document(doc, max_tokens=50)
+    assert len(chunks) > 1
+    assert [c["id"] for c in chunks] == [f"spec#{i}" for i in range(len(chunks))]
+    assert all(estimate_tokens(c["text"]) <= 50 for c in chunks)
+    assert all(c["text"].endswith(".") and c["parent_id"] == "spec" and c["metadata"] == META for c in chunks)
+    assert " ".join(c["text"] for c in chunks) == doc["text"]
+
+
+def test_packing_respects_budget_and_keeps_retrieval_order():
+    docs = [long_doc("a", 40), long_doc("b", 40, "delivery to ranchi"), long_doc("c", 40)]
+    packed = pack_context("delivery to ranchi", docs, budget=300)
+    assert sum(estimate_tokens(c["text"]) for c in packed) <= 300
+    # Chunks about the question win over the higher-ranked document
+    assert any(c["id"].startswith("b#") for c in packed)
+    order = [(c["parent_id"], int(c["id"].split("#")[1])) for c in packed]
+    assert order == sorted(order, key=lambda o: ("abc".index(o[0]), o[1]))
+
+
+def test_near_duplicates_are_dropped():
+    doc = {"id": "d1", "title": "Price", "text": "Price of TMT 12mm bars: ₹52,500 per MT as of December.",
+           "metadata": META}
+    copy = dict(doc, id="d2")
+    assert pack_context("price", [doc, copy], budget=1000) == [doc]
+
+
+def test_block_tokens_sets_the_cost():
+    docs = [{"id": f"d{i}", "title": "", "text": f"Fact number {i} about bars.", "metadata": META}
+            for i in range(5)]
+    assert len(pack_context("fact", docs, budget=20, block_tokens=lambda c: 10)) == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone context packer tests")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Tests for conversation_memory.py follow-up resolution and history bounds.
+
+Run: python3 test_conversation_memory.py   (or pytest test_conversation_memory.py)
+"""
+import os
+
+from conversation_memory import is_followup, remember, render_memory, resolve_followup
+
+
+def price_memory():
+    return remember(None, "Price of TMT 12mm?", "Price of TMT 12mm?", "Price: ₹52,500 per MT")
+
+
+def test_standalone_questions_are_left_alone():
+    memory = price_memory()
+    for question in ("What is Fe 550D?", "What is Fe 500D?", "Is that available?"):
+        assert not is_followup(question)
+        assert resolve_followup(question, memory) == question
+
+
+def test_followup_with_topic_carries_only_slots_its_intent_uses():
+    memory = price_memory()
+    assert resolve_followup("and delivery cost to Ranchi?", memory) == "delivery cost to ranchi"
+    assert resolve_followup("what about tensile strength?", memory) == "tensile strength"
+    spec = remember(None, "Tensile strength of Fe 500D", "tensile strength of fe 500d", "...")
+    assert resolve_followup("and price?", spec) == "price fe 500d"
+
+
+def test_followup_without_topic_swaps_slots_into_previous_query():
+    memory = price_memory()
+    assert resolve_followup("and for 16mm?", memory) == "price of tmt 16mm"
+    assert resolve_followup("what about Fe 500D?", memory) == "price of tmt 12mm fe 500d"
+
+
+def test_no_memory_or_first_turn():
+    assert resolve_followup("and for 16mm?", None) == "and for 16mm?"
+
+
+def test_memory_is_bounded():
+    memory = None
+    for i in range(10):
+        memory = remember(memory, f"question {i}?", f"question {i}", f"Answer {i}. More detail.",
+                          max_turns=2, summary_tokens=20)
+    assert [t["question"] for t in memory["turns"]] == ["question 8?", "question 9?"]
+    assert memory["summary"] and memory["summary"][-1] == "question 7? -> Answer 7."
+    rendered = render_memory(memory, max_tokens=15)
+    assert rendered.endswith("User: question 9?\nZenBot: Answer 9. More detail.")
+
+
+def test_standalone_question_skips_previous_price_fact():
+    os.environ.setdefault("GEMINI_API_KEY", "test")
+    import zenbot
+
+    class FakeLLM:
+        def __init__(self, **kwargs):
+            pass
+
+        def invoke(self, messages, config=None):
+            return type("Msg", (), {"content": "Fe 550D is a TMT bar grade (as per IS 1786)."})()
+
+    original = zenbot.ChatGoogleGenerativeAI, zenbot._LLM
+    zenbot.ChatGoogleGenerativeAI, zenbot._LLM = FakeLLM, None
+    try:
+        result = zenbot.run_query("What is Fe 550D?", "fixed", memory=price_memory())
+    finally:
+        zenbot.ChatGoogleGenerativeAI, zenbot._LLM = original
+    assert result["resolved_question"] == "What is Fe 550D?"
+    assert "52,500" not in result["answer"]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone conversation memory tests")
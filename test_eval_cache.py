@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Tests for eval_cache.py content-addressed evaluator results.
+
+Run: python3 test_eval_cache.py   (or pytest test_eval_cache.py)
+"""
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+
+from eval_cache import EvalCache, code_version, result_key
+
+
+def spec_score(prediction: str) -> float:
+    return 1.0 if "550" in prediction else 0.0
+
+
+def price_score(prediction: str) -> float:
+    return 1.0 if "₹" in prediction else 0.0
+
+
+def test_keys_follow_content_and_evaluator_version():
+    version = code_version(spec_score)
+    assert version == code_version(spec_score) and len(version) == 16
+    assert code_version(price_score) != version and code_version(spec_score, price_score) != version
+    key = result_key(version, "550 N/mm2", "550")
+    assert key == result_key(version, "550 N/mm2", "550")
+    assert len({key, result_key(version, "560 N/mm2", "550"), result_key(version, "550 N/mm2", "560"),
+                result_key(code_version(price_score), "550 N/mm2", "550")}) == 4
+
+
+def test_only_changed_cases_are_scored_again():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache", "results.json")
+        computed = []
+
+        def score(prediction):
+            computed.append(prediction)
+            return {"score": spec_score(prediction)}
+
+        cache = EvalCache(path)
+        for prediction in ("550 N/mm2", "500 N/mm2"):
+            cache.get_or_compute("v1", prediction, "550", lambda: score(prediction))
+        cache.save()
+        again = EvalCache(path)
+        results = [again.get_or_compute("v1", p, "550", lambda: score(p)) for p in ("550 N/mm2", "600 N/mm2")]
+        assert results == [{"score": 1.0}, {"score": 0.0}]
+        assert computed == ["550 N/mm2", "500 N/mm2", "600 N/mm2"]
+        assert (again.hits, again.misses, len(again)) == (1, 1, 3)
+        assert again.summary() == "1/2 cached, 1 scored, 3 entries"
+
+
+def test_unused_entries_are_pruned_on_save():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.json")
+        old = (date.today() - timedelta(days=40)).isoformat()
+        recent = (date.today() - timedelta(days=3)).isoformat()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"format": 1, "entries": {"old": {"result": 1, "used": old},
+                                                "recent": {"result": 2, "used": recent}}}, f)
+        cache = EvalCache(path, max_age_days=30)
+        cache.save()
+        with open(path, encoding="utf-8") as f:
+            assert list(json.load(f)["entries"]) == ["recent"]
+        assert not os.path.exists(path + ".tmp")
+
+
+def test_unreadable_or_other_format_files_start_empty():
+    with tempfile.TemporaryDirectory() as tmp:
+        broken, other = os.path.join(tmp, "broken.json"), os.path.join(tmp, "other.json")
+        with open(broken, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        with open(other, "w", encoding="utf-8") as f:
+            json.dump({"format": 0, "entries": {"k": {"result": 1, "used": date.today().isoformat()}}}, f)
+        assert len(EvalCache(broken)) == 0 and len(EvalCache(other)) == 0
+    cache = EvalCache(None)  # --no-cache
+    assert cache.get_or_compute("v1", "p", "e", lambda: 3) == 3
+    cache.save()
+    assert cache.get_or_compute("v1", "p", "e", lambda: 4) == 3
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone evaluation cache tests")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Tests for backend/eval_queue.py background evaluation.
+
+Run: python3 test_eval_queue.py   (or pytest test_eval_queue.py)
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from eval_queue import EvaluationQueue
+
+
+def score(query: str, response: str) -> dict:
+    if query == "fail":
+        raise ValueError("evaluator broke")
+    return {"overall_score": 0.9, "query": query}
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_submit_returns_at_once_and_completes_in_background():
+    release = threading.Event()
+    completed = []
+
+    def slow(query, response):
+        release.wait(5)
+        return score(query, response)
+
+    evaluations = EvaluationQueue(slow, on_complete=lambda job, ev: completed.append((job["context"], ev)),
+                                  workers=2)
+    started = time.monotonic()
+    ids = [evaluations.submit(f"q{i}", "a", context={"n": i}) for i in range(4)]
+    assert time.monotonic() - started < 0.5
+    assert len(set(ids)) == 4 and evaluations.get(ids[0])["status"] == "pending"
+    release.set()
+    wait_for(lambda: evaluations.stats["completed"] == 4)
+    assert evaluations.get(ids[3]) == {"status": "done", "evaluation": {"overall_score": 0.9, "query": "q3"}}
+    assert sorted(c["n"] for c, _ in completed) == [0, 1, 2, 3]
+    assert evaluations.get("ev-unknown") is None
+    evaluations.shutdown()
+
+
+def test_dropped_and_failed_jobs_are_abandoned():
+    release = threading.Event()
+    abandoned = []
+
+    def blocked(query, response):
+        release.wait(5)
+        return score(query, response)
+
+    evaluations = EvaluationQueue(blocked, on_abandon=lambda job, reason: abandoned.append((job["query"], reason)),
+                                  workers=1, max_queue=1)
+    evaluations.submit("first", "a")
+    wait_for(lambda: evaluations.depth == 0)  # the worker holds "first"
+    evaluations.submit("fail", "a")
+    dropped = evaluations.submit("third", "a")
+    assert evaluations.get(dropped)["status"] == "dropped" and abandoned == [("third", "dropped")]
+    release.set()
+    wait_for(lambda: evaluations.stats["failed"] == 1)
+    assert abandoned == [("third", "dropped"), ("fail", "failed")]
+    assert evaluations.stats == {"submitted": 2, "completed": 1, "dropped": 1, "failed": 1}
+    evaluations.shutdown()
+
+
+def test_subscribers_receive_finished_evaluations():
+    async def run():
+        evaluations = EvaluationQueue(score, workers=1)
+        events = evaluations.subscribe()
+        evaluation_id = evaluations.submit("q", "a", context={"conversation_id": 7})
+        event = await asyncio.wait_for(events.get(), 5)
+        evaluations.unsubscribe(events)
+        evaluations.shutdown()
+        return evaluation_id, event
+
+    evaluation_id, event = asyncio.run(run())
+    assert event["evaluation_id"] == evaluation_id and event["conversation_id"] == 7
+    assert event["evaluation"]["overall_score"] == 0.9
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone evaluation queue tests")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Tests for eval_regression.py paired bootstrap comparison to a baseline run.
+
+Run: python3 test_eval_regression.py   (or pytest test_eval_regression.py)
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from eval_regression import bootstrap_mean_ci, compare, format_report, load_baseline, save_baseline
+
+ROUNDS = 2000
+
+
+def scores(values, metric: str = "overall_score") -> dict:
+    return {str(i + 1): {metric: float(v)} for i, v in enumerate(values)}
+
+
+def test_bootstrap_ci_brackets_the_mean():
+    rng = np.random.default_rng(1)
+    values = np.column_stack([rng.normal(0.0, 0.1, 200), rng.normal(-0.2, 0.1, 200)])
+    ci = bootstrap_mean_ci(values, rounds=ROUNDS)
+    assert ci.shape == (2, 2)
+    for (low, high), mean in zip(ci, values.mean(axis=0)):
+        assert low < mean < high and high - low < 0.05
+    assert ci[1, 1] < 0 < ci[0, 1]
+    # Same seed, same interval
+    assert np.array_equal(ci, bootstrap_mean_ci(values, rounds=ROUNDS))
+
+
+def test_consistent_drop_is_a_regression():
+    baseline = scores([0.9] * 30)
+    current = scores([0.8] * 25 + [0.9] * 5)
+    report = compare(current, baseline, rounds=ROUNDS)
+    row = report["metrics"]["overall_score"]
+    assert report["regressed"] == ["overall_score"] and row["regressed"]
+    assert row["baseline"] == 0.9 and row["diff"] < -0.05 and row["ci"][1] < 0
+
+
+def test_noise_and_tiny_drops_pass():
+    rng = np.random.default_rng(2)
+    base = rng.uniform(0.6, 1.0, 40)
+    noisy = scores(np.clip(base + rng.normal(0, 0.05, 40), 0, 1))
+    assert compare(noisy, scores(base), rounds=ROUNDS)["regressed"] == []
+    # Certain but below min_drop
+    assert compare(scores(base - 0.01), scores(base), rounds=ROUNDS, min_drop=0.02)["regressed"] == []
+
+
+def test_flips_and_case_sets():
+    baseline = {"1": {"spec": 1.0, "price": 0.0}, "2": {"spec": 0.0}, "3": {"spec": 1.0}}
+    current = {"1": {"spec": 0.0, "price": 1.0}, "2": {"spec": 1.0}, "4": {"spec": 1.0}}
+    report = compare(current, baseline, rounds=200)
+    assert report["cases"] == 2 and report["new_cases"] == ["4"] and report["missing_cases"] == ["3"]
+    flips = {(f["id"], f["metric"], f["direction"]) for f in report["flipped"]}
+    # Case 2 has no price score in either run: unchanged, not a flip
+    assert flips == {("1", "spec", "broke"), ("1", "price", "fixed"), ("2", "spec", "fixed")}
+    assert compare({}, baseline)["metrics"] == {}
+
+
+def test_format_report():
+    report = compare(scores([0.8] * 25 + [0.9] * 5), scores([0.9] * 30), rounds=ROUNDS)
+    text = format_report(report)
+    assert text.startswith(f"Compared 30 cases to the baseline ({ROUNDS} bootstrap rounds, 95% CI)")
+    assert "| overall_score | 0.900 | 0.817 | -0.083 |" in text and "❌ regressed" in text
+    report = compare(scores([0.0, 1.0]), scores([1.0, 1.0]), rounds=200)
+    assert "Broke (1):\n- case 1 overall_score: 1 → 0" in format_report(report)
+
+
+def test_baseline_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "baseline.json")
+        assert load_baseline(path) is None
+        save_baseline(scores([0.5, 1.0]), path, version="abc123")
+        baseline = load_baseline(path)
+    assert baseline["version"] == "abc123" and baseline["cases"] == scores([0.5, 1.0])
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone evaluation regression tests")
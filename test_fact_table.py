@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Tests for fact_table.py fact extraction and the extractive lookup fast path.
+
+Run: python3 test_fact_table.py   (or pytest test_fact_table.py)
+"""
+from fact_table import FactTable, extract_facts, fact_answer, parse_question
+
+META = {"source": "pricing_december_2024.pdf", "date": "2024-12-01"}
+DOCS = [
+    {"id": "tmt_12mm_price", "title": "TMT 12mm pricing",
+     "text": "Price: ₹52,500 per MT. Bulk orders above 50 MT get 2% off.", "metadata": META},
+    {"id": "tmt_16mm_price", "title": "TMT 16mm pricing", "text": "Price: ₹53,200 per MT.", "metadata": META},
+    {"id": "fe550d_spec", "title": "Fe 550D specification",
+     "text": "Yield strength: 550 N/mm² minimum. Tensile strength: 600 N/mm².", "metadata": META},
+    {"id": "fe500_spec", "title": "Fe 500 specification", "text": "Yield strength: 500 N/mm².", "metadata": META},
+    {"id": "logistics", "title": "Delivery",
+     "text": "Delivery time to Ranchi: 2-3 days. Delivery cost to Ranchi: ₹2,500 per MT. "
+             "Delivery time to Patna: 4 business days.", "metadata": META},
+]
+
+
+def test_extract_facts_with_slots_from_sentence_or_title():
+    facts = extract_facts(DOCS[0])
+    assert len(facts) == 1
+    fact = facts[0]
+    assert (fact["attribute"], fact["product"], fact["size"], fact["value"], fact["unit"]) == \
+        ("price", "TMT", "12mm", "₹52,500", "per MT")
+    assert fact["sentence"] == "Price: ₹52,500 per MT." and fact["source"] == META["source"]
+    spec = extract_facts(DOCS[2])
+    assert [(f["attribute"], f["product"], f["value"]) for f in spec] == [
+        ("yield_strength", "Fe 550D", "550"), ("tensile_strength", "Fe 550D", "600")]
+    logistics = extract_facts(DOCS[4])
+    assert [(f["attribute"], f["location"], f["value"], f["unit"]) for f in logistics] == [
+        ("delivery_time", "ranchi", "2-3", "days"), ("delivery_cost", "ranchi", "₹2,500", "per MT"),
+        ("delivery_time", "patna", "4", "business days")]
+
+
+def test_parse_question():
+    assert parse_question("Price for TMT 16mm?") == {
+        "attribute": "price", "product": "TMT", "size": "16mm", "words": {"price", "for", "tmt", "mm"}}
+    assert parse_question("Delivery cost to Ranchi?")["attribute"] == "delivery_cost"
+    assert parse_question("How long does delivery to Patna take?")["attribute"] == "delivery_time"
+    assert parse_question("yield strength of fe550d")["product"] == "Fe 550D"
+    # Open-ended, multi-intent and multi-grade questions go to the LLM
+    assert parse_question("Difference between Fe 500 and Fe 550D?") is None
+    assert parse_question("Which grade should I use for a slab?") is None
+    assert parse_question("Yield and tensile strength of Fe 550D") is None
+    assert parse_question("Fe 500 vs Fe 550D yield strength") is None
+    assert parse_question("Is 12mm in stock?") is None
+
+
+def test_lookup_answers_single_matching_fact():
+    table = FactTable(DOCS)
+    assert len(table) == 8
+    fact = table.lookup("Price for TMT 16mm?", DOCS)
+    assert fact["doc_id"] == "tmt_16mm_price"
+    assert fact_answer(fact) == "According to pricing_december_2024.pdf (dated 2024-12-01): Price: ₹53,200 per MT."
+    assert table.lookup("Delivery cost to Ranchi?", DOCS)["value"] == "₹2,500"
+    assert table.lookup("What is the yield strength of Fe 500?", DOCS)["value"] == "500"
+    # Product-level specs also answer a size-specific question
+    assert table.lookup("Yield strength of Fe 550D 16mm", DOCS)["value"] == "550"
+
+
+def test_lookup_declines_ambiguous_or_missing_facts():
+    table = FactTable(DOCS)
+    # Two sizes fit an unsized question
+    assert table.lookup("Price of TMT bars?", DOCS) is None
+    # Location facts must be asked about explicitly
+    assert table.lookup("Delivery cost?", DOCS) is None
+    assert table.lookup("Delivery time to Delhi?", DOCS) is None
+    # Two grades fit an ungraded question
+    assert table.lookup("Yield strength of TMT?", DOCS) is None
+    # Only the retrieved documents count
+    assert table.lookup("Price for TMT 16mm?", DOCS[:1]) is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone fact table tests")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Tests for golden_index.py nearest golden question lookup.
+
+Run: python3 test_golden_index.py   (or pytest test_golden_index.py)
+"""
+import json
+import os
+import tempfile
+
+from golden_index import GoldenIndex, load_golden_cases
+
+CASES = [
+    {"id": "1", "input": "Yield strength of Fe 550D 16mm?", "expected_answer": "565 N/mm2", "source": "t"},
+    {"id": "2", "input": "Current price of TMT 12mm per MT?", "expected_answer": "₹52,500 per MT", "source": "t"},
+    {"id": "7", "input": "Price for TMT 16mm?", "expected_answer": "₹53,200 per MT", "source": "t"},
+    {"id": "8", "input": "Delivery cost to Ranchi?", "expected_answer": "₹2,500 per MT", "source": "t"},
+]
+
+
+def test_exact_match_after_normalization():
+    index = GoldenIndex(CASES)
+    match = index.match("yield strength of fe550 d 16 mm")
+    assert (match["case_id"], match["method"], match["confidence"]) == ("1", "exact", 1.0)
+    assert index.match("What is the current price of TMT 12mm per MT?")["method"] == "exact"
+
+
+def test_lexical_match_needs_the_same_numbers():
+    index = GoldenIndex(CASES)
+    match = index.match("current price of TMT 12 mm")
+    assert match["case_id"] == "2" and match["method"] == "lexical" and match["confidence"] >= 0.8
+    # Same words, different size: never borrows the other case's answer
+    assert index.match("Yield strength of Fe 550D 12mm?") is None
+    assert index.match("How heavy is a bar?") is None
+    assert index.match("?") is None
+
+
+def test_threshold():
+    assert GoldenIndex(CASES, min_similarity=0.99).match("current price of TMT 12 mm") is None
+
+
+def test_load_json_and_jsonl_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        array_path, lines_path = os.path.join(tmp, "a.json"), os.path.join(tmp, "b.jsonl")
+        with open(array_path, "w", encoding="utf-8") as f:
+            json.dump([{"id": 1, "input": "Price for TMT 16mm?", "expected_answer": "₹53,200"},
+                       {"input": "no answer"}], f)
+        with open(lines_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"input": "Delivery cost to Ranchi?", "expected_answer": "₹2,500"}) + "\n\n")
+        cases = load_golden_cases([array_path, lines_path, os.path.join(tmp, "missing.json")])
+    assert [(c["id"], c["source"]) for c in cases] == [("1", "a.json"), ("2", "b.jsonl")]
+    assert GoldenIndex(cases).match("delivery cost to ranchi")["expected_answer"] == "₹2,500"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone golden index tests")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Tests for backend/health.py readiness checks and the /api/health/* endpoints.
+
+The Gemini client is replaced by a stand-in and the LLM endpoint probe is
+disabled; nothing leaves the process.
+
+Run: python3 test_health.py   (or pytest test_health.py)
+"""
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.join(_HERE, "backend"))
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("ZENBOT_LLM_PROBE_ADDRESS", "")
+
+import httpx
+
+import zenbot
+from health import ReadinessProbe, tcp_probe
+
+
+class FakeLLM:
+    def __init__(self, **kwargs):
+        pass
+
+    def invoke(self, messages, config=None):
+        return type("Msg", (), {"content": "Price: ₹53,200 per MT."})()
+
+
+zenbot.ChatGoogleGenerativeAI = FakeLLM
+
+import main  # noqa: E402  (after the stand-in is installed)
+
+
+def test_ready_only_when_every_check_passes():
+    probe = ReadinessProbe()
+    probe.add("kb", lambda: (True, "v1"))
+    assert probe.status() == {"ready": True, "checks": {"kb": {"ok": True, "detail": "v1"}}}
+    probe.add("queue", lambda: (False, {"waiting": 9}))
+    probe.add("broken", lambda: 1 / 0)
+    status = probe.status()
+    assert not status["ready"]
+    assert status["checks"]["queue"] == {"ok": False, "detail": {"waiting": 9}}
+    assert status["checks"]["broken"] == {"ok": False, "detail": "division by zero"}
+
+
+def test_cached_checks_never_block_status():
+    release = threading.Event()
+    calls = []
+
+    def slow_check():
+        calls.append(1)
+        release.wait(5)
+        return True, "reachable"
+
+    probe = ReadinessProbe(ttl=60)
+    probe.add("llm_endpoint", slow_check, cached=True)
+    started = time.monotonic()
+    first, second = probe.status(), probe.status()
+    assert time.monotonic() - started < 0.5
+    assert first["checks"]["llm_endpoint"] == {"ok": False, "detail": "probe pending"} and not second["ready"]
+    release.set()
+    deadline = time.monotonic() + 5
+    while not probe.status()["ready"]:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    # A refresh already running is not started twice; a fresh result is reused
+    assert len(calls) == 1
+    assert probe.status()["checks"]["llm_endpoint"]["detail"] == "reachable" and len(calls) == 1
+    # Past the ttl the stale result is served while one refresh runs
+    probe.ttl = 0
+    assert probe.status()["ready"]
+    probe.refresh(wait=True)
+    assert len(calls) >= 2
+
+
+def test_tcp_probe():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+    try:
+        ok, detail = tcp_probe("127.0.0.1", port)
+        assert ok and detail.startswith(f"127.0.0.1:{port} reachable")
+    finally:
+        server.close()
+    ok, detail = tcp_probe("127.0.0.1", port, timeout=0.5)
+    assert not ok and "unreachable" in detail
+
+
+def test_endpoints_follow_warm_up():
+    async def get(client, path):
+        response = await client.get(path)
+        return response.status_code, response.json()
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app, client=("10.0.0.3", 1000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            main.zenbot.warmed_up.clear()
+            before = await get(client, "/api/health/ready")
+            live = await get(client, "/api/health/live")
+            main.zenbot.warm_up()
+            after = await get(client, "/api/health/ready")
+            summary = await get(client, "/api/health")
+        return before, live, after, summary
+
+    before, live, after, summary = asyncio.run(run())
+    assert before[0] == 503 and before[1]["status"] == "not_ready"
+    assert before[1]["checks"]["warm_up"] == {"ok": False, "detail": "running"}
+    assert before[1]["checks"]["llm"]["ok"] is False
+    assert live[0] == 200 and live[1]["status"] == "alive"
+    assert after[0] == 200 and after[1]["status"] == "ready", after[1]
+    assert set(after[1]["checks"]) == {"zenbot", "warm_up", "kb", "llm", "queue"}
+    assert summary[0] == 200 and summary[1]["zenbot_ready"] is True
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone health tests")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Tests for kb_ingest.py generations and KBIndex search.
+
+Run: python3 test_kb_ingest.py   (or pytest test_kb_ingest.py)
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+import kb_ingest
+from kb_ingest import KBIndex, current_generation, embed_text, ingest
+
+DOCS = {
+    "price_12mm.md": "---\nid: tmt_12mm_price\ntitle: TMT 12mm pricing\ndate: 2024-12-01\n---\n"
+                     "Price of TMT 12mm bars: ₹52,500 per MT.",
+    "delivery.md": "---\nid: delivery_ranchi\ntitle: Delivery to Ranchi\n---\n"
+                   "Delivery to Ranchi takes 2-3 business days. Delivery cost: ₹2,000 per MT.",
+    "spec.txt": "Fe 550D yield strength: 550 N/mm2 minimum, tensile strength 600 N/mm2. Source: IS 1786",
+}
+
+
+def write_docs(root: Path, docs=DOCS) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    for name, text in docs.items():
+        (root / name).write_text(text, encoding="utf-8")
+
+
+def load(index_dir: str) -> KBIndex:
+    return KBIndex(Path(index_dir) / current_generation(index_dir))
+
+
+def test_incremental_ingest_reuses_unchanged_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        docs, index_dir = Path(tmp) / "docs", os.path.join(tmp, "index")
+        write_docs(docs)
+        first = ingest(str(docs), index_dir)
+        assert (first["generation"], first["changed"], first["reused"]) == ("gen-000001", 3, 0)
+
+        (docs / "price_12mm.md").write_text(DOCS["price_12mm.md"].replace("52,500", "53,100"), encoding="utf-8")
+        second = ingest(str(docs), index_dir)
+        assert (second["generation"], second["changed"], second["reused"]) == ("gen-000002", 1, 2)
+        assert current_generation(index_dir) == "gen-000002"
+        price = load(index_dir).search("price of tmt 12mm")[0]
+        assert price["id"] == "tmt_12mm_price" and "53,100" in price["text"]
+        assert price["metadata"] == {"source": "price_12mm.md", "date": "2024-12-01", "version": "current"}
+
+        for _ in range(3):
+            ingest(str(docs), index_dir)
+        assert sorted(p.name for p in Path(index_dir).glob("gen-*")) == ["gen-000003", "gen-000004", "gen-000005"]
+
+
+def test_chunk_size_change_rechunks_everything():
+    with tempfile.TemporaryDirectory() as tmp:
+        docs, index_dir = Path(tmp) / "docs", os.path.join(tmp, "index")
+        write_docs(docs)
+        ingest(str(docs), index_dir)
+        original = kb_ingest.CHUNKER, kb_ingest.DEFAULT_CHUNK_TOKENS
+        kb_ingest.CHUNKER, kb_ingest.DEFAULT_CHUNK_TOKENS = "sentences-v1-8", 8
+        try:
+            meta = ingest(str(docs), index_dir)
+        finally:
+            kb_ingest.CHUNKER, kb_ingest.DEFAULT_CHUNK_TOKENS = original
+        assert (meta["changed"], meta["reused"], meta["chunker"]) == (3, 0, "sentences-v1-8")
+        assert meta["chunks"] > 3
+        files = json.loads((Path(index_dir) / meta["generation"] / "documents.json").read_text())["files"]
+        assert len(files["delivery.md"]["doc"]["chunks"]) > 1
+
+
+def test_concurrent_ingests_publish_distinct_generations():
+    with tempfile.TemporaryDirectory() as tmp:
+        docs, index_dir = Path(tmp) / "docs", os.path.join(tmp, "index")
+        write_docs(docs)
+        results, errors = [], []
+
+        def run():
+            try:
+                results.append(ingest(str(docs), index_dir)["generation"])
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors
+        assert sorted(results) == [f"gen-{n:06d}" for n in range(1, 7)]
+        assert current_generation(index_dir) in results
+        assert not list(Path(index_dir).glob(".gen.tmp*")) and not list(Path(index_dir).glob("CURRENT.*"))
+        load(index_dir)
+
+
+def test_search_many_uses_the_mapped_vectors():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_docs(Path(tmp) / "docs")
+        ingest(os.path.join(tmp, "docs"), os.path.join(tmp, "index"))
+        index = load(os.path.join(tmp, "index"))
+        assert isinstance(index.vectors, np.ndarray) and index.vectors.shape == (3, index.dim)
+
+        queries = ["price of tmt 12mm", "delivery time to ranchi", "fe 550d yield strength", "zzz"]
+        results = index.search_many(queries)
+        assert [[d["id"] for d in hits][:1] for hits in results] == [
+            ["tmt_12mm_price"], ["delivery_ranchi"], ["spec"], []]
+        assert results == [index.search(q) for q in queries]
+
+        # One matrix product gives the same cosines as per-chunk dot products
+        query = embed_text(queries[0])
+        cosines = index._cosine_many(queries[:1], min_cosine=-1.0)[0]
+        for row in range(3):
+            expected = sum(q * float(v) for q, v in zip(query, index.vectors[row]))
+            assert abs(cosines[row] - expected) < 1e-5
+        assert index._cosine_many(queries[:1], min_cosine=2.0) == [{}]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone KB ingest tests")
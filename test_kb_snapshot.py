@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests for kb_snapshot.py read-copy-update swaps and derived data.
+
+Run: python3 test_kb_snapshot.py   (or pytest test_kb_snapshot.py)
+"""
+import threading
+import time
+
+from kb_snapshot import KBSnapshot, SnapshotManager
+
+
+def price_kb(price: str, generation: str) -> KBSnapshot:
+    doc = {"id": "tmt_12mm_price", "title": "TMT 12mm", "text": f"Price: {price} per MT", "metadata": {}}
+    return KBSnapshot({"current": [doc], "outdated": []}, generation=generation)
+
+
+def test_readers_finish_on_the_snapshot_they_pinned():
+    source = {"generation": "gen-000001", "price": "₹52,500"}
+    manager = SnapshotManager(lambda: price_kb(source["price"], source["generation"]),
+                              probe=lambda: source["generation"])
+    with manager.current() as old:
+        assert old.docs("current")[0]["text"] == "Price: ₹52,500 per MT"
+        assert not manager.refresh()  # probe unchanged: no reload
+
+        source.update(generation="gen-000002", price="₹53,100")
+        assert manager.refresh()
+        with manager.current() as new:
+            assert new.docs("current")[0]["text"] == "Price: ₹53,100 per MT"
+            assert new.version != old.version and new.version.startswith("kb-gen-000002-")
+        # The retired snapshot keeps its data until its last reader is done
+        assert old.docs("current")[0]["text"] == "Price: ₹52,500 per MT"
+    assert old.docs("current") == () and old.index is None
+    assert manager.version == new.version and new.docs("current")
+
+
+def test_derived_is_built_once_per_key():
+    snapshot = price_kb("₹52,500", "gen-000001")
+    calls = {"table": 0, "other": 0}
+
+    def factory(key):
+        def build(snap):
+            calls[key] += 1
+            time.sleep(0.2)
+            return {"docs": len(snap.docs("current"))}
+        return build
+
+    results = []
+    threads = [threading.Thread(target=lambda key=key: results.append(snapshot.derived(key, factory(key))))
+               for key in ("table", "other") * 8]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == {"table": 1, "other": 1}
+    assert len(results) == 16 and all(r == {"docs": 1} for r in results)
+    # The two keys were built in parallel
+    assert time.monotonic() - started < 0.35
+
+
+def test_release_during_build_keeps_nothing():
+    snapshot = price_kb("₹52,500", "gen-000001")
+    building = threading.Event()
+
+    def build(snap):
+        building.set()
+        time.sleep(0.05)
+        return {"built": True}
+
+    thread = threading.Thread(target=snapshot.derived, args=("table", build))
+    thread.start()
+    building.wait(1)
+    snapshot.release()
+    thread.join()
+    assert snapshot._derived == {} and snapshot.documents == {}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone KB snapshot tests")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests for prompt_template.py rendering and document block caching.
+
+Run: python3 test_prompt_template.py   (or pytest test_prompt_template.py)
+"""
+from prompt_template import PROMPT_TEMPLATE_ID, SYSTEM_INSTRUCTIONS, PromptTemplate
+
+DOCS = [
+    {"id": "tmt_12mm_price_current", "title": "TMT 12mm pricing", "text": "Price: ₹52,500 per MT.",
+     "metadata": {"source": "pricing_december_2024.pdf", "date": "2024-12-01"}},
+    {"id": "delivery_ranchi_current", "title": "Delivery times", "text": "Delivery to Ranchi: 2-3 days.",
+     "metadata": {"source": "logistics_2024.pdf", "date": "2024-11-01"}},
+]
+
+
+def reference_prompt(question, docs):
+    """The f-string prompt build_prompt produced before the template was compiled."""
+    docs_text = "\n\n".join(
+        f"Document ID: {d['id']}\nTitle: {d['title']}\nSource: {d['metadata']['source']}\n"
+        f"Date: {d['metadata']['date']}\nContent: {d['text']}" for d in docs
+    ) or "(No retrieved documents)"
+    return f"{SYSTEM_INSTRUCTIONS}\n\nRetrieved documents:\n{docs_text}\n\nUser question: {question}\n\nAnswer:"
+
+
+def test_render_matches_reference_prompt():
+    template = PromptTemplate()
+    for docs in (DOCS, DOCS[:1], []):
+        assert template.render("Price of TMT 12mm?", docs) == reference_prompt("Price of TMT 12mm?", docs)
+
+
+def test_blocks_are_cached_per_document_version():
+    template = PromptTemplate()
+    template.render("q1", DOCS)
+    template.render("q2", DOCS)
+    info = template.cache_info()
+    assert (info.hits, info.misses) == (2, 2)
+    updated = dict(DOCS[0], text="Price: ₹53,100 per MT.")
+    assert "53,100" in template.render("q3", [updated])
+    assert template.cache_info().misses == 3
+
+
+def test_conversation_goes_after_the_cached_prefix():
+    template = PromptTemplate()
+    segments = template.segments("and for 16mm?", DOCS, conversation="User: Price of TMT 12mm?\nZenBot: ₹52,500")
+    assert segments[0] == template.prefix
+    prompt = "".join(segments)
+    assert prompt.index("Conversation so far:\nUser: Price of TMT 12mm?") > prompt.index("Content: Delivery")
+    assert prompt.endswith("User question: and for 16mm?\n\nAnswer:")
+
+
+def test_prefix_hash_follows_template_id():
+    assert PromptTemplate().prefix_hash == PromptTemplate(PROMPT_TEMPLATE_ID).prefix_hash
+    assert PromptTemplate("other").prefix_hash != PromptTemplate().prefix_hash
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone prompt template tests")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Tests for query_normalizer.py normalization, spelling tolerance and intents.
+
+Run: python3 test_query_normalizer.py   (or pytest test_query_normalizer.py)
+"""
+import os
+import tempfile
+
+from query_normalizer import IntentClassifier, _damerau1, _load_examples, analyze, normalize_query
+
+
+def test_grades_sizes_and_units_are_canonical():
+    variants = ["Fe550D 16mm", "fe 550 d 16 mm", "FE-550D 16 millimetres", "Fe 550d, 16mm?"]
+    assert {normalize_query(v) for v in variants} == {"fe 550d 16mm"}
+    assert normalize_query("Fe 500") == "fe 500"
+    assert normalize_query("₹52,500 per tonne") == normalize_query("₹52,500/MT") == "₹52 500 per mt"
+    assert normalize_query("550 N / mm²") == normalize_query("550 MPa") == "550 n/mm2"
+
+
+def test_synonyms_and_typos():
+    assert normalize_query("Rebar rates?") == "tmt price"
+    assert normalize_query("Shipping to Ranchi") == "delivery to ranchi"
+    assert normalize_query("What's the yeild strenght?") == "whats the yield strength"
+    # Short words and words with no single close domain term are left alone
+    assert normalize_query("is 12mm in stok") == "is 12mm in stok"
+
+
+def test_damerau_distance_one():
+    assert _damerau1("strenght", "strength")  # adjacent swap
+    assert _damerau1("yeld", "yield") and _damerau1("yielld", "yield") and _damerau1("yieId", "yield")
+    assert not _damerau1("yield", "field_") and not _damerau1("price", "prize!")
+
+
+def test_analyze_intent_and_key():
+    result = analyze("wats the yeild strenght of fe550 d 16 mm")
+    assert result["normalized"] == "wats the yield strength of fe 550d 16mm"
+    assert result["intent"] == "spec" and result["confidence"] > 0.9
+    assert analyze("Rebar rates per tonne?")["intent"] == "price"
+    assert analyze("Shipping to Ranchi?")["intent"] == "delivery"
+    assert analyze("Which grade for a seismic building?")["intent"] == "engineering"
+    # Stop words drop out of the cache key
+    assert analyze("Price of TMT 12mm?")["key"] == analyze("price tmt 12 mm")["key"]
+    assert analyze("?")["intent"] is None
+
+
+def test_trained_model_fits_examples_and_round_trips():
+    examples = _load_examples()
+    classifier = IntentClassifier.train(examples)
+    fit = sum(classifier.classify(normalize_query(e["text"]))[0] == e["intent"] for e in examples)
+    assert fit >= 0.9 * len(examples)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        classifier.save(path)
+        loaded = IntentClassifier.load(path)
+    query = normalize_query("delivery charges to jamshedpur")
+    assert loaded.classify(query) == classifier.classify(query)
+    assert loaded.classify(query)[0] == "delivery"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone query normalizer tests")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Tests for resilience.py circuit breakers, timeouts, hedging and fallback tiers.
+
+Run: python3 test_resilience.py   (or pytest test_resilience.py)
+"""
+import threading
+import time
+
+from resilience import AnswerCache, CircuitBreaker, LatencyTracker, LLMUnavailable, ResilientLLM
+
+
+def make_llm(behaviour, models=("primary", "fallback"), **kwargs) -> ResilientLLM:
+    """``behaviour(model, prompt)`` returns the answer or raises."""
+    return ResilientLLM(list(models), client_factory=lambda model: model,
+                        invoke=lambda client, prompt, callbacks: behaviour(client, prompt), **kwargs)
+
+
+def test_breaker_opens_on_failure_rate_and_probes_once():
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, open_seconds=0.05)
+    for ok in (True, False, True):
+        breaker.record(ok, 0.1)
+    assert breaker.state == "closed"
+    breaker.record(False, 0.1)
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.effective_state() == "half_open"
+    assert breaker.allow() and not breaker.allow()  # a single probe
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_slow_calls_count_as_failures_and_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_rate=1.0, min_calls=2, slow_call_seconds=1.0, open_seconds=0.05)
+    breaker.record(True, 2.0)
+    breaker.record(True, 2.0)
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_falls_back_to_the_next_tier():
+    def behaviour(model, prompt):
+        if model == "primary":
+            raise RuntimeError("quota exceeded")
+        return f"{model}: {prompt}"
+
+    llm = make_llm(behaviour)
+    assert llm.generate("hi") == ("fallback: hi", "fallback")
+    assert llm.stats["errors"] == 1 and llm.stats["calls"] == 1
+
+
+def test_open_circuit_skips_the_tier():
+    calls = []
+
+    def behaviour(model, prompt):
+        calls.append(model)
+        if model == "primary":
+            raise RuntimeError("down")
+        return "ok"
+
+    llm = make_llm(behaviour, breaker_factory=lambda m: CircuitBreaker(m, min_calls=2, open_seconds=60))
+    for _ in range(4):
+        llm.generate("q")
+    assert calls.count("primary") == 2 and llm.stats["short_circuited"] == 2
+    assert llm.health() == {"primary": "open", "fallback": "closed"}
+
+
+def test_timeout_and_all_tiers_failing_raise_unavailable():
+    release = threading.Event()
+
+    def behaviour(model, prompt):
+        if model == "primary":
+            release.wait(5)
+            return "late"
+        raise RuntimeError("boom")
+
+    llm = make_llm(behaviour, timeout=0.1)
+    started = time.monotonic()
+    try:
+        llm.generate("q")
+    except LLMUnavailable as e:
+        message = str(e)
+    else:
+        raise AssertionError("expected LLMUnavailable")
+    release.set()
+    assert time.monotonic() - started < 1.0
+    assert message == "primary: primary did not answer within 0s; fallback: boom"
+    assert llm.stats["timeouts"] == 1 and llm.stats["errors"] == 1
+
+
+def test_hedged_request_wins_when_the_first_stalls():
+    attempts = []
+    lock = threading.Lock()
+
+    def behaviour(model, prompt):
+        with lock:
+            attempts.append(model)
+            first = len(attempts) == 1
+        if first:
+            time.sleep(1.0)
+            return "slow"
+        return "fast"
+
+    llm = make_llm(behaviour, models=("primary",), hedge=True, max_hedge_ratio=1.0, timeout=5)
+    llm.tiers[0].latency.default = 0.05
+    started = time.monotonic()
+    assert llm.generate("q") == ("fast", "primary")
+    assert time.monotonic() - started < 0.5 and llm.stats["hedged"] == 1
+
+
+def test_hedges_are_capped():
+    llm = make_llm(lambda model, prompt: "ok", hedge=True, max_hedge_ratio=0.1)
+    llm.stats.update(calls=10, hedged=1)
+    assert not llm._should_hedge()
+    llm.stats["calls"] = 20
+    assert llm._should_hedge()
+
+
+def test_clients_are_created_once_per_model():
+    created = []
+    llm = ResilientLLM(["a", "b"], client_factory=lambda model: created.append(model) or model,
+                       invoke=lambda client, prompt, callbacks: "ok")
+    llm.warm_up()
+    llm.generate("q")
+    llm.generate("q")
+    assert created == ["a", "b"]
+
+
+def test_latency_p95_needs_enough_samples():
+    tracker = LatencyTracker(default=2.0)
+    for _ in range(19):
+        tracker.add(0.1)
+    assert tracker.p95() == 2.0
+    for i in range(81):
+        tracker.add(i / 100)
+    assert tracker.p95() == 0.75
+
+
+def test_answer_cache_is_lru_with_ttl():
+    cache = AnswerCache(max_entries=2, ttl=60)
+    cache.put(("v1", "fixed", "a"), "A")
+    cache.put(("v1", "fixed", "b"), "B")
+    assert cache.get(("v1", "fixed", "a")) == "A"
+    cache.put(("v1", "fixed", "c"), "C")
+    assert cache.get(("v1", "fixed", "b")) is None and cache.get(("v1", "fixed", "a")) == "A"
+    cache.ttl = -1
+    assert cache.get(("v1", "fixed", "c")) is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone resilience tests")
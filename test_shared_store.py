@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Tests for backend/shared_store.py history, sessions, search, retention and rollups.
+
+Every test runs against MemoryStore, SQLiteStore and SQLiteStore without its
+FTS5 index, which must all return the same conversations.
+
+Run: python3 test_shared_store.py   (or pytest test_shared_store.py)
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from shared_store import MemoryStore, SQLiteStore, create_store, search_words
+
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+BACKENDS = ("memory", "sqlite", "sqlite-like")
+
+
+def make_store(backend: str, directory: str, **sessions):
+    if backend == "memory":
+        return MemoryStore(**sessions)
+    store = SQLiteStore(os.path.join(directory, f"{backend}.db"), **sessions)
+    if backend == "sqlite-like":
+        store.fts = False
+    return store
+
+
+def fill(store) -> None:
+    rows = [
+        ("Price of TMT 12mm?", "Price: ₹52,500 per MT (as of 2024-10-15)", "fixed", 0.9),
+        ("What is Fe 550D?", "Fe 550D has a yield strength of 550 N/mm2", "fixed", 0.8),
+        ("Delivery to Ranchi?", "Delivery to Ranchi takes 2 days", "buggy", 0.3),
+        ("Price of TMT 16mm?", "Prices vary; 16mm is ₹53,000 per MT", "buggy", None),
+        ("Is 12mm in stock?", "Yes, 120 MT of 12 mm bars", "fixed", 0.6),
+    ]
+    for i, (query, response, mode, score) in enumerate(rows * 3):
+        entry = {"timestamp": f"2024-10-{10 + i // 5:02d}T10:00:{i:02d}", "query": query,
+                 "response": response, "mode": mode, "evaluation_id": f"e{i}"}
+        if score is not None:
+            entry["evaluation"] = {"overall_score": score}
+        store.add_conversation(entry)
+
+
+def queries(page) -> list:
+    return [c["query"] for c in page["conversations"]]
+
+
+def check_cursor_pages_cover_history_once(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        fill(store)
+        seen, cursor = [], None
+        while True:
+            page = store.query_conversations(limit=4, cursor=cursor, fields=["id"])
+            seen += [c["id"] for c in page["conversations"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == list(range(15, 0, -1))
+
+
+def check_filters(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        fill(store)
+        assert len(store.query_conversations(limit=20, mode="buggy")["conversations"]) == 6
+        assert len(store.query_conversations(limit=20, min_score=0.7)["conversations"]) == 6
+        # Unscored conversations never match a score bound
+        assert len(store.query_conversations(limit=20, max_score=0.5)["conversations"]) == 3
+        page = store.query_conversations(limit=20, since="2024-10-11", until="2024-10-12")
+        assert [c["id"] for c in page["conversations"]] == [10, 9, 8, 7, 6]
+        entry = store.query_conversations(limit=1, fields=["id", "mode"])["conversations"][0]
+        assert entry == {"id": 15, "mode": "fixed"}
+
+
+def check_search_matches_whole_words(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        fill(store)
+
+        def search(text):
+            return queries(store.query_conversations(limit=20, search=text))
+
+        # "12" is not a word of "12mm", "price" not of "prices"
+        assert search("price 12") == []
+        assert search("PRICE 12mm") == ["Price of TMT 12mm?"] * 3
+        assert search("12") == ["Is 12mm in stock?"] * 3
+        assert search("prices") == ["Price of TMT 16mm?"] * 3
+        assert search("Fe 550D") == ["What is Fe 550D?"] * 3
+        # Text stored only in other fields is not searched
+        assert search("fixed") == [] and search("e3") == []
+        # Punctuation splits words, as in the FTS5 tokenizer
+        assert search('₹52,500 "per') == ["Price of TMT 12mm?"] * 3
+
+
+def check_compact_drops_whole_days_and_keeps_daily_rollups(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        fill(store)
+        for i in range(15):
+            store.add_metric({"timestamp": f"2024-10-{10 + i // 5:02d}T10:00:{i:02d}", "mode": "fixed",
+                              "overall_score": 0.5, "spec_accuracy": 1.0})
+        assert [(p["day"], p["conversations"], p["metrics"]) for p in store.partitions()] == [
+            ("2024-10-10", 5, 5), ("2024-10-11", 5, 5), ("2024-10-12", 5, 5)]
+
+        result = store.compact(max_age_days=2, today="2024-10-13", rollup_days={"1m": 1, "1h": 0})
+        assert result["dropped_days"] == ["2024-10-10"] and result["conversations_removed"] == 5
+        assert result["rollups_pruned"] == 4  # minute buckets of both modes before 2024-10-12
+        result = store.compact(max_conversations=6, today="2024-10-13", rollup_days={})
+        assert result["dropped_days"] == ["2024-10-11"]
+        assert [p["day"] for p in store.partitions()] == ["2024-10-12"]
+        assert store.conversation_count() == 5
+        assert queries(store.query_conversations(limit=20, search="ranchi")) == ["Delivery to Ranchi?"]
+
+        # Daily rollups and the all-time summary survive the dropped days
+        daily = store.rollups(resolution="1d", mode="fixed")
+        assert [(r["bucket"], r["conversations"], r["evaluated"]) for r in daily] == [
+            ("2024-10-10", 3, 5), ("2024-10-11", 3, 5), ("2024-10-12", 3, 5)]
+        summary = store.metrics_summary()
+        assert summary["total"] == 15 and summary["avg_spec_accuracy"] == 1.0
+        assert len(store.rollups(resolution="1h")) == 6
+        assert {r["bucket"][:10] for r in store.rollups(resolution="1m")} == {"2024-10-12"}
+
+
+def check_rollups_by_resolution(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        for minute, mode in ((0, "fixed"), (0, "fixed"), (1, "buggy"), (61, "fixed")):
+            stamp = f"2024-10-10T{10 + minute // 60:02d}:{minute % 60:02d}:30"
+            store.add_conversation({"timestamp": stamp, "query": "q", "response": "a", "mode": mode})
+            store.add_metric({"timestamp": stamp, "mode": mode, "overall_score": 1.0})
+        minutes = store.rollups(resolution="1m")
+        assert [(r["bucket"], r["mode"], r["conversations"]) for r in minutes] == [
+            ("2024-10-10T10:00", "fixed", 2), ("2024-10-10T10:01", "buggy", 1), ("2024-10-10T11:01", "fixed", 1)]
+        hours = store.rollups(since="2024-10-10T10:30", until="2024-10-10T12:00", resolution="1h", mode="fixed")
+        assert [(r["bucket"], r["evaluated"], r["sum_overall_score"]) for r in hours] == [
+            ("2024-10-10T10", 2, 2.0), ("2024-10-10T11", 1, 1.0)]
+        assert store.prune_rollups("1m", "2024-10-10T11:00") == 2
+        store.clear()
+        assert store.rollups(resolution="1d") == [] and store.conversation_count() == 0
+
+
+def check_evaluations_and_generation(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        start = store.generation()
+        conversation_id = store.add_conversation({"timestamp": "2024-10-10T10:00:00", "query": "q",
+                                                  "response": "a", "mode": "fixed", "evaluation_id": "ev-1"})
+        assert store.get_evaluation("ev-1") == {"status": "pending", "evaluation": None}
+        store.set_evaluation(conversation_id, {"overall_score": 0.7})
+        assert store.get_evaluation("ev-1") == {"status": "done", "evaluation": {"overall_score": 0.7}}
+        assert store.get_evaluation("ev-unknown") is None
+        store.add_metric({"timestamp": "2024-10-10T10:00:00", "mode": "fixed", "overall_score": 0.7})
+        assert store.generation() == start + 3
+        # Sessions change no history or metrics
+        store.put_session("s1", {"updated": time.time(), "turns": []})
+        assert store.generation() == start + 3
+        assert [c["query"] for c in store.conversations(limit=5)] == ["q"]
+        store.clear()
+        assert store.generation() == start + 4 and store.conversations() == []
+
+
+def check_sessions_expire_and_evict_least_recent(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory, max_sessions=2, session_ttl=0.3)
+        for session_id in ("a", "b"):
+            store.put_session(session_id, {"updated": time.time(), "last_query": session_id})
+            time.sleep(0.01)
+        assert store.get_session("a")["last_query"] == "a"
+        # A new turn in "a" makes it the most recently used session
+        store.put_session("a", dict(store.get_session("a"), updated=time.time()))
+        time.sleep(0.01)
+        store.put_session("c", {"updated": time.time(), "last_query": "c"})
+        # "b" was used least recently
+        assert store.get_session("b") is None
+        assert store.get_session("a") is not None and store.get_session("c") is not None
+        time.sleep(0.35)
+        assert store.get_session("c") is None
+
+
+def test_sqlite_schema_is_shared_by_workers():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "zenbot_state.db")
+        first = SQLiteStore(path)
+        fill(first)
+        second = SQLiteStore(path)
+        assert second.conversation_count() == 15
+        assert second.generation() == first.generation() == 15
+        assert queries(second.query_conversations(limit=1, search="stock")) == ["Is 12mm in stock?"]
+
+
+def test_workers_see_each_others_writes():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "zenbot_state.db")
+        first, second = SQLiteStore(path), SQLiteStore(path)
+        generation = second.generation()
+        conversation_id = first.add_conversation({"timestamp": "2024-10-10T10:00:00", "query": "q",
+                                                  "response": "a", "mode": "fixed", "evaluation_id": "ev-1"})
+        second.set_evaluation(conversation_id, {"overall_score": 0.9})
+        assert first.get_evaluation("ev-1")["status"] == "done"
+        assert second.generation() == generation + 2
+        first.put_session("s1", {"updated": time.time(), "last_query": "q"})
+        assert second.get_session("s1")["last_query"] == "q"
+
+
+def test_create_store_from_url():
+    saved = dict(os.environ)
+    os.environ.update(ZENBOT_STORE_URL="memory://", ZENBOT_MAX_SESSIONS="5", ZENBOT_SESSION_TTL="60")
+    try:
+        store = create_store()
+        assert isinstance(store, MemoryStore) and (store.max_sessions, store.session_ttl) == (5, 60.0)
+        with tempfile.TemporaryDirectory() as directory:
+            assert isinstance(create_store(f"sqlite:///{directory}/state.db"), SQLiteStore)
+        try:
+            create_store("redis://localhost:6379")
+        except NotImplementedError:
+            pass
+        else:
+            raise AssertionError("expected NotImplementedError for RemoteStore")
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def test_search_words():
+    assert search_words("Price of TMT-12mm? ₹52,500") == ["price", "of", "tmt", "12mm", "52", "500"]
+    assert search_words(None) == []
+
+
+if pytest is not None:
+    backends = pytest.mark.parametrize("backend", BACKENDS)
+    test_cursor_pages_cover_history_once = backends(check_cursor_pages_cover_history_once)
+    test_filters = backends(check_filters)
+    test_search_matches_whole_words = backends(check_search_matches_whole_words)
+    test_compact_drops_whole_days_and_keeps_daily_rollups = backends(
+        check_compact_drops_whole_days_and_keeps_daily_rollups)
+    test_rollups_by_resolution = backends(check_rollups_by_resolution)
+    test_evaluations_and_generation = backends(check_evaluations_and_generation)
+    test_sessions_expire_and_evict_least_recent = backends(check_sessions_expire_and_evict_least_recent)
+
+
+if __name__ == "__main__":
+    test_search_words()
+    test_sqlite_schema_is_shared_by_workers()
+    test_workers_see_each_others_writes()
+    test_create_store_from_url()
+    for name, check in list(globals().items()):
+        if name.startswith("check_") and callable(check):
+            for backend in BACKENDS:
+                check(backend)
+            print(f"{name}: OK")
+    print("\nDone shared store tests")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Tests for backend/sse.py frame coalescing, heartbeats, gzip and resumable streams.
+
+Run: python3 test_sse.py   (or pytest test_sse.py)
+"""
+import asyncio
+import json
+import os
+import sys
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from sse import (HEARTBEAT, ResumableStream, StreamRegistry, accepts_gzip, event_frame, frames, gzip_frames,
+                 parse_event_id, token_frame)
+
+
+async def source(items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def collect(chunks) -> list:
+    return [chunk async for chunk in chunks]
+
+
+def parse(frame: bytes) -> dict:
+    assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+    return json.loads(frame[len(b"data: "):])
+
+
+def test_token_frames_are_valid_json():
+    for text in ("plain", 'quote " and \\ slash', "line\nbreak", "₹52,500 per MT"):
+        assert parse(token_frame(text)) == {"type": "token", "content": text}
+    assert parse(event_frame({"type": "done", "kb_version": "v1"})) == {"type": "done", "kb_version": "v1"}
+
+
+def test_tokens_coalesce_up_to_flush_bytes():
+    words = [f"word{i} " for i in range(20)]
+    out = asyncio.run(collect(frames(source(words), flush_bytes=30, flush_ms=10_000, heartbeat=None)))
+    contents = [parse(f)["content"] for f in out]
+    assert "".join(contents) == "".join(words)
+    assert len(out) == 4 and all(len(c) >= 30 for c in contents[:-1])
+
+
+def test_events_flush_buffered_tokens_in_order():
+    items = ["Price ", "is ", {"type": "metadata", "mode": "fixed"}, "₹53,200", {"type": "done"}]
+    out = asyncio.run(collect(frames(source(items), flush_bytes=1000, flush_ms=10_000, heartbeat=None)))
+    assert [parse(f) for f in out] == [
+        {"type": "token", "content": "Price is "}, {"type": "metadata", "mode": "fixed"},
+        {"type": "token", "content": "₹53,200"}, {"type": "done"}]
+
+
+def test_flush_ms_bounds_token_latency():
+    out = asyncio.run(collect(frames(source(["a", "b", "c"], delay=0.05), flush_bytes=1000, flush_ms=20,
+                                     heartbeat=None)))
+    assert [parse(f)["content"] for f in out] == ["a", "b", "c"]
+
+
+def test_heartbeat_while_source_is_idle():
+    async def slow():
+        await asyncio.sleep(0.25)
+        yield {"type": "done"}
+
+    out = asyncio.run(collect(frames(slow(), heartbeat=0.1)))
+    assert out[:2] == [HEARTBEAT, HEARTBEAT] and parse(out[-1]) == {"type": "done"}
+
+
+def test_closing_frames_stops_the_source():
+    closed = []
+
+    async def endless():
+        try:
+            while True:
+                yield "token "
+                await asyncio.sleep(0)
+        finally:
+            closed.append(True)
+
+    async def run():
+        stream = frames(endless(), flush_bytes=10, heartbeat=None)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert closed == [True]
+
+
+def test_gzip_frames_decode_incrementally():
+    chunks = [event_frame({"type": "token", "content": f"chunk {i}"}) for i in range(5)]
+    compressed = asyncio.run(collect(gzip_frames(source(chunks))))
+    decompressor = zlib.decompressobj(31)
+    # Every frame is readable as soon as its own chunk arrives
+    for chunk, expected in zip(compressed, chunks):
+        assert decompressor.decompress(chunk) == expected
+    assert decompressor.decompress(compressed[-1]) == b"" and decompressor.eof
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate, br") and accepts_gzip("br;q=1.0, gzip;q=0.5") and accepts_gzip("*")
+    assert not accepts_gzip(None) and not accepts_gzip("br") and not accepts_gzip("gzip;q=0")
+
+
+def frame_id(frame: bytes) -> str:
+    assert frame.startswith(b"id: ")
+    return frame.split(b"\n", 1)[0][len(b"id: "):].decode()
+
+
+def test_parse_event_id():
+    assert parse_event_id("3f2a:12") == ("3f2a", 12)
+    assert parse_event_id(" a:b:0 ") == ("a:b", 0)
+    assert parse_event_id(None) is None and parse_event_id("3f2a") is None
+    assert parse_event_id(":4") is None and parse_event_id("3f2a:x") is None
+
+
+def test_follow_replays_after_last_event_id_then_goes_live():
+    async def run():
+        stream = ResumableStream("s1")
+        for i in range(3):
+            stream.append(event_frame({"n": i}))
+        replayed = []
+
+        async def follow():
+            async for frame in stream.follow(after=0, heartbeat=5):
+                replayed.append(frame)
+
+        follower = asyncio.ensure_future(follow())
+        await asyncio.sleep(0.01)
+        stream.append(event_frame({"n": 3}))
+        stream.close()
+        await asyncio.wait_for(follower, 5)
+        return replayed
+
+    replayed = asyncio.run(run())
+    assert [frame_id(f) for f in replayed] == ["s1:1", "s1:2", "s1:3"]
+    assert replayed[0].endswith(b'data: {"n":1}\n\n')
+
+
+def test_position_outside_the_ring_buffer_is_an_error():
+    async def run():
+        stream = ResumableStream("s1", max_events=2)
+        for i in range(5):
+            stream.append(event_frame({"n": i}))
+        stream.close()
+        return [f async for f in stream.follow(after=1)], [f async for f in stream.follow(after=2)]
+
+    expired, kept = asyncio.run(run())
+    assert len(expired) == 1 and parse(expired[0])["type"] == "error"
+    assert [frame_id(f) for f in kept] == ["s1:3", "s1:4"]
+
+
+def test_registry_runs_the_source_once_for_every_connection():
+    started = []
+
+    async def answer():
+        started.append(True)
+        for word in ("Price ", "₹53,200 "):
+            yield word
+            await asyncio.sleep(0.01)
+        yield {"type": "done"}
+
+    async def run():
+        registry = StreamRegistry()
+        stream = registry.start(answer())
+        first = [f async for f in stream.follow()]
+        again = [f async for f in registry.get(stream.id).follow(after=0)]
+        return stream, first, again
+
+    stream, first, again = asyncio.run(run())
+    assert started == [True]
+    assert parse(first[-1].split(b"\n", 1)[1]) == {"type": "done"}
+    assert again == first[1:] and frame_id(first[0]) == f"{stream.id}:0"
+
+
+def test_registry_evicts_finished_and_oldest_streams():
+    async def one_event():
+        yield {"type": "done"}
+
+    async def endless():
+        while True:
+            await asyncio.sleep(1)
+            yield "token "
+
+    async def run():
+        registry = StreamRegistry(ttl=0.05, max_streams=2)
+        finished = registry.start(one_event())
+        await finished.task
+        await asyncio.sleep(0.1)
+        assert registry.get(finished.id) is None
+        oldest, newer = registry.start(endless()), registry.start(endless())
+        newest = registry.start(one_event())
+        await asyncio.sleep(0)
+        evicted = oldest.task.cancelled() or oldest.task.done()
+        for stream in (newer, newest):
+            stream.task.cancel()
+        return registry, oldest, evicted
+
+    registry, oldest, evicted = asyncio.run(run())
+    assert evicted and registry.get(oldest.id) is None and len(registry) == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone SSE tests")
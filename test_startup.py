@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Tests for lazy API startup: one .env load, deferred SDK imports, background warm-up.
+
+Run: python3 test_startup.py   (or pytest test_startup.py)
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+import config
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_MAIN = """
+import os, sys
+sys.path.insert(0, os.path.join({here!r}, "backend"))
+import main
+heavy = sorted(m for m in ("langchain_core", "langchain_google_genai", "langsmith") if m in sys.modules)
+print("heavy", heavy)
+print("kb loaded", main.zenbot.kb._current is not None)
+main.zenbot.warm_up()
+print("warmed", main.zenbot.warmed_up.is_set(), main.zenbot.kb._current is not None)
+"""
+
+
+def test_import_defers_sdks_and_kb_until_warm_up():
+    env = dict(os.environ, GEMINI_API_KEY="", GOOGLE_API_KEY="", LANGSMITH_API_KEY="",
+               ZENBOT_TRACE_COLLECTOR_URL="")
+    result = subprocess.run([sys.executable, "-c", IMPORT_MAIN.format(here=_HERE)], cwd=_HERE, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.splitlines()
+    assert "heavy []" in lines and "kb loaded False" in lines
+    assert "warmed True True" in lines
+
+
+def test_load_env_applies_the_file_once():
+    saved_env, saved_loaded = dict(os.environ), config._loaded
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, ".env")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("ZENBOT_TEST_SET=from-file\nZENBOT_TEST_EMPTY=from-file\nZENBOT_TEST_NEW=from-file\n")
+        os.environ.update(ZENBOT_TEST_SET="from-env", ZENBOT_TEST_EMPTY="")
+        try:
+            config._loaded = None
+            config.load_env(path)
+            values = [os.environ.get(k) for k in ("ZENBOT_TEST_SET", "ZENBOT_TEST_EMPTY", "ZENBOT_TEST_NEW")]
+            os.environ.pop("ZENBOT_TEST_NEW")
+            config.load_env(path)  # no-op the second time
+            second = os.environ.get("ZENBOT_TEST_NEW")
+        finally:
+            os.environ.clear()
+            os.environ.update(saved_env)
+            config._loaded = saved_loaded
+    # The environment wins, except empty values
+    assert values == ["from-env", "from-file", "from-file"]
+    assert second is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone startup tests")
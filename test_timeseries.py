@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tests for backend/timeseries.py resolution choice, LTTB/min-max downsampling and series.
+
+Run: python3 test_timeseries.py   (or pytest test_timeseries.py)
+"""
+import asyncio
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.join(_HERE, "backend"))
+os.environ.setdefault("ZENBOT_LLM_PROBE_ADDRESS", "")
+
+import httpx
+
+import main
+from shared_store import MemoryStore
+from timeseries import MAX_BUCKETS, bucket_start, lttb, minmax, pick_resolution, timeseries
+
+
+def wave(n: int, spike_at: int = None):
+    xy = [(float(i), math.sin(i / 10)) for i in range(n)]
+    if spike_at is not None:
+        xy[spike_at] = (float(spike_at), 10.0)
+    return xy
+
+
+def test_lttb_keeps_ends_and_spikes():
+    xy = wave(1000, spike_at=437)
+    kept = lttb(xy, 50)
+    assert len(kept) == 50 and kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(kept) and 437 in kept
+    assert lttb(xy[:10], 50) == list(range(10)) and lttb(xy, 2) == list(range(1000))
+
+
+def test_minmax_keeps_every_slice_extreme():
+    xy = wave(1000, spike_at=437)
+    xy[800] = (800.0, -10.0)
+    kept = minmax(xy, 40)
+    assert len(kept) <= 40 and kept == sorted(kept)
+    assert 437 in kept and 800 in kept
+    assert minmax(xy[:30], 40) == list(range(30))
+
+
+def test_pick_resolution():
+    now = datetime.now()
+    assert pick_resolution(now - timedelta(hours=6), now) == "1m"
+    assert pick_resolution(now - timedelta(days=7), now) == "1h"
+    assert pick_resolution(now - timedelta(minutes=MAX_BUCKETS + 1), now) == "1h"
+    assert pick_resolution(now - timedelta(days=400), now) == "1d"
+    # Minute rollups older than their retention are gone
+    old = now - timedelta(days=10)
+    assert pick_resolution(old, old + timedelta(hours=1), kept_days={"1m": 7, "1h": 400}) == "1h"
+
+
+def test_bucket_start():
+    assert bucket_start("2024-10-10") == datetime(2024, 10, 10)
+    assert bucket_start("2024-10-10T10") == datetime(2024, 10, 10, 10)
+    assert bucket_start("2024-10-10T10:05") == datetime(2024, 10, 10, 10, 5)
+
+
+def fill(store, minutes: int, start: datetime) -> None:
+    for i in range(minutes):
+        stamp = (start + timedelta(minutes=i, seconds=30)).isoformat()
+        mode = "fixed" if i % 3 else "buggy"
+        store.add_conversation({"timestamp": stamp, "query": "q", "response": "a", "mode": mode})
+        store.add_metric({"timestamp": stamp, "mode": mode, "overall_score": 0.9 if i != 100 else 0.1,
+                          "spec_accuracy": 1.0})
+
+
+def test_series_average_rollups_and_downsample():
+    store, start = MemoryStore(), datetime(2024, 10, 10, 8)
+    fill(store, 300, start)
+    result = timeseries(store, start, start + timedelta(minutes=300), points=20, resolution="1m", mode="fixed")
+    series = result["series"]["fixed"]
+    assert result["bucket_seconds"] == 60 and list(result["series"]) == ["fixed"]
+    assert series["buckets"] == 200 and series["conversations"] == 200 and len(series["points"]) == 20
+    assert series["points"][0]["t"] == "2024-10-10T08:01:00"
+    assert all(p["spec_accuracy"] == 1.0 for p in series["points"])
+    # The low score at minute 100 survives downsampling
+    assert min(p["overall_score"] for p in series["points"]) == 0.1
+    hourly = timeseries(store, start, start + timedelta(hours=5), resolution="1h")["series"]
+    assert [p["conversations"] for p in hourly["buggy"]["points"]] == [20] * 5
+    assert hourly["fixed"]["points"][1]["overall_score"] == round((39 * 0.9 + 0.1) / 40, 4)
+
+
+def test_until_inside_a_bucket_includes_it():
+    store, start = MemoryStore(), datetime(2024, 10, 10, 8)
+    fill(store, 90, start)
+    result = timeseries(store, start, start + timedelta(minutes=61), resolution="1h")
+    assert [p["t"] for p in result["series"]["fixed"]["points"]] == ["2024-10-10T08:00:00", "2024-10-10T09:00:00"]
+
+
+def test_endpoint_accepts_timezone_aware_bounds():
+    aware = datetime(2024, 10, 10, 8, tzinfo=timezone.utc)
+    assert main.local_time(aware.isoformat().replace("+00:00", "Z")) == aware.astimezone().replace(tzinfo=None)
+    assert main.local_time("2024-10-10T08:00") == datetime(2024, 10, 10, 8)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app, client=("10.0.0.5", 1000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            ok = await client.get("/api/metrics/timeseries", params={
+                "since": "2024-10-10T08:00:00Z", "until": "2024-10-10T14:00:00+05:30"})
+            bad = [await client.get("/api/metrics/timeseries", params=params) for params in (
+                {"method": "average"}, {"resolution": "5m"}, {"metric": "speed"}, {"since": "yesterday"})]
+        return ok, bad
+
+    ok, bad = asyncio.run(run())
+    assert ok.status_code == 200
+    assert ok.json()["since"] == aware.astimezone().replace(tzinfo=None).isoformat()
+    assert ok.json()["until"] == (aware + timedelta(minutes=30)).astimezone().replace(tzinfo=None).isoformat()
+    assert [r.status_code for r in bad] == [400] * 4
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone timeseries tests")
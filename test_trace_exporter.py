@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Tests for trace_exporter.py against a local stand-in collector (no network).
+
+Run: python3 test_trace_exporter.py   (or pytest test_trace_exporter.py)
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from trace_exporter import HTTPCollectorSink, LangSmithSink, MemorySink, TraceExporter, local_collector
+
+
+def make_run(i: int) -> dict:
+    now = datetime.now(timezone.utc)
+    return {"id": str(uuid.uuid4()), "name": "zenbot_fixed", "run_type": "llm", "inputs": {"question": f"q{i}"},
+            "outputs": {"answer": f"a{i}"}, "start_time": now, "end_time": now}
+
+
+def test_batches_reach_local_collector():
+    received = []
+    server = local_collector(port=0, on_batch=received.append)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = "http://%s:%d/" % server.server_address
+        exporter = TraceExporter(HTTPCollectorSink(url), batch_size=100, flush_interval=60)
+        for i in range(250):
+            assert exporter.submit(make_run(i))
+        assert exporter.flush(timeout=10)
+        assert [len(b) for b in received] == [100, 100, 50]
+        assert [r["inputs"]["question"] for b in received for r in b] == [f"q{i}" for i in range(250)]
+        exporter.shutdown()
+    finally:
+        server.shutdown()
+
+
+def test_drop_newest_when_full():
+    sink = MemorySink(delay=0.3)
+    exporter = TraceExporter(sink, max_queue=5, batch_size=1, flush_interval=0.01)
+    exporter.submit(make_run(0))
+    time.sleep(0.1)  # run 0 is in flight, the queue is empty
+    accepted = [exporter.submit(make_run(i)) for i in range(1, 9)]
+    assert accepted == [True] * 5 + [False] * 3
+    exporter.shutdown()
+    assert [r["inputs"]["question"] for r in sink.runs] == [f"q{i}" for i in range(6)]
+    assert exporter.stats["dropped"] == 3
+
+
+def test_drop_oldest_when_full():
+    sink = MemorySink(delay=0.3)
+    exporter = TraceExporter(sink, max_queue=5, batch_size=1, flush_interval=0.01, policy="drop_oldest")
+    exporter.submit(make_run(0))
+    time.sleep(0.1)
+    assert all(exporter.submit(make_run(i)) for i in range(1, 9))
+    exporter.shutdown()
+    assert [r["inputs"]["question"] for r in sink.runs] == ["q0"] + [f"q{i}" for i in range(4, 9)]
+    assert exporter.stats["dropped"] == 3
+
+
+def test_shutdown_flushes_queue():
+    sink = MemorySink()
+    exporter = TraceExporter(sink, batch_size=1000, flush_interval=60)
+    for i in range(42):
+        exporter.submit(make_run(i))
+    exporter.shutdown()
+    assert len(sink.runs) == 42
+    assert not exporter.submit(make_run(99))
+
+
+def test_langsmith_sink_sends_one_request_per_batch():
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+
+        def batch_ingest_runs(self, create=None, update=None):
+            self.calls.append(create)
+
+    client = FakeClient()
+    exporter = TraceExporter(LangSmithSink(client, "Zen_Project"), batch_size=100, flush_interval=60)
+    for i in range(150):
+        exporter.submit(make_run(i))
+    exporter.shutdown()
+    assert [len(c) for c in client.calls] == [100, 50]
+    run = client.calls[0][0]
+    assert run["session_name"] == "Zen_Project" and run["trace_id"] == run["id"]
+    assert run["dotted_order"].endswith(run["id"]) and "project_name" not in run
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone trace exporter tests")
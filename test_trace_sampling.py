@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for trace_sampling.py tail rules, head rates and per-minute budgets.
+
+Run: python3 test_trace_sampling.py   (or pytest test_trace_sampling.py)
+"""
+import os
+import random
+
+from trace_sampling import TraceSampler, _MinuteBudget
+
+GOOD = {"overall_score": 0.9, "details": {}}
+BAD = {"overall_score": 0.2, "details": {}}
+
+
+def test_tail_rules_always_keep():
+    sampler = TraceSampler(head_rates={"fixed": 0.0}, default_rate=0.0)
+    assert sampler.decide("fixed", GOOD, error="timeout") == (True, "tail:error")
+    assert sampler.decide("fixed", {"overall_score": 0.9, "details": {"error": "boom"}}) == (True, "tail:error")
+    assert sampler.decide("fixed", BAD) == (True, "tail:low_score")
+    assert sampler.decide("buggy", GOOD) == (True, "tail:mode")
+    assert sampler.decide("fixed", GOOD) == (False, "not_sampled")
+    assert sampler.stats == {"tail:error": 2, "tail:low_score": 1, "tail:mode": 1, "not_sampled": 1}
+
+
+def test_head_rate_per_mode():
+    random.seed(7)
+    sampler = TraceSampler(head_rates={"fixed": 0.1}, default_rate=1.0, keep_modes=(), head_budget_per_min=-1)
+    kept = sum(sampler.decide("fixed", GOOD)[0] for _ in range(5000))
+    assert 350 < kept < 650
+    assert all(sampler.decide("other", GOOD) == (True, "head") for _ in range(20))
+
+
+def test_budgets_cap_each_class():
+    sampler = TraceSampler(head_rates={"fixed": 1.0}, keep_modes=(), head_budget_per_min=3, tail_budget_per_min=2)
+    heads = [sampler.decide("fixed", GOOD)[1] for _ in range(5)]
+    tails = [sampler.decide("fixed", BAD)[1] for _ in range(4)]
+    # A minute boundary in between would only reset the counts
+    assert heads.count("head") >= 3 and set(heads) <= {"head", "head_budget_exhausted"}
+    assert tails.count("tail:low_score") >= 2 and set(tails) <= {"tail:low_score", "tail_budget_exhausted"}
+
+
+def test_minute_budget_resets_each_minute():
+    budget = _MinuteBudget(2)
+    assert [budget.take(60.0), budget.take(61.0), budget.take(119.0)] == [True, True, False]
+    assert budget.take(120.0)
+    assert all(_MinuteBudget(-1).take(0.0) for _ in range(100))
+
+
+def test_from_env():
+    saved = dict(os.environ)
+    os.environ.update(ZENBOT_TRACE_SAMPLE_FIXED="0.25", ZENBOT_TRACE_KEEP_MODES="buggy, canary",
+                      ZENBOT_TRACE_KEEP_BELOW="0.4")
+    try:
+        sampler = TraceSampler.from_env()
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    assert sampler.head_rates["fixed"] == 0.25 and sampler.keep_modes == {"buggy", "canary"}
+    assert sampler.score_threshold == 0.4
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone trace sampling tests")
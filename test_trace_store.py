@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Tests for trace_store.py segments, document dedup and filtered reads.
+
+Run: python3 test_trace_store.py   (or pytest test_trace_store.py)
+"""
+import gzip
+import json
+import tempfile
+from pathlib import Path
+
+from trace_store import TraceStore, is_trace_store
+
+DOCS = [{"id": "doc_001", "title": "Fe 550D", "content": "Yield strength 550 N/mm2"},
+        {"id": "doc_002", "title": "Price", "content": "Price: 52,500 per MT"}]
+
+
+def make_trace(i: int, version: str = "fixed") -> dict:
+    return {"question": f"question {i}?", "version": version, "retrieved_documents": DOCS,
+            "prompt": f"Instructions\n\nUser: question {i}?\nAnswer:", "answer": f"answer {i}",
+            "answer_source": "llm", "kb_version": "kb-1"}
+
+
+def test_round_trip_keeps_prompt_verbatim():
+    with tempfile.TemporaryDirectory() as root:
+        with TraceStore(root, segment_rows=4) as store:
+            for i in range(10):
+                store.append(make_trace(i, "fixed" if i % 2 else "buggy"), timestamp=1000 + i)
+        assert is_trace_store(Path(root))
+        assert [e["rows"] for e in TraceStore(root).segments()] == [4, 4, 2]
+        traces = TraceStore(root).read()
+        assert [t["question"] for t in traces] == [f"question {i}?" for i in range(10)]
+        first = traces[0]
+        assert first["prompt"] == make_trace(0)["prompt"]
+        assert first["retrieved_documents"] == DOCS
+        assert first["answer_source"] == "llm" and first["timestamp"] == 1000
+
+
+def test_documents_are_written_once():
+    with tempfile.TemporaryDirectory() as root:
+        with TraceStore(root, segment_rows=3) as store:
+            for i in range(9):
+                store.append(make_trace(i))
+        lines = (Path(root) / "documents.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == len(DOCS)
+        segment = next(Path(root).glob("seg-*.json.gz"))
+        columns = json.loads(gzip.decompress(segment.read_bytes()))["columns"]
+        assert "retrieved_documents" not in json.dumps(columns["extra"])
+
+
+def test_filters_skip_segments():
+    with tempfile.TemporaryDirectory() as root:
+        with TraceStore(root, segment_rows=5) as store:
+            for i in range(10):
+                store.append(make_trace(i, "fixed" if i < 5 else "buggy"), timestamp=1000 + i)
+        store = TraceStore(root)
+        assert [t["question"] for t in store.read(version="buggy")] == [f"question {i}?" for i in range(5, 10)]
+        assert [t["answer"] for t in store.read(question="Question 3?")] == ["answer 3"]
+        assert [t["timestamp"] for t in store.read(since=1004, until=1006)] == [1004, 1005, 1006]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: OK")
+    print("\nDone trace store tests")
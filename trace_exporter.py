@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Background, batched exporter for ZenBot traces.
+
+Tracing used to happen on the request path: a ``LangChainTracer`` callback
+inside ``llm.invoke`` and a synchronous ``client.create_run`` per query. A slow
+LangSmith endpoint added straight to chat latency.
+
+``TraceExporter`` decouples the two. ``submit()`` only appends to a bounded
+in-memory queue; a daemon thread drains it in batches (flushed when
+``batch_size`` runs are waiting or ``flush_interval`` seconds passed) and hands
+each batch to a *sink*. When the queue is full the configured policy decides
+what to lose:
+
+- ``drop_newest``: reject the incoming run (default)
+- ``drop_oldest``: evict the oldest queued run
+- ``sample``: above ``high_watermark`` keep only ``sample_rate`` of new runs
+
+``shutdown()`` flushes what is left (also registered with ``atexit``).
+
+Sinks are callables taking a list of run dicts: ``LangSmithSink`` for
+production, ``HTTPCollectorSink`` for any HTTP endpoint, and ``MemorySink``
+for tests. ``python3 trace_exporter.py collector`` starts a local stand-in
+collector that accepts batches from ``HTTPCollectorSink``.
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+POLICIES = ("drop_newest", "drop_oldest", "sample")
+
+
+def trace_to_run(trace: Dict, name: str, start_time: float, end_time: float,
+                 project: Optional[str] = None, extra: Optional[Dict] = None) -> Dict:
+    """Convert a ``zenbot.run_query`` trace into a LangSmith run payload."""
+    run = {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "run_type": "llm",
+        "inputs": {
+            "question": trace.get("question"),
+            "retrieved_documents": [{
+                "id": d["id"],
+                "title": d.get("title"),
+                "source": d.get("metadata", {}).get("source"),
+                "date": d.get("metadata", {}).get("date"),
+            } for d in trace.get("retrieved_documents", [])],
+            "prompt": trace.get("prompt"),
+        },
+        "outputs": {"answer": trace.get("answer")},
+        "start_time": datetime.fromtimestamp(start_time, tz=timezone.utc),
+        "end_time": datetime.fromtimestamp(end_time, tz=timezone.utc),
+        "extra": {"metadata": {"version": trace.get("version"), "kb_version": trace.get("kb_version"),
+                               "answer_source": trace.get("answer_source"), **(extra or {})}},
+    }
+    if project:
+        run["project_name"] = project
+    return run
+
+
+class TraceExporter:
+    """Bounded queue + background batching thread in front of a trace sink."""
+
+    def __init__(self, sink: Callable[[List[Dict]], None], max_queue: int = 10000,
+                 batch_size: int = 100, flush_interval: float = 2.0, policy: str = "drop_newest",
+                 sample_rate: float = 0.1, high_watermark: float = 0.8):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.high_watermark = high_watermark
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._flush_requested = False
+        self._in_flight = 0
+        self._closed = False
+        self.stats = {"submitted": 0, "exported": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def submit(self, run: Dict) -> bool:
+        """Queue one run without blocking. Returns False if it was dropped."""
+        with self._cond:
+            if self._closed:
+                self.stats["dropped"] += 1
+                return False
+            depth = len(self._queue)
+            if self.policy == "sample" and depth >= self.high_watermark * self.max_queue:
+                if random.random() >= self.sample_rate:
+                    self.stats["dropped"] += 1
+                    return False
+            if depth >= self.max_queue:
+                if self.policy == "drop_oldest":
+                    self._queue.popleft()
+                    self.stats["dropped"] += 1
+                else:
+                    self.stats["dropped"] += 1
+                    return False
+            self._queue.append(run)
+            self.stats["submitted"] += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _take_batch(self) -> List[Dict]:
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while not self._closed and not self._flush_requested and len(self._queue) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(n)]
+            if not self._queue:
+                self._flush_requested = False
+            self._in_flight = len(batch)
+            return batch
+
+    def _export(self, batch: List[Dict]) -> None:
+        for attempt in range(2):
+            try:
+                self.sink(batch)
+                self.stats["exported"] += len(batch)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                if attempt:
+                    print(f"⚠️  Trace export failed, dropping {len(batch)} runs: {e}")
+                    self.stats["failed"] += len(batch)
+                else:
+                    time.sleep(0.5)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._export(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+                if self._closed and not self._queue:
+                    return
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Export everything queued so far. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._thread.is_alive():
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop accepting runs, flush the queue and stop the worker thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._queue:
+            print(f"⚠️  Trace exporter shut down with {len(self._queue)} runs unexported")
+
+
+# -- sinks ----------------------------------------------------------------------
+
+class LangSmithSink:
+    """Sends each batch to LangSmith in one request with ``Client.batch_ingest_runs``.
+
+    Runs are root runs, so each is its own trace: ``trace_id`` is the run id
+    and ``dotted_order`` its start time + id, as batch ingest requires.
+    Clients without batch ingest fall back to one ``create_run`` per run.
+    """
+
+    def __init__(self, client, project: str, client_factory: Optional[Callable[[], object]] = None):
+        self._client = client
+        self._client_factory = client_factory
+        self.project = project
+
+    @classmethod
+    def from_api_key(cls, api_key: str, project: str) -> "LangSmithSink":
+        """Sink whose client (and the langsmith import) is created on the first batch."""
+        def factory():
+            from langsmith import Client
+            return Client(api_key=api_key)
+        return cls(None, project, client_factory=factory)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def to_ingest(self, run: Dict) -> Dict:
+        payload = dict(run)
+        payload["session_name"] = payload.pop("project_name", None) or self.project
+        payload.setdefault("trace_id", payload["id"])
+        payload.setdefault("dotted_order", f"{payload['start_time']:%Y%m%dT%H%M%S%fZ}{payload['id']}")
+        return payload
+
+    def __call__(self, batch: List[Dict]) -> None:
+        client = self.client
+        if hasattr(client, "batch_ingest_runs"):
+            client.batch_ingest_runs(create=[self.to_ingest(run) for run in batch])
+            return
+        for run in batch:
+            payload = dict(run)
+            payload.setdefault("project_name", self.project)
+            client.create_run(**payload)
+
+
+class HTTPCollectorSink:
+    """POSTs each batch as a JSON array to ``url`` (e.g. the local collector)."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, batch: List[Dict]) -> None:
+        body = json.dumps(batch, default=str).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"collector returned {response.status}")
+
+
+class MemorySink:
+    """Keeps exported batches in memory; for tests and local debugging."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches: List[List[Dict]] = []
+
+    def __call__(self, batch: List[Dict]) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        self.batches.append(list(batch))
+
+    @property
+    def runs(self) -> List[Dict]:
+        return [run for batch in self.batches for run in batch]
+
+
+def local_collector(host: str = "127.0.0.1", port: int = 9411, out: Optional[str] = None,
+                    on_batch: Optional[Callable[[List[Dict]], None]] = None) -> ThreadingHTTPServer:
+    """Stand-in trace collector (not yet serving) that accepts HTTPCollectorSink batches.
+
+    Port 0 picks a free port (``server.server_address``). ``on_batch`` sees
+    every received batch.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            batch = json.loads(self.rfile.read(length) or b"[]")
+            if out:
+                with open(out, "a", encoding="utf-8") as f:
+                    for run in batch:
+                        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+            if on_batch is not None:
+                on_batch(batch)
+            else:
+                print(f"Received batch of {len(batch)} runs")
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve_local_collector(host: str = "127.0.0.1", port: int = 9411, out: Optional[str] = None):
+    """Run a stand-in trace collector that accepts HTTPCollectorSink batches."""
+    server = local_collector(host, port, out)
+    print(f"Local trace collector listening on http://{host}:{port}/")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZenBot trace exporter utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    col = sub.add_parser("collector", help="Run a local stand-in trace collector")
+    col.add_argument("--host", default="127.0.0.1")
+    col.add_argument("--port", type=int, default=9411)
+    col.add_argument("--out", help="Append received runs to this JSONL file")
+    args = parser.parse_args()
+    serve_local_collector(args.host, args.port, args.out)
+
+
+if __name__ == "__main__":
+    main()
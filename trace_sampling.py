@@ -0,0 +1,105 @@
+"""Adaptive trace sampling for ZenBot.
+
+Tracing every ``/api/chat`` call to LangSmith does not scale, but the bad
+answers must never be lost. ``TraceSampler`` sits between ``evaluate_response``
+and the trace exporter and decides per response:
+
+1. Tail rules (always keep, checked first): the query errored, the
+   ``overall_score`` is below ``score_threshold``, or it ran on a mode listed in
+   ``keep_modes`` (the "buggy" path).
+2. Head sampling: otherwise keep with the per-mode rate from ``head_rates``.
+
+Each class has its own per-minute budget, so a spike of low-score answers
+cannot flood the exporter and routine traffic is capped regardless of volume.
+Tracing cost then grows sub-linearly with traffic while every regression
+stays visible.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class _MinuteBudget:
+    """Fixed one-minute window counter."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.window = 0
+        self.used = 0
+
+    def take(self, now: float) -> bool:
+        window = int(now // 60)
+        if window != self.window:
+            self.window, self.used = window, 0
+        if self.limit >= 0 and self.used >= self.limit:
+            return False
+        self.used += 1
+        return True
+
+
+class TraceSampler:
+    """Head sampling per mode plus always-keep tail rules, with per-minute caps."""
+
+    def __init__(self, head_rates: Optional[Dict[str, float]] = None, default_rate: float = 0.1,
+                 score_threshold: float = 0.6, keep_modes: Iterable[str] = ("buggy",),
+                 head_budget_per_min: int = 600, tail_budget_per_min: int = 6000):
+        """A budget of -1 means unlimited."""
+        self.head_rates = head_rates if head_rates is not None else {"fixed": 0.1}
+        self.default_rate = default_rate
+        self.score_threshold = score_threshold
+        self.keep_modes = set(keep_modes)
+        self._head = _MinuteBudget(head_budget_per_min)
+        self._tail = _MinuteBudget(tail_budget_per_min)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "TraceSampler":
+        """Configure from ZENBOT_TRACE_* environment variables."""
+        env = os.environ.get
+        keep = env("ZENBOT_TRACE_KEEP_MODES", "buggy")
+        return cls(
+            head_rates={
+                "fixed": float(env("ZENBOT_TRACE_SAMPLE_FIXED", "0.1")),
+                "buggy": float(env("ZENBOT_TRACE_SAMPLE_BUGGY", "1.0")),
+            },
+            default_rate=float(env("ZENBOT_TRACE_SAMPLE_DEFAULT", "0.1")),
+            score_threshold=float(env("ZENBOT_TRACE_KEEP_BELOW", "0.6")),
+            keep_modes=[m.strip() for m in keep.split(",") if m.strip()],
+            head_budget_per_min=int(env("ZENBOT_TRACE_HEAD_PER_MIN", "600")),
+            tail_budget_per_min=int(env("ZENBOT_TRACE_TAIL_PER_MIN", "6000")),
+        )
+
+    def _tail_reason(self, mode: str, evaluation: Optional[Dict], error: Optional[str]) -> Optional[str]:
+        if error:
+            return "error"
+        if evaluation:
+            if "error" in evaluation.get("details", {}):
+                return "error"
+            score = evaluation.get("overall_score")
+            if score is not None and score < self.score_threshold:
+                return "low_score"
+        if mode in self.keep_modes:
+            return "mode"
+        return None
+
+    def decide(self, mode: str, evaluation: Optional[Dict] = None,
+               error: Optional[str] = None) -> Tuple[bool, str]:
+        """Return (keep, reason) for one response."""
+        now = time.time()
+        reason = self._tail_reason(mode, evaluation, error)
+        with self._lock:
+            if reason is not None:
+                keep = self._tail.take(now)
+                decision = f"tail:{reason}" if keep else "tail_budget_exhausted"
+            elif random.random() < self.head_rates.get(mode, self.default_rate):
+                keep = self._head.take(now)
+                decision = "head" if keep else "head_budget_exhausted"
+            else:
+                keep, decision = False, "not_sampled"
+            self.stats[decision] = self.stats.get(decision, 0) + 1
+        return keep, decision
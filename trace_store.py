@@ -0,0 +1,282 @@
+"""Append-only, segment-based store for ZenBot traces.
+
+The scripts used to write one pretty-printed JSON file per query into
+``langsmith_traces/``, each repeating the full prompt and every retrieved
+document. This store keeps the same information in a compact layout:
+
+  <root>/documents.jsonl         each distinct document version, written once
+  <root>/seg-<stamp>.json.gz     immutable, gzip-compressed columnar segment
+  <root>/seg-<stamp>.idx.json    small index for the segment (versions,
+                                 question hashes, timestamp range)
+
+Documents are referenced from traces as ``<doc id>@<content hash>``. Prompts
+are stored verbatim: their shared instructions compress to little inside a
+gzip segment, and a re-render from whatever template is current could differ
+from what the model saw (template edits, session memory, context packing).
+
+Readers only open the segments whose index matches the requested version,
+question or time window.
+
+Usage:
+  python3 trace_store.py import langsmith_traces/*.json --store langsmith_traces/store
+  python3 trace_store.py export --store langsmith_traces/store --out combined_traces.json
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_STORE_DIR = os.path.join("langsmith_traces", "store")
+
+SEGMENT_SCHEMA = 1
+DEFAULT_SEGMENT_ROWS = 512
+
+# Trace keys stored as dedicated columns; everything else goes to "extra".
+_COLUMN_KEYS = ("question", "version", "retrieved_documents", "prompt", "answer")
+
+
+def question_key(question: str) -> str:
+    """Stable short hash of a question used by the segment index."""
+    norm = " ".join((question or "").lower().split())
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:12]
+
+
+def document_ref(doc: Dict) -> str:
+    """Reference for one document version: ``<id>@<content hash>``."""
+    payload = json.dumps(doc, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:10]
+    return f"{doc.get('id', 'doc')}@{digest}"
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class TraceStore:
+    """Append-only trace store rooted at a directory.
+
+    ``append`` buffers traces in memory and writes a new segment every
+    ``segment_rows`` traces; call ``flush`` (or use the store as a context
+    manager) to persist the remainder.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, segment_rows: int = DEFAULT_SEGMENT_ROWS):
+        self.root = Path(root)
+        self.segment_rows = segment_rows
+        self._lock = threading.Lock()
+        self._buffer: List[Dict] = []
+        self._known_docs: Optional[set] = None
+        self._seq = 0
+
+    # -- writing ---------------------------------------------------------
+
+    def __enter__(self) -> "TraceStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+    def append(self, trace: Dict, timestamp: Optional[float] = None) -> None:
+        """Buffer one trace (the dict returned by ``zenbot.run_query``)."""
+        row = dict(trace)
+        row["_ts"] = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.segment_rows
+        if full:
+            self.flush()
+
+    def flush(self) -> Optional[Path]:
+        """Write buffered traces as a new immutable segment."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return None
+            self.root.mkdir(parents=True, exist_ok=True)
+            return self._write_segment(rows)
+
+    def _load_known_docs(self) -> set:
+        if self._known_docs is None:
+            self._known_docs = set(self._read_documents().keys())
+        return self._known_docs
+
+    def _write_segment(self, rows: List[Dict]) -> Path:
+        known = self._load_known_docs()
+        new_docs: List[str] = []
+
+        cols: Dict[str, List] = {
+            "ts": [], "version": [], "question": [], "doc_refs": [],
+            "prompt": [], "answer": [], "extra": [],
+        }
+        index: Dict[str, Dict] = {"versions": {}, "questions": {}}
+
+        for i, row in enumerate(rows):
+            docs = row.get("retrieved_documents") or []
+            refs = []
+            for d in docs:
+                ref = document_ref(d)
+                refs.append(ref)
+                if ref not in known:
+                    known.add(ref)
+                    new_docs.append(json.dumps({"ref": ref, "doc": d}, ensure_ascii=False))
+
+            question = row.get("question", "")
+            version = row.get("version", "")
+            cols["ts"].append(row["_ts"])
+            cols["version"].append(version)
+            cols["question"].append(question)
+            cols["doc_refs"].append(refs)
+            cols["prompt"].append(row.get("prompt"))
+            cols["answer"].append(row.get("answer"))
+            extra = {k: v for k, v in row.items() if k not in _COLUMN_KEYS and k != "_ts"}
+            cols["extra"].append(extra or None)
+
+            index["versions"][version] = index["versions"].get(version, 0) + 1
+            index["questions"].setdefault(question_key(question), []).append(i)
+
+        # Documents first, so a segment never references an unwritten doc.
+        if new_docs:
+            with open(self.root / "documents.jsonl", "a", encoding="utf-8") as f:
+                f.write("\n".join(new_docs) + "\n")
+
+        self._seq += 1
+        stamp = f"{int(time.time() * 1000):013d}-{os.getpid()}-{self._seq:04d}"
+        seg_path = self.root / f"seg-{stamp}.json.gz"
+        payload = json.dumps({"schema": SEGMENT_SCHEMA, "rows": len(rows), "columns": cols},
+                             ensure_ascii=False, separators=(",", ":"))
+        _atomic_write(seg_path, gzip.compress(payload.encode("utf-8")))
+
+        index.update({
+            "segment": seg_path.name,
+            "rows": len(rows),
+            "min_ts": min(cols["ts"]),
+            "max_ts": max(cols["ts"]),
+        })
+        # The index is written last: readers only see complete segments.
+        _atomic_write(self.root / f"seg-{stamp}.idx.json",
+                      json.dumps(index, separators=(",", ":")).encode("utf-8"))
+        return seg_path
+
+    # -- reading ---------------------------------------------------------
+
+    def _read_documents(self) -> Dict[str, Dict]:
+        path = self.root / "documents.jsonl"
+        docs: Dict[str, Dict] = {}
+        if not path.exists():
+            return docs
+        for line in path.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            docs[item["ref"]] = item["doc"]
+        return docs
+
+    def segments(self) -> List[Dict]:
+        """Return the index entries of all complete segments, oldest first."""
+        entries = []
+        for idx_path in sorted(self.root.glob("seg-*.idx.json")):
+            try:
+                entries.append(json.loads(idx_path.read_text(encoding="utf-8")))
+            except ValueError:
+                continue
+        return entries
+
+    def read(self, version: Optional[str] = None, question: Optional[str] = None,
+             since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """Return traces matching the filters, rehydrated to the legacy format."""
+        qkey = question_key(question) if question is not None else None
+        docs: Optional[Dict[str, Dict]] = None
+        traces: List[Dict] = []
+
+        for entry in self.segments():
+            if version is not None and version not in entry.get("versions", {}):
+                continue
+            if qkey is not None and qkey not in entry.get("questions", {}):
+                continue
+            if since is not None and entry.get("max_ts", 0) < since:
+                continue
+            if until is not None and entry.get("min_ts", 0) > until:
+                continue
+
+            raw = gzip.decompress((self.root / entry["segment"]).read_bytes())
+            cols = json.loads(raw.decode("utf-8"))["columns"]
+            rows: Iterable[int] = (entry["questions"][qkey] if qkey is not None
+                                   else range(entry["rows"]))
+            if docs is None:
+                docs = self._read_documents()
+
+            for i in rows:
+                ts = cols["ts"][i]
+                if version is not None and cols["version"][i] != version:
+                    continue
+                if (since is not None and ts < since) or (until is not None and ts > until):
+                    continue
+                traces.append(self._rehydrate(cols, i, docs))
+        return traces
+
+    def _rehydrate(self, cols: Dict[str, List], i: int, docs: Dict[str, Dict]) -> Dict:
+        retrieved = [docs[ref] for ref in cols["doc_refs"][i] if ref in docs]
+        trace = dict(cols["extra"][i] or {})
+        trace.update({
+            "question": cols["question"][i],
+            "version": cols["version"][i],
+            "retrieved_documents": retrieved,
+            "prompt": cols["prompt"][i],
+            "answer": cols["answer"][i],
+            "timestamp": cols["ts"][i],
+        })
+        return trace
+
+
+def is_trace_store(path: Path) -> bool:
+    """True if ``path`` is a directory laid out by TraceStore."""
+    return path.is_dir() and any(path.glob("seg-*.idx.json"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact ZenBot trace store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Import legacy per-query JSON trace files")
+    imp.add_argument("files", nargs="+", help="Trace JSON files (single trace or array)")
+    imp.add_argument("--store", default=DEFAULT_STORE_DIR)
+
+    exp = sub.add_parser("export", help="Export traces as a JSON array")
+    exp.add_argument("--store", default=DEFAULT_STORE_DIR)
+    exp.add_argument("--version", help="Only export traces for this version")
+    exp.add_argument("--out", default="combined_traces.json")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = 0
+        with TraceStore(args.store) as store:
+            for name in args.files:
+                path = Path(name)
+                data = json.loads(path.read_text(encoding="utf-8"))
+                items = data if isinstance(data, list) else [data]
+                for item in items:
+                    store.append(item, timestamp=path.stat().st_mtime)
+                    count += 1
+        print(f"Imported {count} traces into {args.store}")
+    else:
+        traces = TraceStore(args.store).read(version=args.version)
+        Path(args.out).write_text(json.dumps(traces, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Exported {len(traces)} traces to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,24 +15,70 @@ as mentioned in README.md.
 from __future__ import annotations
 
 import os
-import json
 from typing import List, Dict
 
-from dotenv import load_dotenv
+from config import load_env
 
-# LangChain & LangSmith imports
-try:
-    # LLM integration for Gemini via langchain-google-genai
-    # Use ChatGoogleGenerativeAI (provided by langchain_google_genai) as the chat model
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    # Use langchain_core tracer (installed as `langchain_core`) to send traces to LangSmith
-    # LangChain Core exposes tracers under `langchain_core.tracers.langchain`
-    from langchain_core.tracers.langchain import LangChainTracer
-except Exception:
-    # We import inside try/except so the user can read the script even if packages
-    # are not yet installed. Running the script requires installing the requirements.
-    GoogleGemini = None
-    LangChainTracer = None
+# LangChain & LangSmith SDKs are imported on first use (see chat_model_class
+# and tracer_class), so importing zenbot - and starting the API - stays fast.
+# ChatGoogleGenerativeAI (langchain_google_genai) is the Gemini chat model;
+# LangChainTracer (langchain_core) sends traces to LangSmith.
+ChatGoogleGenerativeAI = None
+LangChainTracer = None
+
+
+def chat_model_class():
+    """ChatGoogleGenerativeAI, imported on first use; None if not installed."""
+    global ChatGoogleGenerativeAI
+    if ChatGoogleGenerativeAI is None:
+        try:
+            from langchain_google_genai import ChatGoogleGenerativeAI as chat_model
+        except Exception:
+            # Running a query requires installing the requirements
+            return None
+        ChatGoogleGenerativeAI = chat_model
+    return ChatGoogleGenerativeAI
+
+
+def tracer_class():
+    """LangChainTracer, imported on first use; None if not installed."""
+    global LangChainTracer
+    if LangChainTracer is None:
+        try:
+            from langchain_core.tracers.langchain import LangChainTracer as tracer
+        except Exception:
+            return None
+        LangChainTracer = tracer
+    return LangChainTracer
+
+# Compiled prompt template (instruction prefix and document blocks are cached).
+from prompt_template import DEFAULT_TEMPLATE
+from context_packer import DEFAULT_CONTEXT_TOKENS, estimate_tokens, pack_context
+# Documents ingested with kb_ingest.py are served through immutable KB snapshots
+# that are swapped atomically when a new index generation is published.
+from kb_ingest import DEFAULT_INDEX_DIR, KBIndex, current_generation
+from kb_snapshot import KBSnapshot, SnapshotManager
+# The Gemini call goes through timeouts, circuit breakers and model fallback;
+# if every model fails the answer comes from a cache or a retrieval-only template.
+from resilience import AnswerCache, LLMUnavailable, ResilientLLM
+# Lookup questions (price, spec, delivery) answered straight from a fact table
+from fact_table import FactTable, fact_answer
+# Canonical query text ("Fe550D", "fe 550 d" -> "fe 550d"; "16 mm" -> "16mm") and
+# intent, shared by retrieval, the answer cache and fast-path routing
+from query_normalizer import analyze, normalize_query
+# Session memory: follow-ups resolved against earlier turns, bounded prompt history
+from conversation_memory import render_memory, resolve_followup
+
+INTENT_MIN_CONFIDENCE = float(os.environ.get("ZENBOT_INTENT_MIN_CONFIDENCE", "0.7"))
+
+# Intent -> documents to retrieve when no keyword rule matched the query
+INTENT_DOCS = {
+    "spec": lambda i: any(x in i for x in ["spec", "tensile", "fe550d"]),
+    "price": lambda i: "price" in i and "tmt" in i,
+    "delivery": lambda i: "delivery" in i,
+    "availability": lambda i: "availability" in i or "inventory" in i,
+    "engineering": lambda i: "engineering" in i or "guidance" in i or "structural" in i,
+}
 
 
 def build_documents() -> Dict[str, List[Dict]]:
@@ -151,21 +197,57 @@ def build_documents() -> Dict[str, List[Dict]]:
     return {"current": current_docs, "outdated": outdated_docs}
 
 
-def retrieve_documents(version: str, query: str) -> List[Dict]:
+def build_snapshot(index_dir: str = DEFAULT_INDEX_DIR) -> KBSnapshot:
+    """Build a KB snapshot: built-in documents overlaid with the live ingested generation.
+
+    Ingested documents replace built-in documents with the same id.
+    """
+    kb = build_documents()
+    generation = current_generation(index_dir)
+    index = None
+    if generation:
+        try:
+            index = KBIndex(os.path.join(index_dir, generation))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: could not load KB index {generation}: {e}")
+            generation = None
+    if index is not None:
+        for version_key in ("current", "outdated"):
+            ingested = {d["id"]: d for d in index.docs[version_key]}
+            kb[version_key] = [ingested.pop(d["id"], d) for d in kb[version_key]] + list(ingested.values())
+    return KBSnapshot(kb, index=index, generation=generation)
+
+
+# Live KB pointer shared by every query in this process
+KB_SNAPSHOTS = SnapshotManager(build_snapshot, probe=current_generation)
+
+
+def retrieve_documents(version: str, query: str, kb: KBSnapshot = None,
+                       index_hits: List[Dict] = None) -> List[Dict]:
     """Simple retrieval function.
 
     - version: 'buggy' returns outdated documents
                'fixed' returns current documents
-    - query: used for relevance matching (simple keyword checks here)
+    - query: used for relevance matching (simple keyword checks on the
+             normalized query, see query_normalizer.py)
+
+    - kb: the KB snapshot to search; defaults to the live snapshot
+    - index_hits: precomputed index.search results (see retrieve_many)
 
-    In a production RAG, swap this for an embeddings + vector store retrieval.
+    Documents ingested with kb_ingest.py are part of the snapshot, and the
+    ingested index's hybrid lexical/vector search adds hits the keyword rules
+    below don't cover.
     """
-    kb = build_documents()
+    if kb is None:
+        with KB_SNAPSHOTS.current() as snapshot:
+            return retrieve_documents(version, query, kb=snapshot, index_hits=index_hits)
+
     version_key = "outdated" if version == "buggy" else "current"
-    docs = kb[version_key]
+    docs = kb.docs(version_key)
+    index = kb.index
 
     # Improved keyword-based retrieval for all test cases
-    q = query.lower()
+    q = normalize_query(query)
     retrieved: List[Dict] = []
     
     # Test cases 1, 6: Yield/tensile strength of Fe 550D
@@ -222,7 +304,23 @@ def retrieve_documents(version: str, query: str) -> List[Dict]:
         for d in docs:
             if "engineering" in d["id"] or "guidance" in d["id"] or "structural" in d["id"]:
                 retrieved.append(d)
-    
+
+    # Paraphrases no keyword rule covers: fall back to the classified intent
+    if not retrieved:
+        analysis = analyze(query)
+        if analysis["intent"] and analysis["confidence"] >= INTENT_MIN_CONFIDENCE:
+            wanted = INTENT_DOCS[analysis["intent"]]
+            sizes = [s for s in ("12mm", "16mm") if s in q]
+            for d in docs:
+                if wanted(d["id"]) and (analysis["intent"] != "price" or not sizes
+                                        or any(s in d["id"] for s in sizes)):
+                    retrieved.append(d)
+
+    if index_hits is not None:
+        retrieved.extend(index_hits)
+    elif index is not None:
+        retrieved.extend(index.search(query, version_key))
+
     # Remove duplicates while preserving order
     seen = set()
     unique_retrieved = []
@@ -234,49 +332,166 @@ def retrieve_documents(version: str, query: str) -> List[Dict]:
     return unique_retrieved
 
 
-def build_prompt(question: str, docs: List[Dict]) -> str:
+def retrieve_many(version: str, queries: List[str], kb: KBSnapshot) -> List[List[Dict]]:
+    """retrieve_documents for a batch of queries, with one vectorized index pass.
+
+    Results share the snapshot's document objects, so a document retrieved
+    for several queries exists (and is rendered into prompt blocks) once.
+    """
+    version_key = "outdated" if version == "buggy" else "current"
+    hits = kb.index.search_many(queries, version_key) if kb.index is not None else [None] * len(queries)
+    return [retrieve_documents(version, q, kb=kb, index_hits=h) for q, h in zip(queries, hits)]
+
+
+def _block_tokens(doc: Dict) -> int:
+    return estimate_tokens(DEFAULT_TEMPLATE.doc_block(doc))
+
+
+def build_prompt(question: str, docs: List[Dict], max_context_tokens: int = None,
+                 conversation: str = None) -> str:
     """Create a single string prompt that includes retrieved documents and strict instructions.
 
     We keep the prompt simple: system instructions followed by enumerated doc contents
-    and the user question.
+    and the user question. The instructions and each document block are pre-rendered
+    and cached by ``DEFAULT_TEMPLATE``; see prompt_template.py.
+
+    Documents are chunked and packed into ``max_context_tokens`` (default:
+    ZENBOT_CONTEXT_TOKENS) so the prompt stays bounded; see context_packer.py.
+    ``conversation`` is the already bounded session history (render_memory).
     """
-    system_instructions = (
-        "You are ZenithSteel ZenBot. Answer only using the information explicitly provided in the\n"
-        "retrieved documents below. Do not hallucinate. For specifications, cite the standard.\n"
-        "For prices, include the document date. If information isn't available in the retrieved\n"
-        "documents, admit you don't have it. Provide short, factual answers and include the\n"
-        "document source and date for each factual claim."
-    )
-
-    docs_text = "\n\n".join(
-        [f"Document ID: {d['id']}\nTitle: {d['title']}\nSource: {d['metadata']['source']}\nDate: {d['metadata']['date']}\nContent: {d['text']}" for d in docs]
-    )
+    budget = DEFAULT_CONTEXT_TOKENS if max_context_tokens is None else max_context_tokens
+    packed = pack_context(question, docs, budget, block_tokens=_block_tokens)
+    return DEFAULT_TEMPLATE.render(question, packed, conversation)
+
 
+def template_answer(question: str, docs: List[Dict]) -> str:
+    """Retrieval-only answer built straight from the top documents (no LLM)."""
     if not docs:
-        docs_text = "(No retrieved documents)"
+        return "I don't have the requested information in the retrieved documents."
+
+    # If contains spec
+    for d in docs:
+        if "spec" in d["id"] or "fe550d" in d["id"]:
+            # Expect spec text like 'Yield Strength: 565 N/mm² (per IS 1786:2008).'
+            return f"According to {d['metadata']['source']} (date: {d['metadata']['date']}): {d['text']}"
+
+    for d in docs:
+        if "price" in d["id"] or "tmt" in d["id"]:
+            return f"Price: {d['text']} (source: {d['metadata']['source']}, date: {d['metadata']['date']})"
+
+    d = docs[0]
+    return f"According to {d['metadata']['source']} (date: {d['metadata']['date']}): {d['text']}"
+
+
+def _gemini_client(model: str):
+    gemini_api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    # NOTE: The class and parameter names for the langchain-google-genai wrapper can
+    # differ between releases. ChatGoogleGenerativeAI accepts `model` and `google_api_key`.
+    chat_model = chat_model_class()
+    try:
+        return chat_model(model=model, google_api_key=gemini_api_key)
+    except TypeError:
+        # fallback parameter name
+        return chat_model(model_name=model, google_api_key=gemini_api_key)
+
+
+def _gemini_invoke(llm, prompt: str, callbacks: list) -> str:
+    # ChatGoogleGenerativeAI.invoke expects a sequence of messages; using a human-only message here.
+    # Pass callbacks to ensure LangSmith tracing works
+    res = llm.invoke([("human", prompt)], config={"callbacks": callbacks} if callbacks else None)
+    # res is an AIMessage; extract textual content. It may be a string or a list of content blocks.
+    if not hasattr(res, "content"):
+        return str(res)
+    if isinstance(res.content, str):
+        return res.content
+    if isinstance(res.content, list):
+        # Try to extract 'text' fields or join string parts
+        parts = []
+        for item in res.content:
+            if isinstance(item, dict) and "text" in item:
+                parts.append(item["text"])
+            elif isinstance(item, str):
+                parts.append(item)
+        return "\n".join(parts).strip()
+    return str(res.content)
+
+
+_LLM = None
+ANSWER_CACHE = AnswerCache()
+FAST_PATH_ENABLED = os.environ.get("ZENBOT_FAST_PATH", "1") == "1"
+
+
+def _llm() -> ResilientLLM:
+    """Process-wide resilient Gemini client, configured from the environment."""
+    global _LLM
+    if _LLM is None:
+        _LLM = ResilientLLM.from_env(_gemini_client, _gemini_invoke)
+    return _LLM
+
+
+def llm_health() -> Dict[str, str]:
+    """Circuit state per model tier, from recent calls (no network request)."""
+    return _llm().health()
 
-    prompt = f"{system_instructions}\n\nRetrieved documents:\n{docs_text}\n\nUser question: {question}\n\nAnswer:" 
-    return prompt
 
+def llm_warm_up() -> None:
+    """Import the Gemini SDK and create the chat clients ahead of the first query."""
+    if chat_model_class() is not None:
+        _llm().warm_up()
 
-def run_query(question: str, version: str, tracer=None) -> Dict[str, str]:
+
+def run_query(question: str, version: str, tracer=None, kb: KBSnapshot = None,
+              memory: Dict = None, docs: List[Dict] = None) -> Dict[str, str]:
     """Run a single query: retrieve docs, call Gemini, and return response.
 
     tracer: optional LangChainTracer instance (passed to LLM as a callback) to create traces.
+    kb: KB snapshot to answer from; defaults to the live snapshot, pinned for the whole query.
+    memory: session memory (conversation_memory.py); follow-ups are resolved
+            against it and its bounded history is added to the prompt.
+    docs: documents already retrieved for this question from ``kb`` (batch
+          requests retrieve for every question at once); skips retrieval.
     """
-    # Retrieve
-    docs = retrieve_documents(version, question)
+    if kb is None:
+        with KB_SNAPSHOTS.current() as snapshot:
+            return run_query(question, version, tracer=tracer, kb=snapshot, memory=memory, docs=docs)
 
-    prompt = build_prompt(question, docs)
+    # "and for 16mm?" -> a standalone query for retrieval, fast path and cache
+    resolved = resolve_followup(question, memory)
+
+    # Retrieve
+    if docs is None:
+        docs = retrieve_documents(version, resolved, kb=kb)
+    analysis = analyze(resolved)
+
+    # Fast path: a single matching fact from the retrieved documents, no LLM.
+    # Questions classified as availability or engineering always go to the LLM.
+    routed = (analysis["intent"] in ("spec", "price", "delivery")
+              or analysis["confidence"] < INTENT_MIN_CONFIDENCE)
+    if FAST_PATH_ENABLED and routed:
+        fact = kb.derived("fact_table", FactTable.from_snapshot).lookup(analysis["normalized"], docs)
+        if fact is not None:
+            return {
+                "question": question,
+                "version": version,
+                "kb_version": kb.version,
+                "retrieved_documents": docs,
+                "prompt": None,
+                "answer": fact_answer(fact),
+                "answer_source": "fact_table",
+                "resolved_question": resolved,
+                "intent": analysis["intent"],
+                "fact": {k: fact[k] for k in ("attribute", "product", "size", "location",
+                                              "value", "unit", "doc_id")},
+            }
+
+    prompt = build_prompt(question, docs, conversation=render_memory(memory))
 
     # --- LLM call (Gemini) ---
-    if ChatGoogleGenerativeAI is None:
+    if chat_model_class() is None:
         raise RuntimeError(
             "Required packages not installed. Install requirements.txt and try again."
         )
 
-    # Instantiate Gemini LLM. We pass the tracer via callbacks if available so LangSmith
-    # gets the events. The exact argument names may vary with package versions.
     gemini_api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
     if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
         raise RuntimeError("Please set GEMINI_API_KEY in the .env file before running.")
@@ -284,64 +499,49 @@ def run_query(question: str, version: str, tracer=None) -> Dict[str, str]:
     # Create tracer if not provided
     callbacks = [tracer] if tracer is not None else []
 
-    # NOTE: The class and parameter names for the langchain-google-genai wrapper can
-    # differ between releases. This code uses a plausible constructor: GoogleGemini(...)
-    # which accepts `model` or `model_name` and `api_key`, and `callbacks`.
-    # Instantiate the chat model. The ChatGoogleGenerativeAI class accepts `model` and `api_key`.
+    cache_key = (kb.version, version, analysis["key"])
     try:
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=gemini_api_key)
-    except TypeError:
-        # fallback parameter name
-        llm = ChatGoogleGenerativeAI(model_name="gemini-2.5-flash", google_api_key=gemini_api_key)
-
-    # Invoke the chat model with a single human message containing the prompt.
-    try:
-        # ChatGoogleGenerativeAI.invoke expects a sequence of messages; using a human-only message here.
-        # Pass callbacks to ensure LangSmith tracing works
-        res = llm.invoke([("human", prompt)], config={"callbacks": callbacks} if callbacks else None)
-        # res is an AIMessage; extract textual content. It may be a string or a list of content blocks.
-        if hasattr(res, "content"):
-            if isinstance(res.content, str):
-                answer = res.content
-            elif isinstance(res.content, list):
-                # Try to extract 'text' fields or join string parts
-                parts = []
-                for item in res.content:
-                    if isinstance(item, dict) and "text" in item:
-                        parts.append(item["text"])
-                    elif isinstance(item, str):
-                        parts.append(item)
-                answer = "\n".join(parts).strip()
-            else:
-                answer = str(res.content)
-        else:
-            answer = str(res)
-    except Exception as e:
-        raise RuntimeError(f"LLM call failed: {e}")
+        answer, answer_source = _llm().generate(prompt, callbacks)
+        ANSWER_CACHE.put(cache_key, answer)
+    except LLMUnavailable as e:
+        # Provider degraded: serve the last good answer, else a template answer
+        print(f"⚠️  LLM unavailable, using fallback answer: {e}")
+        answer = ANSWER_CACHE.get(cache_key)
+        answer_source = "cache"
+        if answer is None:
+            answer = template_answer(question, docs)
+            answer_source = "template"
 
     # Build a simple trace payload to print and (optionally) log via tracer.
     trace = {
         "question": question,
         "version": version,
+        "kb_version": kb.version,
         "retrieved_documents": docs,
         "prompt": prompt,
+        "prompt_prefix_hash": DEFAULT_TEMPLATE.prefix_hash,
+        "context_budget": DEFAULT_CONTEXT_TOKENS,
         "answer": answer,
+        "answer_source": answer_source,
+        "resolved_question": resolved,
+        "intent": analysis["intent"],
     }
 
     return trace
 
 
 def main():
-    load_dotenv()
+    load_env()
 
     # Create a LangSmith tracer that will send traces to the LangSmith project.
     # This uses the LangChain Core tracer (LangChainTracer) which sends data to
     # LangSmith via the langsmith client. It requires LANGSMITH_API_KEY and will
     # associate runs with the provided project name.
     tracer = None
-    if LangChainTracer is not None:
+    tracer_cls = tracer_class()
+    if tracer_cls is not None:
         project = os.environ.get("LANGSMITH_PROJECT", "Zen_Project")
-        tracer = LangChainTracer(project_name=project)
+        tracer = tracer_cls(project_name=project)
 
     test_questions = [
         "What is the yield strength of Fe 550D 16mm bars?",
@@ -349,6 +549,11 @@ def main():
         "How long does delivery to Ranchi take?",
     ]
 
+    from trace_store import TraceStore, DEFAULT_STORE_DIR
+
+    # Traces go to the compact append-only store instead of one file per query
+    store = TraceStore(DEFAULT_STORE_DIR)
+
     # Run both versions
     for version in ("buggy", "fixed"):
         print(f"\n--- Running version: {version} ---")
@@ -359,16 +564,15 @@ def main():
                 # Print concise response and cite retrieved docs
                 print("Answer:\n", trace["answer"].strip())
 
-                # Also dump the trace payload to a local file for inspection
-                outdir = "langsmith_traces"
-                os.makedirs(outdir, exist_ok=True)
-                fname = os.path.join(outdir, f"trace_{version}_{abs(hash(q)) % (10**8)}.json")
-                with open(fname, "w", encoding="utf-8") as f:
-                    json.dump(trace, f, indent=2, ensure_ascii=False)
-                print(f"Trace saved to: {fname}")
+                # Also keep the trace payload locally for inspection
+                store.append(trace)
             except Exception as e:
                 print(f"Error running query: {e}")
 
+    segment = store.flush()
+    if segment is not None:
+        print(f"\nTraces saved to: {segment}")
+
 
 if __name__ == "__main__":
     main()